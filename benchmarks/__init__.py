@@ -0,0 +1,2 @@
+# Mesures de performance de MyTaskMate
+# Chaque module se lance avec "python -m benchmarks.<nom>" depuis le dossier du projet
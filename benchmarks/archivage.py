@@ -0,0 +1,74 @@
+import argparse
+import os
+import tempfile
+import time
+from noyau import (
+    base, configurer_base, obtenir_taches, obtenir_page_taches, obtenir_taches_ouvertes, rechercher_taches,
+    archiver_taches, chemin_archive
+)
+from benchmarks.donnees import generer_base
+from benchmarks.suite import chronometrer
+
+# Mesure les requêtes de tous les jours avant et après l'archivage des tâches complétées
+# Après un an d'utilisation, la plupart des tâches sont complétées : --completees donne leur part
+
+
+def completer(part) :
+    """float -> None
+    Complète des tâches en cours jusqu'à ce que la part des tâches complétées atteigne environ "part" """
+    connexion = base.connexion()
+    ouvertes = connexion.execute("SELECT AVG(est_completee = 0) FROM taches").fetchone()[0]
+    # Proportion des tâches en cours à compléter, appliquée selon le tache_id pour rester reproductible
+    seuil = int(100 * max(0, ouvertes - (1 - part)) / ouvertes)
+    with connexion :
+        connexion.execute("UPDATE taches SET est_completee = 1 WHERE est_completee = 0 AND tache_id % 100 < ?", (seuil,))
+
+
+def mesurer(id_utilisateur, repetitions) :
+    """int, int -> dict
+    Mesure les lectures faites à chaque connexion et à chaque affichage"""
+    return {
+        "obtenir_taches" : chronometrer(lambda : obtenir_taches(id_utilisateur), repetitions),
+        "première page (défaut)" : chronometrer(lambda : obtenir_page_taches(id_utilisateur, {"racines" : True}), repetitions),
+        "première page (priorité)" : chronometrer(lambda : obtenir_page_taches(id_utilisateur, {"racines" : True}, "priorite"), repetitions),
+        "obtenir_taches_ouvertes" : chronometrer(lambda : obtenir_taches_ouvertes(id_utilisateur), repetitions),
+        "rechercher_taches" : chronometrer(lambda : rechercher_taches(id_utilisateur, "courses"), repetitions),
+    }
+
+
+def taille_fichiers(*chemins) :
+    """str, ... -> float
+    Renvoie la taille totale des fichiers d'une base (base, journal WAL), en Mo"""
+    return sum(os.path.getsize(chemin + suffixe) for chemin in chemins for suffixe in ("", "-wal")
+               if os.path.exists(chemin + suffixe)) / 1e6
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Mesure les requêtes avant et après l'archivage des tâches complétées")
+    analyseur.add_argument("--utilisateurs", type = int, default = 100, help = "nombre d'utilisateurs générés")
+    analyseur.add_argument("--taches", type = int, default = 100000, help = "nombre de tâches générées")
+    analyseur.add_argument("--completees", type = float, default = 0.8, help = "part des tâches complétées")
+    analyseur.add_argument("--repetitions", type = int, default = 20, help = "nombre de répétitions de chaque mesure")
+    arguments = analyseur.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier :
+        chemin = os.path.join(dossier, "archivage.db")
+        nombres = generer_base(chemin, arguments.utilisateurs, arguments.taches)
+        completer(arguments.completees)
+        configurer_base(profil = "equilibre", durabilite = "strict")
+        id_max = nombres.most_common(1)[0][0]
+        base.executer("PRAGMA wal_checkpoint(TRUNCATE)")
+        avant, taille_avant = mesurer(id_max, arguments.repetitions), taille_fichiers(chemin)
+
+        debut = time.perf_counter()
+        archivees = sum(archiver_taches(id_utilisateur, jours = 0) for id_utilisateur in nombres)
+        duree = time.perf_counter() - debut
+        base.executer("PRAGMA wal_checkpoint(TRUNCATE)")
+        apres, taille_apres = mesurer(id_max, arguments.repetitions), taille_fichiers(chemin)
+        taille_archive = taille_fichiers(chemin_archive())
+        base.fermer()
+
+    print(f"{archivees} tâches archivées en {duree:.2f} s ; utilisateur mesuré : {nombres[id_max]} tâches")
+    print(f"base de donnée : {taille_avant:.1f} Mo -> {taille_apres:.1f} Mo (archive : {taille_archive:.1f} Mo)")
+    for nom, mesure in avant.items() :
+        print(f"{nom:<26} {mesure['mediane_ms']:>10.3f} ms -> {apres[nom]['mediane_ms']:>10.3f} ms")
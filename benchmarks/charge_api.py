@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+# Test de charge du serveur HTTP/JSON (serveur_api.py)
+# Chaque client virtuel garde sa connexion ouverte, crée son compte, ouvre une session, puis enchaîne
+# les requêtes aussi vite que possible : 70 % de listes de tâches, 20 % d'ajouts, 10 % de tâches complétées.
+# Sans --adresse, un serveur est lancé dans un autre processus sur une base temporaire
+
+
+async def envoyer(lecteur, flux, methode, chemin, donnees = None, jeton = None) :
+    """asyncio.StreamReader, asyncio.StreamWriter, str, str, dict, str -> int, object
+    Envoie une requête HTTP/1.1 sur une connexion gardée ouverte et renvoie le code et les données de la réponse"""
+    corps = b"" if donnees is None else json.dumps(donnees).encode("utf-8")
+    lignes = [f"{methode} {chemin} HTTP/1.1", "Host: mytaskmate", f"Content-Length: {len(corps)}"]
+    if jeton is not None :
+        lignes.append(f"Authorization: Bearer {jeton}")
+    flux.write(("\r\n".join(lignes) + "\r\n\r\n").encode("latin-1") + corps)
+    await flux.drain()
+    statut = int((await lecteur.readline()).split()[1])
+    longueur = 0
+    while True :
+        entete = await lecteur.readline()
+        if entete in (b"\r\n", b"") :
+            break
+        nom, _, valeur = entete.decode("latin-1").partition(":")
+        if nom.strip().lower() == "content-length" :
+            longueur = int(valeur)
+    contenu = await lecteur.readexactly(longueur) if longueur else b""
+    return statut, json.loads(contenu) if contenu else None
+
+
+async def insister(lecteur, flux, methode, chemin, donnees = None, jeton = None) :
+    """asyncio.StreamReader, asyncio.StreamWriter, str, str, dict, str -> int, object
+    Envoie une requête jusqu'à ce que le serveur ne la refuse plus (503)"""
+    while True :
+        statut, reponse = await envoyer(lecteur, flux, methode, chemin, donnees, jeton)
+        if statut != 503 :
+            return statut, reponse
+        await asyncio.sleep(0.01)
+
+
+async def client(numero, hote, port, fin, graine, resultats) :
+    """int, str, int, float, int, dict -> None
+    Simule un utilisateur jusqu'à la date de fin et ajoute la durée de chaque requête aux résultats"""
+    hasard = random.Random(graine + numero)
+    lecteur, flux = await asyncio.open_connection(hote, port)
+    compte = {"identifiant" : f"charge-{graine}-{numero}", "mot_de_passe" : "charge"}
+    await insister(lecteur, flux, "POST", "/comptes", compte)
+    statut, session = await insister(lecteur, flux, "POST", "/sessions", compte)
+    if statut != 201 :
+        raise RuntimeError(f"Connexion du client {numero} impossible ({statut})")
+    jeton = session["jeton"]
+    ids = []
+    while time.monotonic() < fin :
+        tirage = hasard.random()
+        if tirage < 0.2 or not ids :
+            requete = ("POST", "/taches", {"tache" : f"Tâche {len(ids)}", "description" : "",
+                                           "echeance" : "01-01-2030", "priorite" : hasard.choice(["Faible", "Moyenne", "Haute"])})
+        elif tirage < 0.3 :
+            requete = ("POST", f"/taches/{hasard.choice(ids)}/completee", None)
+        else :
+            requete = ("GET", "/taches", None)
+        debut = time.perf_counter()
+        statut, donnees = await envoyer(lecteur, flux, *requete, jeton = jeton)
+        duree = time.perf_counter() - debut
+        if statut == 503 :
+            resultats["refusees"] += 1
+            # Le serveur est surchargé : le client attend un peu avant de réessayer
+            await asyncio.sleep(0.01)
+            continue
+        if statut >= 400 :
+            resultats["erreurs"] += 1
+        elif requete[1] == "/taches" and requete[0] == "POST" :
+            ids.append(donnees["tache_id"])
+        resultats["durees"].append(duree)
+    flux.close()
+
+
+async def charger(hote, port, clients, duree, graine) :
+    """str, int, int, float, int -> dict
+    Lance les clients en même temps et renvoie les durées des requêtes réussies et le nombre de refus"""
+    resultats = {"durees" : [], "refusees" : 0, "erreurs" : 0}
+    fin = time.monotonic() + duree
+    await asyncio.gather(*(client(numero, hote, port, fin, graine, resultats) for numero in range(clients)))
+    return resultats
+
+
+def afficher(resultats, duree) :
+    """dict, float -> None
+    Affiche le débit et les latences mesurés"""
+    durees = sorted(resultats["durees"])
+    if not durees :
+        print("Aucune requête réussie")
+        return
+    # La fonction quantiles() découpe les durées en 100 parts : l'indice 98 est le 99e centile
+    centiles = statistics.quantiles(durees, n = 100) if len(durees) > 1 else durees * 99
+    print(f"{len(durees)} requêtes en {duree:.1f} s : {len(durees) / duree:.0f} requêtes/s")
+    print(f"latence p50 {centiles[49] * 1000:.2f} ms, p99 {centiles[98] * 1000:.2f} ms, max {durees[-1] * 1000:.2f} ms")
+    print(f"{resultats['refusees']} requêtes refusées (503), {resultats['erreurs']} erreurs")
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Test de charge du serveur HTTP/JSON de MyTaskMate")
+    analyseur.add_argument("--adresse", help = "adresse d'un serveur déjà lancé (sinon un serveur est lancé sur une base temporaire)")
+    analyseur.add_argument("--clients", type = int, default = 50, help = "nombre de clients simultanés")
+    analyseur.add_argument("--duree", type = float, default = 10, help = "durée du test (en s)")
+    analyseur.add_argument("--lecteurs", type = int, default = 4, help = "nombre de threads de lecture du serveur lancé")
+    analyseur.add_argument("--limite", type = int, default = 64, help = "nombre maximum de requêtes en cours du serveur lancé")
+    analyseur.add_argument("--durabilite", default = "groupe", help = "durabilité des écritures du serveur lancé")
+    analyseur.add_argument("--graine", type = int, default = 42, help = "graine du générateur aléatoire")
+    arguments = analyseur.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier :
+        serveur = None
+        adresse = arguments.adresse
+        if adresse is None :
+            environnement = dict(os.environ, MYTASKMATE_DB = os.path.join(dossier, "charge.db"),
+                                 MYTASKMATE_DURABILITE = arguments.durabilite)
+            script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "serveur_api.py")
+            serveur = subprocess.Popen([sys.executable, script, "--port", "0", "--lecteurs", str(arguments.lecteurs),
+                                        "--limite", str(arguments.limite)],
+                                       env = environnement, stdout = subprocess.PIPE, text = True)
+            # Le serveur affiche son adresse une fois à l'écoute
+            adresse = serveur.stdout.readline().split()[-1]
+        decoupage = urllib.parse.urlsplit(adresse)
+        try :
+            resultats = asyncio.run(charger(decoupage.hostname, decoupage.port, arguments.clients, arguments.duree, arguments.graine))
+            afficher(resultats, arguments.duree)
+        finally :
+            if serveur is not None :
+                serveur.terminate()
+                serveur.wait()
@@ -0,0 +1,63 @@
+import random
+import itertools
+from collections import Counter
+from datetime import date, timedelta
+from noyau import configurer_base, base, PRIORITES, FORMAT_ISO, SQL_NOUVEAU_COMPTE, SQL_AJOUTER_TACHE
+
+# Génération de bases de donnée synthétiques pour les mesures de performance
+# Avec la même graine, la même base est générée à chaque fois : les mesures de deux versions
+# du code peuvent donc être comparées
+
+VERBES = ("Acheter", "Appeler", "Réviser", "Ranger", "Préparer", "Envoyer", "Payer", "Réparer", "Lire", "Planifier")
+OBJETS = ("les courses", "le dentiste", "le contrôle de maths", "le garage", "la réunion", "le dossier",
+          "la facture", "le vélo", "le livre", "les vacances", "le rapport", "le projet")
+# Poids des priorités (Faible, Moyenne, Haute) et proportion de tâches complétées
+POIDS_PRIORITES = (3, 5, 2)
+PART_COMPLETEES = 0.35
+# Les échéances sont réparties entre 90 jours avant et 180 jours après la date de génération
+JOURS_AVANT = 90
+JOURS_APRES = 180
+
+
+def poids_utilisateurs(nb_utilisateurs, asymetrie = 1.1) :
+    """int, float -> list
+    Renvoie le poids de chaque utilisateur selon une loi de Zipf : quelques utilisateurs ont
+    beaucoup de tâches, la plupart en ont peu"""
+    return [1 / rang ** asymetrie for rang in range(1, nb_utilisateurs + 1)]
+
+
+def generer_taches(ids_utilisateurs, nb_taches, aleatoire, asymetrie = 1.1, taille_lot = 10000) :
+    """list, int, Random, float, int -> generator
+    Génère des lots de lignes prêtes pour SQL_AJOUTER_TACHE, sans tout garder en mémoire"""
+    # La fonction accumulate() calcule les poids cumulés une seule fois pour tous les tirages
+    poids_cumules = list(itertools.accumulate(poids_utilisateurs(len(ids_utilisateurs), asymetrie)))
+    aujourd_hui = date.today()
+    restantes = nb_taches
+    while restantes > 0 :
+        taille = min(taille_lot, restantes)
+        utilisateurs = aleatoire.choices(ids_utilisateurs, cum_weights = poids_cumules, k = taille)
+        priorites = aleatoire.choices(PRIORITES, weights = POIDS_PRIORITES, k = taille)
+        yield [(utilisateur, f"{aleatoire.choice(VERBES)} {aleatoire.choice(OBJETS)}", f"Tâche générée n°{nb_taches - restantes + numero}",
+                (aujourd_hui + timedelta(days = aleatoire.randint(-JOURS_AVANT, JOURS_APRES))).strftime(FORMAT_ISO),
+                aleatoire.random() < PART_COMPLETEES, priorite)
+               for numero, (utilisateur, priorite) in enumerate(zip(utilisateurs, priorites))]
+        restantes -= taille
+
+
+def generer_base(chemin, nb_utilisateurs, nb_taches, graine = 0, asymetrie = 1.1, profil = "performance") :
+    """str, int, int, int, float, str -> Counter
+    Remplit la base de donnée "chemin" (qui devient la base utilisée par noyau) avec des utilisateurs
+    et des tâches synthétiques, et renvoie le nombre de tâches de chaque utilisateur"""
+    configurer_base(chemin, profil)
+    aleatoire = random.Random(graine)
+    connexion = base.connexion()
+    # "with connexion" valide chaque lot en une seule transaction
+    with connexion :
+        connexion.executemany(SQL_NOUVEAU_COMPTE, ((f"utilisateur{numero}", "mdp") for numero in range(nb_utilisateurs)))
+    ids_utilisateurs = [ligne[0] for ligne in connexion.execute("SELECT utilisateur_id FROM utilisateur ORDER BY utilisateur_id")]
+    nombres = Counter()
+    for lot in generer_taches(ids_utilisateurs, nb_taches, aleatoire, asymetrie) :
+        with connexion :
+            connexion.executemany(SQL_AJOUTER_TACHE, lot)
+        nombres.update(ligne[0] for ligne in lot)
+    return nombres
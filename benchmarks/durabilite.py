@@ -0,0 +1,48 @@
+import argparse
+import os
+import tempfile
+import time
+from noyau import (
+    configurer_base, base, nouveau_compte, obtenir_id_utilisateur, ajouter_tache,
+    marquer_tache_complete, supprimer_tache, PRIORITES
+)
+
+# Compare le nombre d'opérations par seconde de chaque mode de durabilité
+# Les opérations sont faites une par une, comme des clics dans l'interface :
+# un tiers d'ajouts, puis la moitié des tâches ajoutées complétées et l'autre moitié supprimée
+
+
+def mesurer(durabilite, profil, operations, dossier) :
+    """str, str, int, str -> float
+    Renvoie le nombre d'opérations par seconde avec la durabilité et le profil donnés"""
+    configurer_base(os.path.join(dossier, f"{durabilite}.db"), profil, durabilite)
+    nouveau_compte("benchmark", "benchmark")
+    base.vider_ecritures()
+    id_utilisateur = obtenir_id_utilisateur("benchmark")
+
+    debut = time.perf_counter()
+    ids = [ajouter_tache(id_utilisateur, f"Tâche {numero}", "", "01-01-2030", PRIORITES[numero % 3])
+           for numero in range(operations // 3)]
+    for numero, tache_id in enumerate(ids) :
+        if numero % 2 :
+            marquer_tache_complete(tache_id)
+        else :
+            supprimer_tache(tache_id)
+    # Les opérations encore en attente font partie de la mesure
+    base.vider_ecritures()
+    duree = time.perf_counter() - debut
+    base.fermer()
+    return 2 * len(ids) / duree
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Mesure le débit des écritures pour chaque mode de durabilité")
+    analyseur.add_argument("--operations", type = int, default = 3000, help = "nombre d'opérations par mode")
+    analyseur.add_argument("--profil", choices = sorted(base.PROFILS), default = "equilibre", help = "profil de performance")
+    arguments = analyseur.parse_args()
+
+    # La fonction TemporaryDirectory() crée un dossier supprimé à la fin du bloc
+    with tempfile.TemporaryDirectory() as dossier :
+        for durabilite in base.DURABILITES :
+            debit = mesurer(durabilite, arguments.profil, arguments.operations, dossier)
+            print(f"{durabilite:<8} {debit:>10.0f} opérations/s")
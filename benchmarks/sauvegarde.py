@@ -0,0 +1,117 @@
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from noyau import base, obtenir_page_taches, ajouter_tache
+from benchmarks.donnees import generer_base
+import sauvegarde
+
+# Mesure la durée d'une sauvegarde et ce qu'elle coûte au thread principal (celui de la fenêtre Tk)
+# Pendant la copie, le thread principal lit la première page de tâches en boucle, comme l'interface,
+# et un second thread ajoute une tâche toutes les 10 ms : on mesure la latence de chaque lecture,
+# le plus long blocage du thread principal et le nombre d'écritures passées pendant la copie.
+# La copie "bloquante" est faite en une seule étape par le thread principal, comme une copie de fichier
+
+
+def grossir_base(octets) :
+    """int -> None
+    Allonge la description de chaque tâche de "octets" caractères, pour atteindre la taille voulue"""
+    if octets > 0 :
+        connexion = base.connexion()
+        with connexion :
+            # hex(randomblob(n)) donne 2n caractères peu compressibles
+            connexion.execute("UPDATE taches SET description = description || hex(randomblob(?))", (octets // 2,))
+        connexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def percentile(valeurs, rang) :
+    """list, float -> float
+    Renvoie le percentile "rang" (entre 0 et 1) d'une liste de valeurs"""
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(rang * len(valeurs)))] if valeurs else 0.0
+
+
+def mesurer(copie, id_utilisateur, en_thread = True) :
+    """function, int, bool -> dict
+    Lance la copie (dans un thread, ou dans le thread principal si en_thread est faux) et mesure
+    les lectures du thread principal et les écritures d'un autre thread pendant qu'elle tourne"""
+    ecritures = 0
+    fin = threading.Event()
+
+    def ecrire() :
+        """None -> None
+        Ajoute une tâche toutes les 10 ms jusqu'à la fin de la copie"""
+        nonlocal ecritures
+        while not fin.is_set() :
+            ajouter_tache(id_utilisateur, "Tâche écrite pendant la sauvegarde", "", "01-01-2030", "Moyenne")
+            ecritures += 1
+            fin.wait(0.01)
+        base.fermer()
+
+    ecrivain = threading.Thread(target = ecrire)
+    ecrivain.start()
+    latences = []
+    debut = time.perf_counter()
+    if en_thread :
+        fil = threading.Thread(target = copie)
+        fil.start()
+        while fil.is_alive() :
+            depart = time.perf_counter()
+            obtenir_page_taches(id_utilisateur, {"racines" : True})
+            latences.append(time.perf_counter() - depart)
+            # Comme la boucle de Tk entre deux évènements
+            time.sleep(0.001)
+        fil.join()
+    else :
+        copie()
+        # Le thread principal n'a rien pu faire d'autre pendant toute la copie
+        latences.append(time.perf_counter() - debut)
+    duree = time.perf_counter() - debut
+    fin.set()
+    ecrivain.join()
+    return {"duree_s" : duree, "lectures" : len(latences), "latence_mediane_ms" : statistics.median(latences) * 1000,
+            "latence_p99_ms" : percentile(latences, 0.99) * 1000, "blocage_max_ms" : max(latences) * 1000,
+            "ecritures" : ecritures}
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Mesure la durée des sauvegardes et le blocage du thread principal")
+    analyseur.add_argument("--taches", type = int, default = 1000000, help = "nombre de tâches générées")
+    analyseur.add_argument("--utilisateurs", type = int, default = 100, help = "nombre d'utilisateurs générés")
+    analyseur.add_argument("--description", type = int, default = 0, help = "caractères ajoutés à chaque description (taille de la base)")
+    analyseur.add_argument("--pages", type = int, nargs = "+", default = [64, sauvegarde.PAGES_PAR_ETAPE, 1024], help = "pages par étape mesurées")
+    arguments = analyseur.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier :
+        chemin = os.path.join(dossier, "sauvegarde.db")
+        nombres = generer_base(chemin, arguments.utilisateurs, arguments.taches)
+        grossir_base(arguments.description)
+        base.fermer()
+        taille = os.path.getsize(chemin)
+        id_max = nombres.most_common(1)[0][0]
+        destination = os.path.join(dossier, "copie.db")
+        instantanes = os.path.join(dossier, "instantanes")
+
+        # La première lecture ouvre la connexion et charge le cache : elle ne fait pas partie des mesures
+        obtenir_page_taches(id_max, {"racines" : True})
+
+        def copier(pages) :
+            """int -> function
+            Renvoie une copie de la base avec "pages" pages par étape"""
+            return lambda : sauvegarde.copier_base(chemin, destination, pages)
+
+        resultats = {"sans sauvegarde" : mesurer(lambda : time.sleep(2), id_max)}
+        resultats["bloquante (1 étape)"] = mesurer(lambda : sauvegarde.copier_base(chemin, destination, -1, 0), id_max, en_thread = False)
+        for pages in arguments.pages :
+            resultats[f"en ligne ({pages} pages)"] = mesurer(copier(pages), id_max)
+        resultats["en ligne + gzip + vérif."] = mesurer(lambda : sauvegarde.sauvegarder(instantanes, compression = True), id_max)
+        taille_gz = sum(os.path.getsize(os.path.join(instantanes, nom)) for nom in os.listdir(instantanes))
+        base.fermer()
+
+    print(f"base de {taille / 1e9:.2f} Go ({arguments.taches} tâches), instantané compressé : {taille_gz / 1e9:.2f} Go")
+    print(f"{'':<26}{'durée (s)':>10}{'lectures':>10}{'médiane':>10}{'p99 (ms)':>10}{'blocage max':>13}{'écritures':>11}")
+    for nom, mesure in resultats.items() :
+        print(f"{nom:<26}{mesure['duree_s']:>10.2f}{mesure['lectures']:>10}{mesure['latence_mediane_ms']:>10.2f}"
+              f"{mesure['latence_p99_ms']:>10.2f}{mesure['blocage_max_ms']:>13.1f}{mesure['ecritures']:>11}")
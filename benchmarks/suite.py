@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from datetime import datetime, date, timedelta
+from unittest.mock import patch
+from noyau import (
+    configurer_base, base, ajouter_tache, obtenir_taches, obtenir_taches_ouvertes, FORMAT_ISO, Planificateur
+)
+from benchmarks.donnees import generer_base
+
+# Mesure les chemins les plus utilisés de MyTaskMate sur une base synthétique
+# Les résultats sont écrits en JSON : deux fichiers obtenus sur deux versions du code
+# se comparent avec l'option --comparer
+# Une mesure est considérée comme une régression si sa médiane augmente de plus de 20 %
+SEUIL_REGRESSION = 1.2
+
+
+def chronometrer(fonction, repetitions) :
+    """function, int -> dict
+    Exécute plusieurs fois une fonction et renvoie les statistiques des durées (en ms)"""
+    durees = []
+    for _ in range(repetitions) :
+        # La fonction perf_counter() donne l'horloge la plus précise disponible
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return {"repetitions" : repetitions, "mediane_ms" : statistics.median(durees), "min_ms" : min(durees), "max_ms" : max(durees)}
+
+
+def mesurer_obtenir_taches(nombres, repetitions) :
+    """Counter, int -> dict
+    Mesure obtenir_taches pour l'utilisateur qui a le plus de tâches, un utilisateur médian et le plus petit"""
+    classes = nombres.most_common()
+    resultats = {}
+    for nom, (id_utilisateur, nb_taches) in (("max", classes[0]), ("median", classes[len(classes) // 2]), ("min", classes[-1])) :
+        mesure = chronometrer(lambda : obtenir_taches(id_utilisateur), repetitions)
+        mesure["taches"] = nb_taches
+        resultats[f"obtenir_taches.{nom}"] = mesure
+    return resultats
+
+
+def mesurer_ajouter_tache(id_utilisateur, nombre) :
+    """int, int -> dict
+    Mesure une boucle d'ajouts de tâches, une transaction validée par tâche comme dans l'interface"""
+    echeance = (date.today() + timedelta(days = 30)).strftime(FORMAT_ISO)
+    mesure = chronometrer(lambda : ajouter_tache(id_utilisateur, "Tâche mesurée", "", echeance, "Moyenne"), nombre)
+    base.vider_ecritures()
+    return {"ajouter_tache" : mesure}
+
+
+def mesurer_planificateur(taches, repetitions) :
+    """list, int -> dict
+    Mesure le chargement des échéances dans le planificateur, puis le temps que met son thread
+    à signaler toutes les tâches si elles sont toutes expirées"""
+    resultats = {"planificateur.charger" : chronometrer(lambda : Planificateur().charger(taches), repetitions)}
+    expirees = [tache.remplacer(echeance = date.today() - timedelta(days = 1)) for tache in taches]
+
+    def expirer() :
+        """None -> None
+        Démarre un planificateur dont toutes les tâches ont expiré et attend qu'il les ait toutes signalées"""
+        planificateur = Planificateur()
+        planificateur.charger(expirees)
+        thread = threading.Thread(target = planificateur.run, daemon = True)
+        thread.start()
+        for _ in expirees :
+            planificateur.evenements.get()
+        planificateur.arreter()
+        thread.join()
+
+    resultats["planificateur.run"] = chronometrer(expirer, repetitions)
+    resultats["planificateur.run"]["taches"] = len(expirees)
+    return resultats
+
+
+class ArbreFactice :
+    """Remplace le ttk.Treeview (et les autres widgets) de VueTaches quand aucune fenêtre ne peut être ouverte
+    Les lignes sont gardées comme Tk le fait : une liste d'enfants par ligne, ce qui permet de mesurer
+    le travail de VueTaches.synchroniser (et les appels faits au Treeview) sans écran"""
+    def __init__(self, *arguments, **options) :
+        self.enfants = {"" : []}
+        self.parents = {}
+        self.options = {}
+
+
+    def insert(self, parent, position, iid, **options) :
+        enfants = self.enfants[parent]
+        enfants.insert(len(enfants) if position == "end" else position, iid)
+        self.enfants[iid] = []
+        self.parents[iid] = parent
+        self.options[iid] = options
+
+
+    def item(self, iid, **options) :
+        self.options[iid].update(options)
+
+
+    def move(self, iid, parent, position) :
+        self.enfants[self.parents[iid]].remove(iid)
+        self.enfants[parent].insert(position, iid)
+        self.parents[iid] = parent
+
+
+    def delete(self, *iids) :
+        for iid in iids :
+            if iid in self.parents :
+                self.delete(*self.enfants[iid])
+                self.enfants[self.parents.pop(iid)].remove(iid)
+                del self.enfants[iid], self.options[iid]
+
+
+    def exists(self, iid) :
+        return iid in self.parents
+
+
+    def get_children(self, iid = "") :
+        return tuple(self.enfants[iid])
+
+
+    def __getattr__(self, nom) :
+        # Les autres méthodes (heading, pack, yview_scroll...) ne changent rien aux lignes
+        return lambda *arguments, **options : None
+
+
+# Module qui remplace ttkbootstrap quand il n'est pas installé
+TTK_FACTICE = types.ModuleType("ttkbootstrap")
+TTK_FACTICE.Frame = TTK_FACTICE.Treeview = TTK_FACTICE.Scrollbar = ArbreFactice
+
+
+def mesurer_synchroniser(interface, id_utilisateur, repetitions) :
+    """module, int, int -> dict
+    Mesure VueTaches.synchroniser sur un ArbreFactice : affichage d'une fenêtre de lignes, défilement d'une page,
+    changement de tri puis modification de quelques lignes, comme dans l'interface"""
+    taille_fenetre = interface.VueTaches.TAILLE_PAGE * interface.VueTaches.FENETRE_PAGES
+    taches = obtenir_taches(id_utilisateur)[:taille_fenetre + interface.VueTaches.TAILLE_PAGE]
+    defilees = taches[interface.VueTaches.TAILLE_PAGE:]
+    triees = sorted(defilees, key = lambda tache : (tache.rang_priorite, tache.tache_id))
+    modifiees = [tache.remplacer(est_completee = 1) if numero % 10 == 0 else tache for numero, tache in enumerate(triees)]
+
+    def synchroniser() :
+        """None -> None
+        Fait passer une vue neuve par toutes les étapes"""
+        # La fonction patch.object() remplace ttk dans le module interface le temps de créer la vue
+        with patch.object(interface, "ttk", TTK_FACTICE) :
+            vue = interface.VueTaches(None)
+        for cible in (taches[:taille_fenetre], defilees, triees, modifiees) :
+            vue.synchroniser(cible)
+
+    mesure = chronometrer(synchroniser, repetitions)
+    mesure["lignes"] = taille_fenetre
+    return mesure
+
+
+def mesurer_interface(id_utilisateur, repetitions) :
+    """int, int -> dict
+    Mesure VueTaches.synchroniser sur un arbre factice (possible sans écran, en intégration continue), puis
+    rafraichir_taches dans une fenêtre Tk cachée, de la demande jusqu'à l'affichage de la première page
+    La seconde mesure est ignorée si l'interface ne peut pas être ouverte (pas d'écran, ttkbootstrap absent)"""
+    # tk n'est défini que si l'import réussit : les deux erreurs sont donc attrapées séparément
+    try :
+        import tkinter as tk
+    except ImportError as erreur :
+        return {"vue.synchroniser" : {"ignoree" : str(erreur)}, "rafraichir_taches" : {"ignoree" : str(erreur)}}
+    try :
+        import ttkbootstrap
+        bootstrap_absent = None
+    except ImportError as erreur :
+        # interface.py s'importe alors avec le module factice, qui ne peut pas ouvrir de fenêtre
+        bootstrap_absent = erreur
+        sys.modules["ttkbootstrap"] = TTK_FACTICE
+        sys.modules["ttkbootstrap.constants"] = types.ModuleType("ttkbootstrap.constants")
+    import interface
+    resultats = {"vue.synchroniser" : mesurer_synchroniser(interface, id_utilisateur, repetitions)}
+    if bootstrap_absent is not None :
+        resultats["rafraichir_taches"] = {"ignoree" : str(bootstrap_absent)}
+        return resultats
+    try :
+        principale = tk.Tk()
+    except tk.TclError as erreur :
+        resultats["rafraichir_taches"] = {"ignoree" : str(erreur)}
+        return resultats
+    principale.withdraw()
+    todolist = interface.Todolist(principale)
+    # Les résultats du travailleur sont relus le plus souvent possible pour ne mesurer que le chargement
+    todolist.INTERVALLE_RESULTATS = 1
+    todolist.utilisateur_actuel = id_utilisateur
+    todolist.montrer_fenetre_principale()
+
+    def rafraichir() :
+        """None -> None
+        Recharge la première page et fait tourner la boucle Tk jusqu'à ce qu'elle soit affichée"""
+        todolist.rafraichir_taches()
+        while todolist.en_attente :
+            principale.update()
+
+    rafraichir()
+    resultats["rafraichir_taches"] = chronometrer(rafraichir, repetitions)
+    todolist.travailleur.arreter()
+    principale.destroy()
+    return resultats
+
+
+def version_code() :
+    """None -> str
+    Renvoie le commit git du code mesuré, ou None hors d'un dépôt git"""
+    try :
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError) :
+        return None
+
+
+def comparer(ancien, nouveau) :
+    """dict, dict -> None
+    Affiche l'évolution de la médiane de chaque mesure présente dans les deux résultats"""
+    if ancien["parametres"] != nouveau["parametres"] :
+        print("Attention : les deux mesures n'ont pas été faites avec les mêmes paramètres")
+    for nom, mesure in nouveau["mesures"].items() :
+        avant = ancien["mesures"].get(nom, {})
+        if "mediane_ms" not in mesure or "mediane_ms" not in avant :
+            continue
+        rapport = mesure["mediane_ms"] / avant["mediane_ms"]
+        alerte = "  <- régression" if rapport > SEUIL_REGRESSION else ""
+        print(f"{nom:<26} {avant['mediane_ms']:>10.3f} ms -> {mesure['mediane_ms']:>10.3f} ms  x{rapport:.2f}{alerte}")
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Mesure les performances de MyTaskMate sur une base synthétique")
+    analyseur.add_argument("--utilisateurs", type = int, default = 1000, help = "nombre d'utilisateurs générés")
+    analyseur.add_argument("--taches", type = int, default = 100000, help = "nombre de tâches générées (de 1e3 à 1e6)")
+    analyseur.add_argument("--graine", type = int, default = 0, help = "graine du générateur aléatoire")
+    analyseur.add_argument("--repetitions", type = int, default = 20, help = "nombre de répétitions de chaque mesure")
+    analyseur.add_argument("--ajouts", type = int, default = 500, help = "nombre de tâches ajoutées par la mesure d'ajout")
+    analyseur.add_argument("--profil", choices = sorted(base.PROFILS), default = "equilibre", help = "profil de performance mesuré")
+    analyseur.add_argument("--sortie", help = "fichier JSON où écrire les résultats")
+    analyseur.add_argument("--comparer", help = "fichier JSON d'une mesure précédente à comparer")
+    arguments = analyseur.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier :
+        debut = time.perf_counter()
+        nombres = generer_base(os.path.join(dossier, "benchmark.db"), arguments.utilisateurs, arguments.taches, arguments.graine)
+        generation = time.perf_counter() - debut
+        # La base est générée avec le profil le plus rapide, puis mesurée avec le profil choisi
+        configurer_base(profil = arguments.profil, durabilite = "strict")
+        id_max = nombres.most_common(1)[0][0]
+
+        mesures = {}
+        mesures.update(mesurer_obtenir_taches(nombres, arguments.repetitions))
+        mesures.update(mesurer_planificateur(obtenir_taches_ouvertes(id_max), arguments.repetitions))
+        mesures.update(mesurer_interface(id_max, arguments.repetitions))
+        # Les ajouts viennent en dernier pour que les autres mesures portent sur la base générée
+        mesures.update(mesurer_ajouter_tache(id_max, arguments.ajouts))
+        base.fermer()
+
+    resultats = {
+        "date" : datetime.now().isoformat(timespec = "seconds"),
+        "commit" : version_code(),
+        "python" : platform.python_version(),
+        "sqlite" : sqlite3.sqlite_version,
+        "parametres" : {cle : valeur for cle, valeur in vars(arguments).items() if cle not in ("sortie", "comparer")},
+        "generation_s" : generation,
+        "mesures" : mesures,
+    }
+    for nom, mesure in mesures.items() :
+        if "mediane_ms" in mesure :
+            print(f"{nom:<26} médiane {mesure['mediane_ms']:>10.3f} ms   min {mesure['min_ms']:>10.3f} ms")
+        else :
+            print(f"{nom:<26} ignorée : {mesure['ignoree']}")
+    if arguments.sortie :
+        with open(arguments.sortie, "w", encoding = "utf-8") as fichier :
+            json.dump(resultats, fichier, indent = 2, ensure_ascii = False)
+    if arguments.comparer :
+        with open(arguments.comparer, encoding = "utf-8") as fichier :
+            comparer(json.load(fichier), resultats)
@@ -0,0 +1,90 @@
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from noyau import (
+    base, executer_taches, date_depuis_iso, RANGS_PRIORITE, FORMAT_ISO, SQL_OBTENIR_TACHES, TRIS
+)
+from benchmarks.donnees import generer_base
+
+# Compare les tuples renvoyés par sqlite3 et les objets Tache (noyau.py) pour toutes les tâches d'un utilisateur :
+# mémoire occupée par la liste lue, durée de la lecture, puis durée des conversions que chaque usage
+# (planificateur, tri par priorité, affichage des échéances) faisait sur les tuples et que Tache fait une seule fois,
+# au premier usage
+
+
+def lire_tuples(id_utilisateur) :
+    """int -> list
+    Lit les tâches comme avant Tache, en tuples"""
+    return base.executer(SQL_OBTENIR_TACHES, (id_utilisateur,)).fetchall()
+
+
+def lire_taches(id_utilisateur) :
+    """int -> list
+    Lit les tâches en objets Tache"""
+    return executer_taches(SQL_OBTENIR_TACHES, (id_utilisateur,)).fetchall()
+
+
+def memoire(lecture, id_utilisateur) :
+    """function, int -> int
+    Renvoie le nombre d'octets alloués pour garder la liste des tâches lues"""
+    gc.collect()
+    tracemalloc.start()
+    taches = lecture(id_utilisateur)
+    taille = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del taches
+    return taille
+
+
+def duree(fonction, repetitions, preparation = None) :
+    """function, int, function -> float
+    Renvoie la meilleure durée (en ms) de plusieurs exécutions d'une fonction
+    Si "preparation" est donnée, elle est appelée (hors mesure) avant chaque exécution et son résultat passé à la fonction"""
+    meilleure = float("inf")
+    for _ in range(repetitions) :
+        donnees = preparation() if preparation is not None else None
+        debut = time.perf_counter()
+        fonction(donnees) if preparation is not None else fonction()
+        meilleure = min(meilleure, time.perf_counter() - debut)
+    return meilleure * 1000
+
+
+def mesurer(id_utilisateur, repetitions) :
+    """int, int -> dict
+    Mesure chaque usage sur des tuples puis sur des Tache, et renvoie les paires de résultats"""
+    tuples, taches = lire_tuples(id_utilisateur), lire_taches(id_utilisateur)
+    return {
+        "mémoire (Mo)" : (memoire(lire_tuples, id_utilisateur) / 1e6, memoire(lire_taches, id_utilisateur) / 1e6),
+        "lecture (ms)" : (duree(lambda : lire_tuples(id_utilisateur), repetitions), duree(lambda : lire_taches(id_utilisateur), repetitions)),
+        # Tache garde l'échéance convertie : chaque essai lit des tâches neuves pour mesurer aussi la première conversion
+        "échéances du planificateur (ms)" : (
+            duree(lambda : [datetime.strptime(tache[4], FORMAT_ISO) for tache in tuples], repetitions),
+            duree(lambda neuves : [datetime.combine(tache.echeance, datetime.min.time()) for tache in neuves], repetitions,
+                  lambda : lire_taches(id_utilisateur))),
+        "tri par priorité (ms)" : (
+            duree(lambda : sorted(tuples, key = lambda tache : (RANGS_PRIORITE[tache[6]], tache[4], tache[0])), repetitions),
+            duree(lambda : sorted(taches, key = TRIS["priorite"][1]), repetitions)),
+        "échéances affichées (ms)" : (
+            duree(lambda : [date_depuis_iso(tache[4]) for tache in tuples], repetitions),
+            duree(lambda neuves : [tache.echeance_saisie for tache in neuves], repetitions, lambda : lire_taches(id_utilisateur))),
+    }
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Compare les tâches en tuples et en objets Tache")
+    analyseur.add_argument("--taches", type = int, default = 100000, help = "nombre de tâches de l'utilisateur mesuré")
+    analyseur.add_argument("--repetitions", type = int, default = 5, help = "nombre de répétitions de chaque mesure")
+    arguments = analyseur.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier :
+        nombres = generer_base(os.path.join(dossier, "taches.db"), 1, arguments.taches)
+        resultats = mesurer(nombres.most_common(1)[0][0], arguments.repetitions)
+        base.fermer()
+
+    print(f"{arguments.taches} tâches{'tuples':>30}{'Tache':>12}")
+    for nom, (avant, apres) in resultats.items() :
+        print(f"{nom:<36}{avant:>12.1f}{apres:>12.1f}")
@@ -0,0 +1,84 @@
+import argparse
+import csv
+import gzip
+import json
+from noyau import iterer_taches, obtenir_id_utilisateur
+
+# Export des tâches d'un utilisateur vers un fichier CSV ou NDJSON, éventuellement compressé (.gz)
+# Les tâches sont lues et écrites une par une : la mémoire utilisée reste la même quel que soit
+# le nombre de tâches. Les fichiers produits (compressés ou non) peuvent être relus par importation.py,
+# qui lit les mêmes colonnes, est_completee comprise
+
+CHAMPS = ("tache", "description", "echeance", "priorite", "est_completee")
+
+
+def ligne_export(tache) :
+    """Tache -> dict
+    Convertit une tâche de la base de donnée en ligne d'export (échéance au format JJ-MM-AAAA)"""
+    return {"tache" : tache.nom,
+            "description" : tache.description,
+            "echeance" : tache.echeance_saisie,
+            "priorite" : tache.priorite,
+            "est_completee" : bool(tache.est_completee)}
+
+
+def ecrire_csv(fichier, taches) :
+    """file, iterable -> int
+    Écrit les tâches au format CSV et renvoie leur nombre"""
+    # La classe DictWriter écrit des dictionnaires dont les clés sont les noms de colonnes
+    ecrivain = csv.DictWriter(fichier, fieldnames = CHAMPS)
+    ecrivain.writeheader()
+    nombre = 0
+    for tache in taches :
+        ecrivain.writerow(ligne_export(tache))
+        nombre += 1
+    return nombre
+
+
+def ecrire_ndjson(fichier, taches) :
+    """file, iterable -> int
+    Écrit les tâches au format NDJSON (un objet JSON par ligne) et renvoie leur nombre"""
+    nombre = 0
+    for tache in taches :
+        fichier.write(json.dumps(ligne_export(tache), ensure_ascii = False))
+        fichier.write("\n")
+        nombre += 1
+    return nombre
+
+
+ECRIVAINS = {"csv" : ecrire_csv, "ndjson" : ecrire_ndjson}
+
+
+def exporter(id_utilisateur, chemin, format_fichier = None, compresser = None, taille_lot = 500) :
+    """int, str, str, bool, int -> int
+    Exporte les tâches d'un utilisateur dans un fichier et renvoie le nombre de tâches écrites
+    Par défaut, le format et la compression sont déduits de l'extension (.csv, .ndjson, .gz)"""
+    nom = chemin.lower()
+    if compresser is None :
+        compresser = nom.endswith(".gz")
+    if nom.endswith(".gz") :
+        nom = nom[:-3]
+    if format_fichier is None :
+        format_fichier = "csv" if nom.endswith(".csv") else "ndjson"
+    ecrivain = ECRIVAINS[format_fichier]
+
+    # La fonction gzip.open() compresse au fil de l'écriture, sans garder le fichier en mémoire
+    ouvrir = gzip.open if compresser else open
+    with ouvrir(chemin, "wt", encoding = "utf-8", newline = "") as fichier :
+        return ecrivain(fichier, iterer_taches(id_utilisateur, taille_lot))
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Exporte les tâches d'un utilisateur vers un fichier CSV ou NDJSON")
+    analyseur.add_argument("identifiant", help = "identifiant de l'utilisateur")
+    analyseur.add_argument("fichier", help = "fichier à créer (.csv, .ndjson, éventuellement suivi de .gz)")
+    analyseur.add_argument("--format", choices = sorted(ECRIVAINS), dest = "format_fichier", help = "format du fichier (déduit de l'extension par défaut)")
+    analyseur.add_argument("--gzip", action = "store_true", default = None, help = "compresser le fichier avec gzip")
+    analyseur.add_argument("--lot", type = int, default = 500, help = "nombre de tâches lues à la fois")
+    arguments = analyseur.parse_args()
+
+    id_utilisateur = obtenir_id_utilisateur(arguments.identifiant)
+    if id_utilisateur is None :
+        analyseur.error(f"L'utilisateur {arguments.identifiant} n'existe pas")
+    nombre = exporter(id_utilisateur, arguments.fichier, arguments.format_fichier, arguments.gzip, arguments.lot)
+    print(f"{nombre} tâches exportées dans {arguments.fichier}")
@@ -1,11 +1,31 @@
 
 import sqlite3
 from mytaskmate import (
-    nouveau_compte, se_connecter, ajouter_tache, obtenir_taches,
-    marquer_tache_complete, supprimer_tache, Planificateur, Todolist
+    configurer_base, nouveau_compte, se_connecter, obtenir_id_utilisateur, ajouter_tache, ajouter_taches,
+    obtenir_taches, obtenir_page_taches, PRIORITES, marquer_tache_complete, supprimer_tache, maj_tache,
+    rechercher_taches, obtenir_compteurs, ajouter_recurrence, obtenir_recurrences, obtenir_occurrences,
+    obtenir_occurrences_materialisees, completer_occurrence, archiver_taches, obtenir_taches_archivees,
+    obtenir_sous_arbre, activer_vacuum_incremental, Planificateur, Tache, Todolist, VueTaches
 )
+from noyau import base, BaseDonnees, conditions_filtres, TRIS, SQL_OBTENIR_TACHES, SQL_AJOUTER_TACHE
+from instrumentation import mesures, CurseurMesure
+from synchronisation import synchroniser, appliquer_lot
+from importation import importer
+from exportation import exporter
+from sauvegarde import sauvegarder, verifier_sauvegarde, faire_tourner
+from serveur_synchronisation import creer_serveur
+from serveur_api import ServeurApi
+import threading
+import asyncio
+import concurrent.futures
+import http.client
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
 import tkinter as tk
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 # IMPORTANT: Vérifier de pas avoir de base de données avant d'éxécuter ce fichier
 
@@ -39,13 +59,32 @@ CREATE TABLE IF NOT EXISTS taches (
 ''')
 conn.commit()
 
+# Les fonctions de mytaskmate utilisent la base de test au lieu de todolist.db
+configurer_base(test_db)
+
 def test_fonctions():
     print("Début des tests")
     
     # Test Planificateur
     planificateur = Planificateur()
-    planificateur.ajouter_tache([1, "Test", "Desc", "2025-03-01", False, "Moyenne"])
+    planificateur.ajouter_tache((1, 1, "Test", "Desc", "2025-03-01", False, "Moyenne"))
     assert len(planificateur.taches) == 1
+    planificateur.annuler(1)
+    assert len(planificateur.taches) == 0
+    # Une échéance illisible n'est pas planifiée, et retire l'ancienne échéance de la tâche
+    planificateur.ajouter_tache((1, 1, "Test", "Desc", "2025-03-01", False, "Moyenne"))
+    planificateur.replanifier((1, 1, "Test", "Desc", "pas une date", False, "Moyenne"))
+    planificateur.ajouter_tache((4, 1, "Illisible", "", "01/03/2025", False, "Moyenne"))
+    assert len(planificateur.taches) == 0 and all(entree[2] is None for entree in planificateur.tas)
+    # Une tâche dont l'échéance est aujourd'hui n'est pas encore en retard (comme pour le filtre "En retard")
+    planificateur.ajouter_tache((2, 1, "Hier", "", (date.today() - timedelta(days = 1)).isoformat(), False, "Moyenne"))
+    planificateur.ajouter_tache((3, 1, "Aujourd'hui", "", date.today().isoformat(), False, "Moyenne"))
+    fil_planificateur = threading.Thread(target = planificateur.run, daemon = True)
+    fil_planificateur.start()
+    assert planificateur.evenements.get(timeout = 5).tache_id == 2
+    planificateur.arreter()
+    fil_planificateur.join()
+    assert planificateur.nb_expirees() == 1 and planificateur.taches[3][0] > datetime.now()
     print("Planificateur fonctionne")
     
     # Création d'un compte
@@ -61,11 +100,17 @@ def test_fonctions():
     ajouter_tache(user_id, 'Faire les courses', 'Acheter du lait', '2025-03-01', 'Moyenne')
     taches = obtenir_taches(user_id)
     assert len(taches) > 0
+    assert taches[0].echeance == date(2025, 3, 1) and taches[0].rang_priorite == 1
+    assert taches[0][4] == '2025-03-01' and taches[0][6] == 'Moyenne'
     print("Tâche ajoutée")
     
+    assert obtenir_compteurs(user_id)["ouvertes"] == 1
+    
     # Marquer comme complétée
-    tache_id = taches[0][0]
+    tache_id = taches[0].tache_id
     marquer_tache_complete(tache_id)
+    compteurs = obtenir_compteurs(user_id)
+    assert compteurs["ouvertes"] == 0 and compteurs["completees"] == 1
     print("Tâche complétée")
     
     # Suppression de la tâche
@@ -73,6 +118,302 @@ def test_fonctions():
     assert len(obtenir_taches(user_id)) == 0
     print("Tâche supprimée")
     
+    # Recherche plein texte : nom et description, début de mot, sans accents, tâches de l'utilisateur seulement
+    assert nouveau_compte('voisin', 'password')
+    voisin_id = obtenir_id_utilisateur('voisin')
+    ajouter_tache(user_id, 'Réserver le restaurant', 'Table pour quatre', '2025-03-01', 'Faible')
+    ajouter_tache(user_id, 'Appeler le plombier', 'Fuite sous l\'évier', '2025-03-02', 'Haute')
+    ajouter_tache(voisin_id, 'Réserver le train', '', '2025-03-01', 'Faible')
+    restaurant, plombier = obtenir_taches(user_id)
+    assert rechercher_taches(user_id, 'restaurant') == [restaurant]
+    assert rechercher_taches(user_id, 'fuite') == [plombier]
+    assert rechercher_taches(user_id, 'plomb') == [plombier]
+    assert rechercher_taches(user_id, 'evier') == [plombier]
+    assert rechercher_taches(user_id, 'reserver') == [restaurant]
+    assert [tache.nom for tache in rechercher_taches(voisin_id, 'reserver')] == ['Réserver le train']
+    assert rechercher_taches(user_id, '"*(') == []
+    maj_tache(restaurant.tache_id, 'Réserver le cinéma', 'Deux places', '01-03-2025', 'Faible')
+    assert rechercher_taches(user_id, 'restaurant') == [] and len(rechercher_taches(user_id, 'cinema')) == 1
+    supprimer_tache(plombier.tache_id)
+    supprimer_tache(restaurant.tache_id)
+    assert rechercher_taches(user_id, 'plombier') == [] and rechercher_taches(user_id, 'reserver') == []
+    print("Recherche réussie")
+    
+    # Pagination par clé : pour chaque tri et chaque filtre, les pages mises bout à bout donnent exactement
+    # le résultat de l'ORDER BY complet, malgré les échéances et priorités en double
+    assert nouveau_compte('pages', 'password')
+    pages_id = obtenir_id_utilisateur('pages')
+    ajouter_taches(pages_id, ((f'Tâche {i}', '', f'2025-03-0{i % 3 + 1}', PRIORITES[i % 3], i % 4 == 0) for i in range(57)))
+    for tri, (colonnes, cle_tri) in TRIS.items():
+        for filtres in ({}, {'completee': False}, {'priorites': ['Haute', 'Faible']}, {'debut': '02-03-2025'}):
+            conditions, parametres = conditions_filtres(filtres)
+            attendues = [ligne[0] for ligne in base.executer(f"SELECT tache_id FROM taches WHERE utilisateur_id = ?{conditions} "
+                                                             f"ORDER BY {', '.join(colonnes)}", [pages_id] + parametres)]
+            lues, curseur = obtenir_page_taches(pages_id, filtres, tri, None, 7)
+            while curseur is not None:
+                page, curseur = obtenir_page_taches(pages_id, filtres, tri, curseur, 7)
+                assert 0 < len(page) <= 7
+                lues += page
+            assert [tache.tache_id for tache in lues] == attendues and len(set(attendues)) == len(attendues)
+            assert sorted(lues, key = cle_tri) == lues
+    print("Pagination réussie")
+    
+    # Import : les lignes valides sont importées, chaque ligne invalide est comptée avec son numéro
+    assert nouveau_compte('import', 'password')
+    import_id = obtenir_id_utilisateur('import')
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, 'taches.ndjson')
+        with open(chemin, 'w', encoding = 'utf-8') as fichier:
+            fichier.write('{"tache": "Valide", "description": "", "echeance": "01-03-2025", "priorite": "Haute"}\n'
+                          '{"tache": "JSON coupé", \n'
+                          '\n'
+                          '{"tache": 5, "description": "", "echeance": "01-03-2025", "priorite": "Haute"}\n'
+                          '{"tache": "Liste", "description": ["a"], "echeance": "01-03-2025", "priorite": "Haute"}\n'
+                          '{"tache": "Priorité", "echeance": "01-03-2025", "priorite": "Urgente"}\n'
+                          '{"tache": "Date", "echeance": "31-02-2025", "priorite": "Faible"}\n'
+                          '{"tache": "Complétée", "echeance": "01-03-2025", "priorite": "Faible", "est_completee": 1}\n'
+                          '[1, 2]\n'
+                          '{"tache": "Faite", "echeance": "02-03-2025", "priorite": "Faible", "est_completee": true}\n')
+        rapport = importer(import_id, chemin, taille_lot = 2)
+        assert rapport.importees == 2 and rapport.nb_erreurs == 7
+        assert [numero for numero, message in rapport.erreurs] == [2, 4, 5, 6, 7, 8, 9]
+        chemin = os.path.join(dossier, 'taches.csv')
+        with open(chemin, 'w', encoding = 'utf-8', newline = '') as fichier:
+            fichier.write('tache,description,echeance,priorite\n"Virgule, et ""guillemets""","Sur\ndeux lignes",03-03-2025,Moyenne\n'
+                          ',,03-03-2025,Moyenne\n')
+        rapport = importer(import_id, chemin)
+        assert rapport.importees == 1 and rapport.erreurs == [(4, "Le nom de la tâche est vide")]
+    assert [(tache.nom, tache.est_completee) for tache in obtenir_taches(import_id)] == \
+        [('Valide', 0), ('Virgule, et "guillemets"', 0), ('Faite', 1)]
+    print("Import réussi")
+
+    # Export puis réimport : chaque format (compressé ou non) rend les mêmes tâches, complétées comprises
+    def contenu(id_utilisateur):
+        return [(tache.nom, tache.description, tache.echeance_iso, tache.priorite, bool(tache.est_completee))
+                for tache in obtenir_taches(id_utilisateur)]
+    ajouter_tache(import_id, 'Accents : é, ü, 漢字', 'Tabulation\tet ; point-virgule', '2025-03-04', 'Haute')
+    with tempfile.TemporaryDirectory() as dossier:
+        for extension in ('csv', 'ndjson', 'csv.gz', 'ndjson.gz'):
+            chemin = os.path.join(dossier, 'export.' + extension)
+            assert exporter(import_id, chemin, taille_lot = 2) == 4
+            assert nouveau_compte('reimport ' + extension, 'password')
+            reimport_id = obtenir_id_utilisateur('reimport ' + extension)
+            rapport = importer(reimport_id, chemin)
+            assert rapport.importees == 4 and rapport.nb_erreurs == 0
+            assert contenu(reimport_id) == contenu(import_id)
+    print("Export réussi")
+
+    # Durabilité groupée : les opérations validées ne sont écrites qu'ensemble, mais aucune n'est perdue
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, 'durabilite.db')
+        groupee = BaseDonnees(chemin, durabilite = 'groupe')
+        # Une autre connexion ne voit que ce qui a été enregistré sur le disque
+        lecteur = sqlite3.connect(chemin)
+        def enregistres():
+            return [ligne[0] for ligne in lecteur.execute("SELECT identifiant FROM utilisateur ORDER BY utilisateur_id")]
+        def creer(identifiant, base_donnees = groupee):
+            base_donnees.executer("INSERT INTO utilisateur (identifiant, mdp) VALUES (?, '')", (identifiant,))
+        creer('a')
+        groupee.valider()
+        creer('b')
+        groupee.annuler()
+        creer('c')
+        groupee.valider()
+        assert enregistres() == [] and groupee.delai_restant() is not None
+        # Une annulation dans le lot ne défait que sa propre opération
+        groupee.vider_ecritures()
+        assert enregistres() == ['a', 'c'] and groupee.delai_restant() is None
+        # Le lot est enregistré dès que son délai est dépassé...
+        creer('d')
+        groupee.valider()
+        time.sleep(groupee.DURABILITES['groupe'][1])
+        creer('e')
+        groupee.valider()
+        assert enregistres() == ['a', 'c', 'd', 'e']
+        # ... ou à la fermeture de la connexion
+        creer('f')
+        groupee.valider()
+        groupee.fermer()
+        assert enregistres() == ['a', 'c', 'd', 'e', 'f']
+        # En mode relaché, le lot est enregistré dès qu'il atteint sa taille
+        relachee = BaseDonnees(chemin, durabilite = 'relache')
+        lot_max = relachee.DURABILITES['relache'][0]
+        for i in range(lot_max - 1):
+            creer(f'lot {i}', relachee)
+            relachee.valider()
+        assert len(enregistres()) == 5
+        creer('dernier', relachee)
+        relachee.valider()
+        assert len(enregistres()) == 5 + lot_max and relachee.delai_restant() is None
+        relachee.fermer()
+        lecteur.close()
+    print("Durabilité groupée vérifiée")
+    
+    # Synchronisation : après la première, seule la tâche modifiée est envoyée
+    serveur = creer_serveur(port = 0)
+    threading.Thread(target = serveur.serve_forever, daemon = True).start()
+    adresse = f"http://127.0.0.1:{serveur.server_address[1]}"
+    for i in range(200):
+        ajouter_tache(user_id, f'Tâche {i}', 'Description', '2025-03-01', 'Faible')
+    premiere = synchroniser(adresse, 'testuser', user_id)
+    assert premiere.envoyees >= 200
+    marquer_tache_complete(obtenir_taches(user_id)[0].tache_id)
+    seconde = synchroniser(adresse, 'testuser', user_id)
+    assert seconde.envoyees == 1 and seconde.recues == 0
+    assert seconde.octets_envoyes * 10 < premiere.octets_envoyes
+    serveur.shutdown()
+    # Une sous-tâche reçue avant sa parente lui est rattachée à son arrivée, et part avec elle
+    def distante(uid, parent_uid, version = 1, supprimee = False):
+        donnees = {'tache': uid, 'description': '', 'echeance': '2025-03-01', 'est_completee': False,
+                   'priorite': 'Faible', 'parent_uid': parent_uid}
+        return {'uid': uid, 'version': version, 'modifie_le': '2025-03-01T00:00:00Z', 'appareil': 'autre',
+                'donnees': None if supprimee else donnees}
+    nb_taches = len(obtenir_taches(user_id))
+    appliquer_lot(base.connexion(), user_id, [distante('enfant', 'parente')])
+    appliquer_lot(base.connexion(), user_id, [distante('parente', None)])
+    parente, enfant = (cursor.execute("SELECT tache_id, parent_id FROM taches WHERE uid = ?", (uid,)).fetchone() for uid in ('parente', 'enfant'))
+    assert enfant[1] == parente[0]
+    assert [(tache.nom, profondeur) for tache, profondeur in obtenir_sous_arbre(parente[0])] == [('enfant', 1)]
+    appliquer_lot(base.connexion(), user_id, [distante('parente', None, 2, True)])
+    assert len(obtenir_taches(user_id)) == nb_taches
+    print("Synchronisation réussie")
+
+    # Serveur HTTP/JSON : la boucle asyncio tourne dans un thread, les requêtes sont envoyées comme par un client
+    api = ServeurApi(lecteurs = 2).demarrer()
+    boucle = asyncio.new_event_loop()
+    fil_boucle = threading.Thread(target = boucle.run_forever, daemon = True)
+    fil_boucle.start()
+    port_pret = threading.Event()
+    service = asyncio.run_coroutine_threadsafe(api.servir(port = 0, pret = lambda port: (setattr(port_pret, 'port', port), port_pret.set())), boucle)
+    assert port_pret.wait(5)
+    client = http.client.HTTPConnection('127.0.0.1', port_pret.port, timeout = 5)
+    def requete(methode, adresse, donnees = None, jeton = None):
+        entetes = {'Authorization': f'Bearer {jeton}'} if jeton else {}
+        client.request(methode, adresse, None if donnees is None else json.dumps(donnees), entetes)
+        reponse = client.getresponse()
+        corps = reponse.read()
+        return reponse.status, json.loads(corps) if corps else None, reponse
+    assert requete('POST', '/comptes', {'identifiant': 'api', 'mot_de_passe': 'secret'})[0] == 201
+    assert requete('POST', '/comptes', {'identifiant': 'api', 'mot_de_passe': 'autre'})[0] == 409
+    assert requete('POST', '/comptes', {'identifiant': 'intrus', 'mot_de_passe': 'secret'})[0] == 201
+    assert requete('POST', '/sessions', {'identifiant': 'api', 'mot_de_passe': 'faux'})[0] == 401
+    statut, session_api, _ = requete('POST', '/sessions', {'identifiant': 'api', 'mot_de_passe': 'secret'})
+    jeton = session_api['jeton']
+    jeton_intrus = requete('POST', '/sessions', {'identifiant': 'intrus', 'mot_de_passe': 'secret'})[1]['jeton']
+    assert statut == 201 and requete('GET', '/taches')[0] == 401 and requete('GET', '/taches', jeton = 'inconnu')[0] == 401
+    statut, creee, _ = requete('POST', '/taches', {'tache': 'Par l\'API', 'description': 'Ligne « JSON »',
+                                                    'echeance': '01-03-2025', 'priorite': 'Haute'}, jeton)
+    assert statut == 201
+    assert requete('POST', '/taches', {'tache': 'Mauvaise date', 'description': '', 'echeance': '31-02-2025', 'priorite': 'Haute'}, jeton)[0] == 400
+    assert requete('POST', '/taches', {'tache': 'Sans priorité'}, jeton)[0] == 400
+    statut, taches_api, _ = requete('GET', '/taches', jeton = jeton)
+    assert statut == 200 and [(tache['tache_id'], tache['tache'], tache['est_completee']) for tache in taches_api] == \
+        [(creee['tache_id'], 'Par l\'API', False)]
+    # Un autre utilisateur ne peut ni compléter ni supprimer la tâche : elle n'existe pas pour lui
+    assert requete('GET', '/taches', jeton = jeton_intrus)[1] == []
+    assert requete('POST', f"/taches/{creee['tache_id']}/completee", jeton = jeton_intrus)[0] == 404
+    assert requete('DELETE', f"/taches/{creee['tache_id']}", jeton = jeton_intrus)[0] == 404
+    assert requete('POST', f"/taches/{creee['tache_id']}/completee", jeton = jeton)[0] == 204
+    assert requete('GET', '/taches', jeton = jeton)[1][0]['est_completee'] is True
+    # Au-delà de la limite de requêtes en cours, le client est prié de réessayer plus tard
+    api.limite = 0
+    statut, erreur, reponse = requete('GET', '/taches', jeton = jeton)
+    assert statut == 503 and reponse.getheader('Retry-After') == '1'
+    api.limite = 64
+    assert requete('DELETE', f"/taches/{creee['tache_id']}", jeton = jeton)[:2] == (200, {'supprimees': [creee['tache_id']]})
+    assert requete('GET', '/taches', jeton = jeton)[1] == []
+    assert requete('PUT', '/taches', jeton = jeton)[0] == 405
+    assert requete('DELETE', '/sessions', jeton = jeton)[0] == 204 and requete('GET', '/taches', jeton = jeton)[0] == 401
+    client.close()
+    # La boucle n'est arrêtée qu'une fois le serveur fermé
+    service.cancel()
+    concurrent.futures.wait([service], 5)
+    boucle.call_soon_threadsafe(boucle.stop)
+    fil_boucle.join()
+    boucle.close()
+    api.arreter()
+    print("Serveur API vérifié")
+    
+    # Tâche répétée : les occurrences sont calculées, seule celle complétée est enregistrée
+    nb_taches = len(obtenir_taches(user_id))
+    ajouter_recurrence(user_id, 'Sortir les poubelles', '', '05-01-2025', 'Faible', 'quotidienne')
+    occurrences = obtenir_occurrences(user_id, 6)
+    assert len(occurrences) == 7
+    completer_occurrence(occurrences[0][0])
+    assert len(obtenir_taches(user_id)) == nb_taches + 1
+    assert [occurrence[0] for occurrence in obtenir_occurrences(user_id, 6)] == [occurrence[0] for occurrence in occurrences[1:]]
+    # À la connexion suivante, l'occurrence complétée n'est pas replanifiée (elle expirerait tout de suite)
+    planificateur = Planificateur()
+    planificateur.charger_recurrences(obtenir_recurrences(user_id), materialisees = obtenir_occurrences_materialisees(user_id, date.today()))
+    assert list(planificateur.taches) == [occurrences[1][0]]
+    fil_planificateur = threading.Thread(target = planificateur.run, daemon = True)
+    fil_planificateur.start()
+    # Laisse au thread le temps de signaler une occurrence expirée
+    fil_planificateur.join(0.2)
+    planificateur.arreter()
+    fil_planificateur.join()
+    assert planificateur.evenements.empty() and planificateur.nb_expirees() == 0
+    print("Tâche répétée ajoutée")
+    
+    # Archivage : la tâche complétée quitte la liste mais reste lisible dans l'archive
+    # (l'occurrence complétée du jour n'est pas encore passée, elle n'est pas archivée)
+    nb_taches = len(obtenir_taches(user_id))
+    assert archiver_taches(user_id, jours = 0) == 1
+    assert len(obtenir_taches(user_id)) == nb_taches - 1
+    archivees, suite = obtenir_taches_archivees(user_id)
+    assert len(archivees) == 1 and archivees[0].est_completee and suite is None
+    # La base de test a été créée sans auto_vacuum : elle n'est convertie que sur demande, jamais par l'archivage
+    assert activer_vacuum_incremental() and not activer_vacuum_incremental()
+    print("Tâche archivée")
+    
+    # Sauvegarde en ligne : l'instantané (base et archive) est compressé puis vérifié
+    with tempfile.TemporaryDirectory() as dossier:
+        rapport = sauvegarder(dossier, compression = True)
+        assert rapport.verifiee and len(rapport.fichiers) == 2
+        assert all(os.path.exists(fichier) and verifier_sauvegarde(fichier) for fichier in rapport.fichiers)
+        # Deux sauvegardes lancées dans la même seconde donnent deux instantanés distincts
+        suivant = sauvegarder(dossier, verification = False)
+        assert faire_tourner(dossier, 1) == rapport.fichiers
+        assert faire_tourner(dossier, 0) == suivant.fichiers
+    print("Base sauvegardée")
+
+    # Mesures : désactivées, les connexions ne sont pas instrumentées et rien n'est compté
+    mesures.vider()
+    assert not mesures.actif and type(base.curseur()) is sqlite3.Cursor
+    obtenir_taches(user_id)
+    assert mesures.instantane()['requetes'] == {} and mesures.instantane()['executions'] == {}
+    # Activées, chaque requête est comptée avec ses lignes
+    mesures.activer()
+    nb_taches = len(obtenir_taches(user_id))
+    obtenir_taches(user_id)
+    ajouter_tache(user_id, 'Mesurée', '', '2025-03-01', 'Faible')
+    mesures.mesurer(obtenir_taches, 'lister')(user_id)
+    mesures.compter('essai', 2)
+    assert isinstance(base.curseur(), CurseurMesure)
+    instantane = mesures.instantane()
+    lecture = instantane['requetes'][SQL_OBTENIR_TACHES]
+    assert lecture['duree']['total'] == 3 and lecture['lignes'] == 3 * nb_taches + 1
+    assert instantane['requetes'][SQL_AJOUTER_TACHE]['lignes'] == 1
+    assert instantane['executions']['SELECT'] >= 3 and instantane['executions']['INSERT'] >= 1
+    assert instantane['fonctions']['lister']['total'] == 1 and instantane['compteurs'] == {'essai': 2}
+    prometheus = mesures.en_prometheus()
+    assert 'mytaskmate_evenements_total{nom="essai"} 2\n' in prometheus
+    assert 'mytaskmate_fonction_duree_secondes_count{fonction="lister"} 1\n' in prometheus
+    assert 'mytaskmate_sqlite_executions_total{type="INSERT"}' in prometheus
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, 'mesures.json')
+        mesures.ecrire(chemin)
+        with open(chemin, encoding = 'utf-8') as fichier:
+            assert json.load(fichier)['compteurs'] == {'essai': 2}
+        mesures.ecrire(os.path.join(dossier, 'mesures.prom'))
+        assert sorted(os.listdir(dossier)) == ['mesures.json', 'mesures.prom']
+    # Désactivées à nouveau, les fonctions de suivi de sqlite3 sont retirées de la connexion
+    mesures.desactiver()
+    mesures.vider()
+    obtenir_taches(user_id)
+    assert type(base.curseur()) is sqlite3.Cursor and mesures.instantane()['executions'] == {}
+    print("Mesures vérifiées")
+    
     # Tests sur Todolist avec mocks
     root = tk.Tk()
     root.withdraw()  
@@ -80,6 +421,44 @@ def test_fonctions():
     assert mytaskmate.utilisateur_actuel is None
     print("Todolist instanciée")
     
+    # Modification d'une tâche : une seule requête UPDATE, la liste n'est pas relue
+    mytaskmate.utilisateur_actuel = user_id
+    mytaskmate.montrer_fenetre_principale()
+    while mytaskmate.en_attente:
+        root.update()
+    tache = mytaskmate.cache_taches.taches[0]
+    mytaskmate.executer = MagicMock(wraps = mytaskmate.executer)
+    mytaskmate.enregistrer_modification(tache.tache_id, 'Tâche modifiée', 'Nouvelle description', '15-02-2025', 'Haute')
+    while mytaskmate.en_attente:
+        root.update()
+    assert [appel.args[0].__name__ for appel in mytaskmate.executer.call_args_list] == ['maj_tache', 'obtenir_compteurs']
+    assert mytaskmate.vue_taches.arbre.item(str(tache.tache_id), 'text') == 'Tâche modifiée'
+    assert mytaskmate.planificateur.taches[tache.tache_id][0] == datetime(2025, 2, 16)
+    modifiee = [t for t in obtenir_taches(user_id) if t.tache_id == tache.tache_id][0]
+    assert modifiee.nom == 'Tâche modifiée' and modifiee.priorite == 'Haute'
+    print("Tâche modifiée")
+    
+    # Liste fenêtrée : en faisant défiler 1000 tâches, le Treeview ne garde jamais plus de FENETRE_PAGES pages
+    vue = VueTaches(root)
+    lignes = [Tache(i, user_id, f'Tâche {i}', '', '2025-03-01', 0, 'Faible') for i in range(1, 1001)]
+    vue.afficher(lignes, depuis_le_debut = True)
+    for _ in range(12):
+        vue.afficher_suite()
+        assert len(vue.arbre.get_children()) <= VueTaches.FENETRE_PAGES * VueTaches.TAILLE_PAGE
+    assert vue.arbre.get_children()[-1] == '1000' and len(vue.rendu) == len(vue.ordre)
+    while vue.debut > 0:
+        vue.afficher_precedente()
+    assert list(vue.arbre.get_children()) == [str(i) for i in range(1, len(vue.ordre) + 1)]
+    print("Liste fenêtrée")
+    
+    # Tâches expirées : un seul avertissement pour toutes les tâches lues dans la file
+    for t in mytaskmate.cache_taches.taches[:3]:
+        mytaskmate.planificateur.evenements.put(t)
+    with patch('interface.messagebox.showwarning') as avertissement:
+        mytaskmate.verifier_expirations()
+    assert avertissement.call_count == 1 and mytaskmate.planificateur.evenements.empty()
+    print("Tâches expirées signalées")
+    
     # Mock des méthodes de Todolist pour tester leurs appels
     mytaskmate.connexion = MagicMock()
     mytaskmate.créer_compte = MagicMock()
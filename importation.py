@@ -0,0 +1,170 @@
+import argparse
+import csv
+import gzip
+import json
+import time
+from noyau import ajouter_taches, date_vers_iso, obtenir_id_utilisateur, PRIORITES
+
+# Import de tâches depuis un fichier CSV ou NDJSON (un objet JSON par ligne), éventuellement compressé (.gz)
+# Chaque ligne doit contenir les champs "tache", "description", "echeance" (JJ-MM-AAAA) et "priorite" ;
+# le champ "est_completee" est facultatif (tâche en cours s'il est absent). Ce sont les colonnes
+# écrites par exportation.py (CHAMPS) : un export relu par ce module redonne les mêmes tâches.
+# Le fichier est lu ligne par ligne : il n'est jamais chargé entièrement en mémoire
+
+# Au-delà, les erreurs sont comptées mais plus gardées en mémoire
+ERREURS_MAX = 1000
+# Valeurs acceptées pour "est_completee" : un booléen JSON, ou le texte écrit par le module csv pour un booléen
+COMPLETEES_CSV = {"True" : True, "False" : False}
+
+
+class RapportImport :
+    """Résultat d'un import : nombre de tâches importées, erreurs par ligne et débit"""
+    def __init__(self) :
+        self.importees = 0
+        self.nb_erreurs = 0
+        self.erreurs = []
+        self.duree = 0.0
+
+
+    def ajouter_erreur(self, numero, message) :
+        """int, str -> None
+        Enregistre l'erreur d'une ligne du fichier"""
+        self.nb_erreurs += 1
+        if len(self.erreurs) < ERREURS_MAX :
+            self.erreurs.append((numero, message))
+
+
+    def debit(self) :
+        """RapportImport -> float
+        Nombre de tâches importées par seconde"""
+        return self.importees / self.duree if self.duree > 0 else 0.0
+
+
+def lire_csv(fichier) :
+    """file -> generator
+    Renvoie les lignes d'un fichier CSV une par une, sous forme de dictionnaires, avec leur numéro de ligne"""
+    # La classe DictReader utilise la première ligne du fichier comme noms de colonnes
+    lecteur = csv.DictReader(fichier)
+    # line_num compte les lignes du fichier déjà lues : un champ entre guillemets peut contenir
+    # des retours à la ligne, le numéro donné est celui de la première ligne de l'enregistrement.
+    # Lire fieldnames lit l'en-tête
+    precedente = lecteur.line_num if lecteur.fieldnames is not None else 0
+    for ligne in lecteur :
+        yield precedente + 1, ligne
+        precedente = lecteur.line_num
+
+
+def lire_ndjson(fichier) :
+    """file -> generator
+    Renvoie les objets d'un fichier NDJSON un par un, avec leur numéro de ligne (les lignes vides sont ignorées)
+    Une ligne qui n'est pas du JSON valide est renvoyée sous forme de ValueError, pour être
+    comptée comme erreur sans arrêter l'import"""
+    for numero, ligne in enumerate(fichier, start = 1) :
+        ligne = ligne.strip()
+        if ligne :
+            try :
+                yield numero, json.loads(ligne)
+            except json.JSONDecodeError as erreur :
+                yield numero, ValueError(f"JSON invalide : {erreur.msg}")
+
+
+LECTEURS = {"csv" : lire_csv, "ndjson" : lire_ndjson}
+
+
+def champ_texte(ligne, champ) :
+    """dict, str -> str
+    Renvoie un champ d'une ligne ("" s'il est absent), ou lève une ValueError s'il n'est pas du texte
+    Dans un fichier NDJSON, un champ peut contenir un nombre, une liste... : il ne doit pas arrêter l'import"""
+    valeur = ligne.get(champ)
+    if valeur is None :
+        return ""
+    if not isinstance(valeur, str) :
+        raise ValueError(f"Le champ {champ!r} doit être du texte, pas {type(valeur).__name__}")
+    return valeur
+
+
+def champ_completee(ligne) :
+    """dict -> bool
+    Renvoie le champ "est_completee" d'une ligne (faux s'il est absent), ou lève une ValueError s'il n'est pas un booléen"""
+    valeur = ligne.get("est_completee")
+    if valeur is None or valeur == "" :
+        return False
+    # isinstance() est vérifié en premier : 1 et 0 sont égaux à True et False mais ne sont pas acceptés
+    if isinstance(valeur, bool) :
+        return valeur
+    if isinstance(valeur, str) and valeur in COMPLETEES_CSV :
+        return COMPLETEES_CSV[valeur]
+    raise ValueError(f"Le champ 'est_completee' doit être true ou false, pas {valeur!r}")
+
+
+def valider_ligne(ligne) :
+    """dict -> tuple
+    Vérifie une ligne et renvoie la tâche (nom, description, échéance, priorité, complétée)
+    Lève une ValueError qui décrit le problème si la ligne n'est pas valide"""
+    if isinstance(ligne, Exception) :
+        raise ligne
+    if not isinstance(ligne, dict) :
+        raise ValueError("La ligne doit être un objet")
+    nom_tache = champ_texte(ligne, "tache").strip()
+    if not nom_tache :
+        raise ValueError("Le nom de la tâche est vide")
+    description = champ_texte(ligne, "description")
+    priorite = champ_texte(ligne, "priorite")
+    if priorite not in PRIORITES :
+        raise ValueError(f"Priorité invalide : {priorite!r} (attendu : {', '.join(PRIORITES)})")
+    echeance = champ_texte(ligne, "echeance")
+    if not echeance :
+        raise ValueError("L'échéance est manquante")
+    # date_vers_iso() lève une ValueError si la date n'est pas valide
+    date_vers_iso(echeance)
+    return (nom_tache, description, echeance, priorite, champ_completee(ligne))
+
+
+def importer(id_utilisateur, chemin, format_fichier = None, taille_lot = 1000) :
+    """int, str, str, int -> RapportImport
+    Importe les tâches d'un fichier CSV ou NDJSON pour un utilisateur"""
+    compresse = chemin.lower().endswith(".gz")
+    if format_fichier is None :
+        format_fichier = "csv" if chemin.lower().removesuffix(".gz").endswith(".csv") else "ndjson"
+    lecteur = LECTEURS[format_fichier]
+    rapport = RapportImport()
+
+    def taches_valides(fichier) :
+        """file -> generator
+        Renvoie les tâches valides du fichier et note les erreurs au passage"""
+        # Les numéros sont ceux des lignes du fichier (la ligne 1 d'un CSV est l'en-tête)
+        for numero, ligne in lecteur(fichier) :
+            try :
+                yield valider_ligne(ligne)
+            except ValueError as erreur :
+                rapport.ajouter_erreur(numero, str(erreur))
+
+    debut = time.perf_counter()
+    # newline = "" est demandé par le module csv pour gérer les retours à la ligne dans les champs
+    # Un export compressé (exportation.py --gzip) est décompressé au fil de la lecture
+    ouvrir = gzip.open if compresse else open
+    with ouvrir(chemin, "rt", encoding = "utf-8", newline = "") as fichier :
+        rapport.importees = ajouter_taches(id_utilisateur, taches_valides(fichier), taille_lot)
+    rapport.duree = time.perf_counter() - debut
+    return rapport
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Importe des tâches depuis un fichier CSV ou NDJSON")
+    analyseur.add_argument("identifiant", help = "identifiant de l'utilisateur qui reçoit les tâches")
+    analyseur.add_argument("fichier", help = "fichier .csv ou .ndjson à importer, éventuellement suivi de .gz")
+    analyseur.add_argument("--format", choices = sorted(LECTEURS), dest = "format_fichier", help = "format du fichier (déduit de l'extension par défaut)")
+    analyseur.add_argument("--lot", type = int, default = 1000, help = "nombre de tâches par transaction")
+    arguments = analyseur.parse_args()
+
+    id_utilisateur = obtenir_id_utilisateur(arguments.identifiant)
+    if id_utilisateur is None :
+        analyseur.error(f"L'utilisateur {arguments.identifiant} n'existe pas")
+    rapport = importer(id_utilisateur, arguments.fichier, arguments.format_fichier, arguments.lot)
+
+    for numero, message in rapport.erreurs :
+        print(f"Ligne {numero} : {message}")
+    if rapport.nb_erreurs > len(rapport.erreurs) :
+        print(f"... et {rapport.nb_erreurs - len(rapport.erreurs)} autres erreurs")
+    print(f"{rapport.importees} tâches importées, {rapport.nb_erreurs} lignes rejetées, "
+          f"en {rapport.duree:.2f} s ({rapport.debit():.0f} tâches/s)")
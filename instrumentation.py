@@ -0,0 +1,321 @@
+import sqlite3
+import threading
+import bisect
+import functools
+import json
+import os
+import time
+
+# Mesures internes de MyTaskMate : durée des requêtes SQL, des fonctions de l'interface
+# et activité du planificateur. Tant qu'elles ne sont pas activées, chaque point de mesure
+# se limite à lire l'attribut "actif"
+
+
+class Histogramme :
+    """Répartition de durées (en secondes) dans des intervalles fixes, comme les histogrammes Prometheus"""
+    # Bornes supérieures des intervalles, de 0,1 ms à 5 s (une dernière case reçoit le reste)
+    BORNES = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+    def __init__(self) :
+        self.comptes = [0] * (len(self.BORNES) + 1)
+        self.total = 0
+        self.somme = 0.0
+        self.max = 0.0
+
+
+    def observer(self, duree) :
+        """Histogramme, float -> None
+        Ajoute une durée à l'histogramme"""
+        # La fonction bisect_left() trouve la première borne supérieure ou égale à la durée
+        self.comptes[bisect.bisect_left(self.BORNES, duree)] += 1
+        self.total += 1
+        self.somme += duree
+        self.max = max(self.max, duree)
+
+
+    def quantile(self, q) :
+        """Histogramme, float -> float
+        Renvoie une estimation du quantile q (la borne de l'intervalle qui le contient)"""
+        rang = q * self.total
+        cumul = 0
+        for borne, compte in zip(self.BORNES, self.comptes) :
+            cumul += compte
+            if cumul >= rang :
+                return borne
+        return self.max
+
+
+    def en_dict(self) :
+        """Histogramme -> dict
+        Renvoie le contenu de l'histogramme, prêt à être écrit en JSON"""
+        return {"total" : self.total, "somme_s" : self.somme, "max_s" : self.max,
+                "p50_s" : self.quantile(0.5), "p99_s" : self.quantile(0.99),
+                "intervalles" : dict(zip([str(borne) for borne in self.BORNES] + ["+Inf"], self.comptes))}
+
+
+class Mesures :
+    """Rassemble toutes les mesures, depuis tous les threads"""
+    # Le gestionnaire de progression de sqlite3 est appelé toutes les N instructions de sa machine virtuelle
+    INSTRUCTIONS_PAR_APPEL = 1000
+
+    def __init__(self) :
+        self.actif = False
+        self.verrou = threading.Lock()
+        # Type de la dernière requête lancée par chaque thread, pour lui attribuer les instructions comptées
+        self.local = threading.local()
+        self.ecriture = None
+        self.vider()
+
+
+    def vider(self) :
+        """Mesures -> None
+        Remet toutes les mesures à zéro"""
+        with self.verrou :
+            # texte de la requête -> {"duree" : Histogramme, "lignes" : int, "lecture_s" : float}
+            self.requetes = {}
+            # type de requête (SELECT, INSERT, COMMIT...) -> nombre exécuté, instructions exécutées
+            self.executions = {}
+            self.instructions = {}
+            # nom de fonction -> Histogramme
+            self.fonctions = {}
+            self.compteurs = {}
+
+
+    def activer(self) :
+        """Mesures -> None
+        Active les mesures (les connexions s'instrumentent à leur prochaine utilisation)"""
+        self.actif = True
+
+
+    def desactiver(self) :
+        """Mesures -> None
+        Désactive les mesures, sans effacer celles déjà faites"""
+        self.actif = False
+
+
+    def installer(self, connexion) :
+        """Mesures, sqlite3.Connection -> None
+        Branche les fonctions de suivi de sqlite3 sur une connexion, ou les retire si les mesures sont désactivées"""
+        if self.actif :
+            # La fonction set_trace_callback() est appelée au lancement de chaque requête
+            connexion.set_trace_callback(self.tracer)
+            # La fonction set_progress_handler() est appelée régulièrement pendant l'exécution d'une requête
+            connexion.set_progress_handler(self.progression, self.INSTRUCTIONS_PAR_APPEL)
+        else :
+            connexion.set_trace_callback(None)
+            connexion.set_progress_handler(None, 0)
+
+
+    def tracer(self, requete) :
+        """Mesures, str -> None
+        Compte une requête lancée par sqlite3 (y compris BEGIN et COMMIT)"""
+        # Le texte reçu contient les valeurs des paramètres : seul le premier mot est gardé
+        # Les requêtes exécutées par un déclencheur sont signalées par un commentaire "-- TRIGGER nom"
+        mots = requete.split(None, 1)
+        type_requete = "TRIGGER" if requete.startswith("--") else (mots[0].upper() if mots else "")
+        self.local.type_requete = type_requete
+        with self.verrou :
+            self.executions[type_requete] = self.executions.get(type_requete, 0) + 1
+
+
+    def progression(self) :
+        """Mesures -> int
+        Compte les instructions exécutées par la requête en cours (renvoyer 0 laisse la requête continuer)"""
+        type_requete = getattr(self.local, "type_requete", "")
+        with self.verrou :
+            self.instructions[type_requete] = self.instructions.get(type_requete, 0) + self.INSTRUCTIONS_PAR_APPEL
+        return 0
+
+
+    def _requete(self, requete) :
+        """Mesures, str -> dict
+        Renvoie les mesures d'une requête, en les créant si besoin (le verrou doit être pris)"""
+        mesure = self.requetes.get(requete)
+        if mesure is None :
+            mesure = self.requetes[requete] = {"duree" : Histogramme(), "lignes" : 0, "lecture_s" : 0.0}
+        return mesure
+
+
+    def observer_requete(self, requete, duree, lignes) :
+        """Mesures, str, float, int -> None
+        Enregistre la durée d'exécution d'une requête et le nombre de lignes modifiées"""
+        with self.verrou :
+            mesure = self._requete(requete)
+            mesure["duree"].observer(duree)
+            mesure["lignes"] += max(lignes, 0)
+
+
+    def ajouter_lignes(self, requete, lignes, duree) :
+        """Mesures, str, int, float -> None
+        Enregistre des lignes lues dans le résultat d'une requête et le temps passé à les lire"""
+        with self.verrou :
+            mesure = self._requete(requete)
+            mesure["lignes"] += lignes
+            mesure["lecture_s"] += duree
+
+
+    def observer(self, nom, duree) :
+        """Mesures, str, float -> None
+        Enregistre la durée d'un appel de fonction"""
+        with self.verrou :
+            histogramme = self.fonctions.get(nom)
+            if histogramme is None :
+                histogramme = self.fonctions[nom] = Histogramme()
+            histogramme.observer(duree)
+
+
+    def compter(self, nom, nombre = 1) :
+        """Mesures, str, int -> None
+        Augmente un compteur"""
+        if self.actif :
+            with self.verrou :
+                self.compteurs[nom] = self.compteurs.get(nom, 0) + nombre
+
+
+    def mesurer(self, fonction, nom = None) :
+        """Mesures, function, str -> function
+        Renvoie une version de la fonction qui enregistre la durée de chacun de ses appels"""
+        nom = nom if nom is not None else fonction.__qualname__
+
+        # La fonction wraps() garde le nom et la documentation de la fonction d'origine
+        @functools.wraps(fonction)
+        def fonction_mesuree(*arguments, **options) :
+            if not self.actif :
+                return fonction(*arguments, **options)
+            debut = time.perf_counter()
+            try :
+                return fonction(*arguments, **options)
+            finally :
+                self.observer(nom, time.perf_counter() - debut)
+        return fonction_mesuree
+
+
+    def instantane(self) :
+        """Mesures -> dict
+        Renvoie une copie de toutes les mesures, prête à être écrite en JSON"""
+        with self.verrou :
+            return {
+                "requetes" : {requete : {"duree" : mesure["duree"].en_dict(), "lignes" : mesure["lignes"], "lecture_s" : mesure["lecture_s"]}
+                              for requete, mesure in self.requetes.items()},
+                "executions" : dict(self.executions),
+                "instructions" : dict(self.instructions),
+                "fonctions" : {nom : histogramme.en_dict() for nom, histogramme in self.fonctions.items()},
+                "compteurs" : dict(self.compteurs),
+            }
+
+
+    def en_prometheus(self) :
+        """Mesures -> str
+        Renvoie les mesures au format texte de Prometheus"""
+        instantane = self.instantane()
+        lignes = []
+
+        def etiquette(texte) :
+            """str -> str
+            Échappe une valeur d'étiquette Prometheus"""
+            return " ".join(texte.split()).replace("\\", "\\\\").replace('"', '\\"')
+
+        def histogramme(nom, etiquettes, mesure) :
+            """str, str, dict -> None
+            Ajoute les lignes d'un histogramme (les intervalles Prometheus sont cumulés)"""
+            cumul = 0
+            for borne, compte in mesure["intervalles"].items() :
+                cumul += compte
+                lignes.append(f'{nom}_bucket{{{etiquettes},le="{borne}"}} {cumul}')
+            lignes.append(f"{nom}_sum{{{etiquettes}}} {mesure['somme_s']}")
+            lignes.append(f"{nom}_count{{{etiquettes}}} {mesure['total']}")
+
+        lignes.append("# TYPE mytaskmate_requete_duree_secondes histogram")
+        for requete, mesure in instantane["requetes"].items() :
+            histogramme("mytaskmate_requete_duree_secondes", f'requete="{etiquette(requete)}"', mesure["duree"])
+        lignes.append("# TYPE mytaskmate_requete_lignes_total counter")
+        for requete, mesure in instantane["requetes"].items() :
+            lignes.append(f'mytaskmate_requete_lignes_total{{requete="{etiquette(requete)}"}} {mesure["lignes"]}')
+        lignes.append("# TYPE mytaskmate_sqlite_executions_total counter")
+        for type_requete, nombre in instantane["executions"].items() :
+            lignes.append(f'mytaskmate_sqlite_executions_total{{type="{etiquette(type_requete)}"}} {nombre}')
+        lignes.append("# TYPE mytaskmate_sqlite_instructions_total counter")
+        for type_requete, nombre in instantane["instructions"].items() :
+            lignes.append(f'mytaskmate_sqlite_instructions_total{{type="{etiquette(type_requete)}"}} {nombre}')
+        lignes.append("# TYPE mytaskmate_fonction_duree_secondes histogram")
+        for nom, mesure in instantane["fonctions"].items() :
+            histogramme("mytaskmate_fonction_duree_secondes", f'fonction="{etiquette(nom)}"', mesure)
+        lignes.append("# TYPE mytaskmate_evenements_total counter")
+        for nom, nombre in instantane["compteurs"].items() :
+            lignes.append(f'mytaskmate_evenements_total{{nom="{etiquette(nom)}"}} {nombre}')
+        return "\n".join(lignes) + "\n"
+
+
+    def ecrire(self, chemin) :
+        """Mesures, str -> None
+        Écrit les mesures dans un fichier : au format JSON si son extension est .json, sinon au format Prometheus"""
+        contenu = json.dumps(self.instantane(), indent = 2, ensure_ascii = False) if chemin.endswith(".json") else self.en_prometheus()
+        # Le fichier est écrit à côté puis renommé : un lecteur ne voit jamais un fichier à moitié écrit
+        temporaire = chemin + ".tmp"
+        with open(temporaire, "w", encoding = "utf-8") as fichier :
+            fichier.write(contenu)
+        os.replace(temporaire, chemin)
+
+
+    def ecrire_periodiquement(self, chemin, intervalle = 10) :
+        """Mesures, str, float -> None
+        Active les mesures et les écrit dans un fichier toutes les "intervalle" secondes, depuis un thread"""
+        self.activer()
+        if self.ecriture is not None :
+            return
+
+        def ecrire_en_boucle() :
+            """None -> None
+            Écrit les mesures à intervalle régulier jusqu'à la fin du programme"""
+            while True :
+                time.sleep(intervalle)
+                self.ecrire(chemin)
+
+        self.ecriture = threading.Thread(target = ecrire_en_boucle, daemon = True)
+        self.ecriture.start()
+
+
+class CurseurMesure(sqlite3.Cursor) :
+    """Curseur sqlite3 qui enregistre la durée de chaque requête et le nombre de lignes lues ou modifiées"""
+    def execute(self, requete, parametres = ()) :
+        self.requete = requete
+        debut = time.perf_counter()
+        super().execute(requete, parametres)
+        # rowcount vaut -1 pour un SELECT : les lignes sont comptées pendant leur lecture
+        mesures.observer_requete(requete, time.perf_counter() - debut, self.rowcount)
+        return self
+
+
+    def fetchone(self) :
+        debut = time.perf_counter()
+        ligne = super().fetchone()
+        mesures.ajouter_lignes(self.requete, 0 if ligne is None else 1, time.perf_counter() - debut)
+        return ligne
+
+
+    def fetchmany(self, taille = None) :
+        debut = time.perf_counter()
+        lignes = super().fetchmany(self.arraysize if taille is None else taille)
+        mesures.ajouter_lignes(self.requete, len(lignes), time.perf_counter() - debut)
+        return lignes
+
+
+    def fetchall(self) :
+        debut = time.perf_counter()
+        lignes = super().fetchall()
+        mesures.ajouter_lignes(self.requete, len(lignes), time.perf_counter() - debut)
+        return lignes
+
+
+    def __next__(self) :
+        ligne = self.fetchone()
+        if ligne is None :
+            raise StopIteration
+        return ligne
+
+
+# Les mesures s'activent au lancement avec la variable d'environnement MYTASKMATE_MESURES,
+# qui donne le fichier (.json ou format Prometheus) où elles sont écrites toutes les 10 secondes
+mesures = Mesures()
+if os.environ.get("MYTASKMATE_MESURES") :
+    mesures.ecrire_periodiquement(os.environ["MYTASKMATE_MESURES"])
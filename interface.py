@@ -0,0 +1,1339 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from datetime import date, datetime
+import threading
+import queue
+import time
+import os
+from instrumentation import mesures
+from sauvegarde import SauvegardesPlanifiees
+from noyau import (
+    nouveau_compte, se_connecter, obtenir_id_utilisateur, ajouter_tache, marquer_tache_complete, maj_tache,
+    supprimer_tache, obtenir_page_taches, obtenir_taches_ouvertes, rechercher_taches,
+    date_vers_iso, PRIORITES, base, obtenir_compteurs, ajouter_sous_tache, obtenir_sous_taches,
+    progression_taches, ajouter_recurrence, supprimer_recurrence, obtenir_recurrences, obtenir_occurrences,
+    obtenir_occurrences_materialisees, materialiser_occurrence, completer_occurrence, archiver_taches, obtenir_taches_archivees, CacheTaches, Planificateur, TravailleurBase, Tache
+)
+
+# Interface graphique avec tkinter
+# Choix proposés dans la fenêtre principale : filtres et tris passés à obtenir_page_taches
+FILTRES_AFFICHAGE = {
+    "Toutes" : {},
+    "En cours" : {"completee" : False},
+    "Terminées" : {"completee" : True},
+    "En retard" : {"en_retard" : True},
+    "Priorité haute" : {"priorites" : ("Haute",)},
+}
+TRIS_AFFICHAGE = {"Par défaut" : "defaut", "Échéance" : "echeance", "Priorité" : "priorite", "Création" : "creation"}
+# Choix de répétition proposés à l'ajout d'une tâche (None = tâche simple)
+REPETITIONS_AFFICHAGE = {"Aucune" : None, "Tous les jours" : "quotidienne", "Toutes les semaines" : "hebdomadaire", "Tous les mois" : "mensuelle"}
+# Nombre de jours d'occurrences des tâches répétées affichés
+JOURS_OCCURRENCES = 14
+# Les tâches complétées depuis plus de JOURS_ARCHIVAGE jours sont archivées à la connexion
+JOURS_ARCHIVAGE = 30
+# Nombre de tâches expirées nommées dans l'avertissement (les suivantes sont seulement comptées)
+EXPIREES_AFFICHEES = 10
+
+
+class VueTaches :
+    """Affiche les tâches dans un ttk.Treeview
+    Seule une fenêtre de la liste est affichée : au plus FENETRE_PAGES pages de lignes consécutives.
+    Quand l'utilisateur arrive en bas de la fenêtre, la page suivante est ajoutée et la première page
+    est retirée (et inversement en haut) : le nombre de lignes du Treeview reste borné, quelle que
+    soit la longueur de la liste parcourue. À chaque mise à jour, la vue est comparée à l'affichage
+    précédent et seules les lignes ajoutées, modifiées ou retirées sont touchées.
+    Les sous-tâches ne sont lues qu'à l'ouverture de leur tâche parente"""
+    TAILLE_PAGE = 100
+    FENETRE_PAGES = 3
+    COULEURS = {"Faible" : "green", "Moyenne" : "orange", "Haute" : "red", "terminee" : "gray"}
+
+    def __init__(self, parent) :
+        self.cadre = ttk.Frame(parent)
+        # La classe Treeview du module ttk permet d'afficher une liste de lignes avec plusieurs colonnes
+        self.arbre = ttk.Treeview(self.cadre, columns = ("echeance", "priorite", "etat", "sous_taches"), height = 15, selectmode = "browse")
+        self.arbre.heading("#0", text = "Tâche")
+        self.arbre.heading("echeance", text = "Échéance")
+        self.arbre.heading("priorite", text = "Priorité")
+        self.arbre.heading("etat", text = "État")
+        self.arbre.heading("sous_taches", text = "Sous-tâches")
+        self.arbre.column("#0", width = 250)
+        self.arbre.column("echeance", width = 100)
+        self.arbre.column("priorite", width = 80)
+        self.arbre.column("etat", width = 80)
+        self.arbre.column("sous_taches", width = 100)
+        # Les étiquettes (tags) donnent leur couleur aux lignes, comme l'ancienne Listbox
+        for etiquette, couleur in self.COULEURS.items() :
+            self.arbre.tag_configure(etiquette, foreground = couleur)
+
+        # La classe Scrollbar permet de faire défiler la liste
+        self.barre = ttk.Scrollbar(self.cadre, orient = "vertical", command = self.arbre.yview)
+        self.arbre.configure(yscrollcommand = self.defilement)
+        self.arbre.pack(side = "left", fill = "both", expand = True)
+        self.barre.pack(side = "right", fill = "y")
+
+        # Toutes les tâches à afficher, et celles qui le sont réellement (dans l'ordre) : les lignes
+        # self.lignes[self.debut:self.debut + len(self.ordre)]
+        self.lignes = []
+        self.ordre = []
+        self.debut = 0
+        self.rendu = {}
+        # Fonction appelée quand toutes les lignes connues sont affichées : elle demande la page
+        # suivante, qui complète la liste self.lignes, puis rappelle afficher_suite() quand elle arrive
+        self.source_suite = None
+        self.suite_programmee = False
+        # Sous-tâches : tâche -> (nombre de sous-tâches, nombre de complétées), identifiants des enfants
+        # déjà lus pour chaque tâche ouverte, et tâches affichées comme sous-tâches
+        self.progression = {}
+        self.enfants = {}
+        self.rendu_enfants = {}
+        # Fonction appelée avec l'identifiant d'une tâche ouverte dont les enfants n'ont pas encore été lus
+        self.source_enfants = None
+        # L'évènement <<TreeviewOpen>> est déclenché quand l'utilisateur déplie une ligne
+        self.arbre.bind("<<TreeviewOpen>>", self.ouverture)
+
+
+    def grid(self, **options) :
+        """VueTaches -> None
+        Place la vue dans la fenêtre parente"""
+        self.cadre.grid(**options)
+
+
+    def selection(self) :
+        """VueTaches -> int
+        Renvoie l'identifiant de la tâche sélectionnée, ou None"""
+        selection = self.arbre.selection()
+        # La ligne "Chargement..." d'une tâche en cours d'ouverture n'est pas une tâche
+        if not selection or selection[0].startswith("attente") :
+            return None
+        return int(selection[0])
+
+
+    def tache(self, tache_id) :
+        """VueTaches, int -> tuple
+        Renvoie la tâche affichée qui a cet identifiant"""
+        if tache_id in self.rendu :
+            return self.rendu[tache_id]
+        return self.rendu_enfants[tache_id]
+
+
+    def afficher(self, lignes, depuis_le_debut = False) :
+        """VueTaches, list, bool -> None
+        Affiche les tâches données en ne modifiant que ce qui a changé depuis le dernier affichage
+        La fenêtre affichée reste à la même place dans la liste, ou revient en haut si depuis_le_debut est vrai
+        (nouveau filtre, nouveau tri, nouvelle recherche)"""
+        self.lignes = lignes
+        if depuis_le_debut :
+            self.debut = 0
+            self.arbre.yview_moveto(0)
+        # On garde au moins autant de lignes qu'avant pour ne pas faire sauter le défilement
+        taille = max(len(self.ordre), self.TAILLE_PAGE)
+        self.debut = max(0, min(self.debut, len(lignes) - taille))
+        self.synchroniser(lignes[self.debut:self.debut + taille])
+
+
+    def deplacer_fenetre(self, debut, fin) :
+        """VueTaches, int, int -> None
+        Affiche les lignes self.lignes[debut:fin] en gardant à l'écran les mêmes tâches"""
+        # Les lignes ajoutées ou retirées au-dessus de l'écran décaleraient son contenu : le défilement est corrigé
+        # d'autant de lignes (yview_scroll compte en lignes du Treeview)
+        decalage = self.debut - debut
+        self.debut = debut
+        self.synchroniser(self.lignes[debut:fin])
+        if decalage :
+            self.arbre.yview_scroll(decalage, "units")
+
+
+    @mesures.mesurer
+    def afficher_suite(self) :
+        """VueTaches -> None
+        Ajoute la page de lignes suivante à l'affichage, et retire la première si la fenêtre est pleine"""
+        self.suite_programmee = False
+        fin = self.debut + len(self.ordre)
+        if fin >= len(self.lignes) :
+            if self.source_suite is not None :
+                self.source_suite()
+            return
+        fin = min(fin + self.TAILLE_PAGE, len(self.lignes))
+        self.deplacer_fenetre(max(self.debut, fin - self.FENETRE_PAGES * self.TAILLE_PAGE), fin)
+
+
+    @mesures.mesurer
+    def afficher_precedente(self) :
+        """VueTaches -> None
+        Ajoute la page de lignes précédente en haut de l'affichage, et retire la dernière si la fenêtre est pleine"""
+        self.suite_programmee = False
+        if self.debut == 0 :
+            return
+        debut = max(0, self.debut - self.TAILLE_PAGE)
+        self.deplacer_fenetre(debut, min(self.debut + len(self.ordre), debut + self.FENETRE_PAGES * self.TAILLE_PAGE))
+
+
+    def defilement(self, premier, dernier) :
+        """VueTaches, str, str -> None
+        Met à jour la barre de défilement et déplace la fenêtre quand le bas (ou le haut) de la liste affichée est visible"""
+        self.barre.set(premier, dernier)
+        if self.suite_programmee :
+            return
+        # after_idle() attend que Tk ait fini de dessiner avant d'ajouter des lignes
+        if float(dernier) >= 1.0 and (self.debut + len(self.ordre) < len(self.lignes) or self.source_suite is not None) :
+            self.suite_programmee = True
+            self.arbre.after_idle(self.afficher_suite)
+        elif float(premier) <= 0.0 and self.debut > 0 :
+            self.suite_programmee = True
+            self.arbre.after_idle(self.afficher_precedente)
+
+
+    @mesures.mesurer
+    def synchroniser(self, cible) :
+        """VueTaches, list -> None
+        Applique à l'affichage les suppressions, modifications et insertions qui mènent à la liste cible"""
+        ids_cible = {tache.tache_id for tache in cible}
+        retirees = [tache_id for tache_id in self.ordre if tache_id not in ids_cible]
+        if retirees :
+            self.arbre.delete(*[str(tache_id) for tache_id in retirees])
+            for tache_id in retirees :
+                del self.rendu[tache_id]
+                # Tk a retiré les sous-tâches affichées avec leur tâche parente
+                self.oublier_enfants(tache_id)
+        # Les lignes sont placées dans l'ordre de la cible : avant la position traitée, l'affichage est déjà
+        # celui de la cible ; après, ce sont les lignes restantes dans leur ancien ordre. "suivante" parcourt
+        # cet ancien ordre une seule fois, en sautant les lignes déjà déplacées plus haut
+        anciennes = [tache_id for tache_id in self.ordre if tache_id in ids_cible]
+        deplacees = set()
+        suivante = 0
+        for position, tache in enumerate(cible) :
+            tache_id = tache.tache_id
+            while suivante < len(anciennes) and anciennes[suivante] in deplacees :
+                suivante += 1
+            ancienne = self.rendu.get(tache_id)
+            if ancienne is None :
+                # Une sous-tâche trouvée par la recherche devient une ligne de la liste : sa tâche parente est repliée
+                if tache_id in self.rendu_enfants :
+                    self.replier(self.rendu_enfants[tache_id].parent_id)
+                self.arbre.insert("", position, iid = str(tache_id), **self.options_ligne(tache, self.progression.get(tache_id)))
+                self.marquer_enfants(tache_id)
+            else :
+                if ancienne != tache :
+                    self.arbre.item(str(tache_id), **self.options_ligne(tache, self.progression.get(tache_id)))
+                if suivante < len(anciennes) and anciennes[suivante] == tache_id :
+                    suivante += 1
+                else :
+                    # La fonction move() déplace une ligne existante sans la recréer
+                    self.arbre.move(str(tache_id), "", position)
+                    deplacees.add(tache_id)
+            self.rendu[tache_id] = tache
+        self.ordre = [tache.tache_id for tache in cible]
+
+
+    def ouverture(self, evenement = None) :
+        """VueTaches -> None
+        Demande les sous-tâches de la tâche que l'utilisateur vient de déplier, si elles n'ont pas encore été lues"""
+        # La fonction focus() renvoie la ligne sur laquelle l'utilisateur a agi
+        iid = self.arbre.focus()
+        if iid and not iid.startswith("attente") and int(iid) not in self.enfants and self.source_enfants is not None :
+            self.source_enfants(int(iid))
+
+
+    def afficher_enfants(self, parent_id, enfants) :
+        """VueTaches, int, list -> None
+        Affiche les sous-tâches lues d'une tâche, à la place de la ligne "Chargement..." """
+        if not self.arbre.exists(str(parent_id)) :
+            return
+        self.oublier_enfants(parent_id)
+        self.arbre.delete(*self.arbre.get_children(str(parent_id)))
+        self.enfants[parent_id] = [enfant.tache_id for enfant in enfants if enfant.tache_id not in self.rendu]
+        for enfant in enfants :
+            # Une sous-tâche déjà affichée comme ligne de la liste (résultat de recherche) n'est pas dupliquée
+            if enfant.tache_id in self.rendu :
+                continue
+            self.arbre.insert(str(parent_id), "end", iid = str(enfant.tache_id), **self.options_ligne(enfant, self.progression.get(enfant.tache_id)))
+            self.rendu_enfants[enfant.tache_id] = enfant
+            self.marquer_enfants(enfant.tache_id)
+
+
+    def replier(self, parent_id) :
+        """VueTaches, int -> None
+        Retire les sous-tâches affichées d'une tâche, qui seront relues à sa prochaine ouverture"""
+        self.arbre.delete(*self.arbre.get_children(str(parent_id)))
+        self.oublier_enfants(parent_id)
+        self.marquer_enfants(parent_id)
+
+
+    def oublier_enfants(self, parent_id) :
+        """VueTaches, int -> None
+        Oublie les sous-tâches lues d'une tâche (et les leurs), après leur retrait de l'affichage"""
+        for enfant_id in self.enfants.pop(parent_id, ()) :
+            self.rendu_enfants.pop(enfant_id, None)
+            self.oublier_enfants(enfant_id)
+
+
+    def marquer_enfants(self, tache_id) :
+        """VueTaches, int -> None
+        Ajoute une ligne "Chargement..." sous une tâche qui a des sous-tâches pas encore lues,
+        pour que Tk affiche la flèche qui permet de la déplier"""
+        progression = self.progression.get(tache_id)
+        attente = f"attente{tache_id}"
+        if progression and tache_id not in self.enfants and not self.arbre.exists(attente) :
+            self.arbre.insert(str(tache_id), "end", iid = attente, text = "Chargement...")
+        elif not progression and self.arbre.exists(attente) :
+            self.arbre.delete(attente)
+
+
+    def afficher_progression(self, ids_taches, progression) :
+        """VueTaches, list, dict -> None
+        Met à jour l'avancement des sous-tâches des tâches données (absentes de progression = sans sous-tâches)"""
+        for tache_id in ids_taches :
+            avancement = progression.get(tache_id)
+            if self.progression.get(tache_id) == avancement :
+                continue
+            if avancement is None :
+                self.progression.pop(tache_id, None)
+            else :
+                self.progression[tache_id] = avancement
+            tache = self.rendu.get(tache_id) or self.rendu_enfants.get(tache_id)
+            if tache is not None :
+                self.arbre.item(str(tache_id), **self.options_ligne(tache, avancement))
+                self.marquer_enfants(tache_id)
+
+
+    def modifier(self, tache) :
+        """VueTaches, Tache -> None
+        Met à jour une sous-tâche affichée (les tâches principales sont mises à jour par afficher())"""
+        if tache.tache_id in self.rendu_enfants :
+            self.rendu_enfants[tache.tache_id] = tache
+            self.arbre.item(str(tache.tache_id), **self.options_ligne(tache, self.progression.get(tache.tache_id)))
+
+
+    def retirer(self, ids_taches) :
+        """VueTaches, list -> None
+        Retire des sous-tâches de l'affichage"""
+        for tache_id in ids_taches :
+            if tache_id in self.rendu_enfants :
+                parent_id = self.rendu_enfants.pop(tache_id).parent_id
+                if tache_id in self.enfants.get(parent_id, ()) :
+                    self.enfants[parent_id].remove(tache_id)
+                self.oublier_enfants(tache_id)
+                if self.arbre.exists(str(tache_id)) :
+                    self.arbre.delete(str(tache_id))
+
+
+    def ids_affiches(self) :
+        """VueTaches -> list
+        Renvoie les identifiants de toutes les tâches affichées, sous-tâches comprises"""
+        return self.ordre + list(self.rendu_enfants)
+
+
+    @staticmethod
+    def options_ligne(tache, progression = None) :
+        """Tache, tuple -> dict
+        Texte, colonnes et couleur d'une ligne de la vue"""
+        if tache.est_completee :
+            etiquettes = ("terminee",)
+        elif tache.priorite in VueTaches.COULEURS :
+            etiquettes = (tache.priorite,)
+        else :
+            etiquettes = ()
+        return {"text" : tache.nom,
+                "values" : (tache.echeance_saisie, tache.priorite, "Terminée" if tache.est_completee else "",
+                            f"{progression[1]}/{progression[0]} ({100 * progression[1] // progression[0]} %)" if progression else ""),
+                "tags" : etiquettes}
+
+
+
+class Todolist :
+    # Intervalle (en ms) entre deux vérifications des requêtes terminées par le travailleur
+    INTERVALLE_RESULTATS = 15
+
+    def __init__(self, principale, planificateur = None, travailleur = None) :
+        # Permet de définir la fenêtre principale
+        self.principale = principale
+        self.principale.title("MyTaskMate (code créateur M. Picard dans la boutique les gars)")
+        self.utilisateur_actuel = None
+        self.cache_taches = CacheTaches()
+        self.planificateur = planificateur if planificateur is not None else Planificateur()
+        # Toutes les requêtes SQL passent par le travailleur, la fenêtre n'attend jamais la base de donnée
+        self.travailleur = travailleur if travailleur is not None else TravailleurBase().demarrer()
+        self.en_attente = []
+        self.verification_programmee = False
+        # Identifiant provisoire (négatif) des tâches affichées avant d'être enregistrées
+        self.identifiant_provisoire = 0
+        # Numéro du dernier chargement demandé : la réponse d'un chargement dépassé est ignorée
+        self.numero_chargement = 0
+        self.page_en_cours = False
+        # Tâches trouvées par la recherche en cours (None = pas de recherche)
+        self.resultats_recherche = None
+        self.numero_recherche = 0
+        self.recherche_programmee = None
+
+        self.style = ttk.Style()
+        self.style.configure("TLabel", font = ("Helvetica", 12))
+        self.style.configure("TButton", font = ("Helvetica", 12))
+
+        # La classe Frame du module ttk permet de définir une fenêtre, qui viendra ce placer au dessus de la fenêtre principale
+        self.fenetre_connexion = ttk.Frame(principale)
+        self.fenetre_connexion.pack(padx = 10, pady = 10)
+
+        # La classe Label du module ttk permet de définir une chaîne de caractère affichable
+        self.identifiant_texte = ttk.Label(self.fenetre_connexion, text = "Identifiant")
+        self.identifiant_texte.grid(row = 0, column = 0, padx = 5, pady = 5)
+        # La classe Entry du module ttk permet à l'utilisateur d'entrer une chaîne de caractère
+        self.identifiant_entree = ttk.Entry(self.fenetre_connexion)
+        self.identifiant_entree.grid(row = 0, column = 1, padx = 5, pady = 5)
+
+        self.mdp_texte = ttk.Label(self.fenetre_connexion, text = "Mot de passe")
+        self.mdp_texte.grid(row = 1, column = 0, padx = 5, pady = 5)
+        self.mdp_entree = ttk.Entry(self.fenetre_connexion, show = "*")
+        self.mdp_entree.grid(row = 1, column = 1, padx = 5, pady = 5)
+
+        # La classe Button du module ttk permet de créer une zone clickable qui exécutera une commande
+        self.connexion_bouton = ttk.Button(self.fenetre_connexion, text = "Se connecter", command = self.connexion)
+        self.connexion_bouton.grid(row = 2, column=0, columnspan=2, pady = 10)
+
+        self.creer_compte_bouton = ttk.Button(self.fenetre_connexion, text = "Créer un compte", command = self.créer_compte)
+        self.creer_compte_bouton.grid(row = 3, column = 0, columnspan = 2, pady = 10)
+
+        # Fenêtre de mesures cachée, ouverte avec la touche F12
+        self.fenetre_mesures = None
+        self.principale.bind("<F12>", self.ouvrir_fenetre_mesures)
+
+        self.verifier_expirations()
+
+
+    def ouvrir_fenetre_mesures(self, evenement = None) :
+        """Todolist -> None
+        Active les mesures et affiche une fenêtre qui les résume, mise à jour chaque seconde"""
+        mesures.activer()
+        if self.fenetre_mesures is not None and self.fenetre_mesures.winfo_exists() :
+            self.fenetre_mesures.lift()
+            return
+        # La classe Toplevel permet d'ouvrir une fenêtre séparée de la fenêtre principale
+        self.fenetre_mesures = tk.Toplevel(self.principale)
+        self.fenetre_mesures.title("Mesures")
+        texte = tk.Text(self.fenetre_mesures, width = 110, height = 35, font = ("Courier", 10))
+        texte.pack(fill = "both", expand = True)
+        ttk.Button(self.fenetre_mesures, text = "Remettre à zéro", command = mesures.vider).pack(pady = 5)
+
+        def actualiser() :
+            """None -> None
+            Réécrit le résumé des mesures tant que la fenêtre est ouverte"""
+            if not texte.winfo_exists() :
+                return
+            instantane = mesures.instantane()
+            lignes = [f"{'Fonction':<60}{'appels':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'total ms':>12}"]
+            for nom, mesure in sorted(instantane["fonctions"].items(), key = lambda element : -element[1]["somme_s"]) :
+                lignes.append(f"{nom[-60:]:<60}{mesure['total']:>8}{mesure['p50_s'] * 1000:>10.1f}{mesure['p99_s'] * 1000:>10.1f}"
+                              f"{mesure['max_s'] * 1000:>10.1f}{mesure['somme_s'] * 1000:>12.1f}")
+            lignes.append("")
+            lignes.append(f"{'Requête':<60}{'appels':>8}{'lignes':>10}{'p99 ms':>10}{'max ms':>10}{'total ms':>12}")
+            for requete, mesure in sorted(instantane["requetes"].items(), key = lambda element : -element[1]["duree"]["somme_s"]) :
+                duree = mesure["duree"]
+                lignes.append(f"{' '.join(requete.split())[:60]:<60}{duree['total']:>8}{mesure['lignes']:>10}{duree['p99_s'] * 1000:>10.1f}"
+                              f"{duree['max_s'] * 1000:>10.1f}{(duree['somme_s'] + mesure['lecture_s']) * 1000:>12.1f}")
+            lignes.append("")
+            lignes.append("Requêtes exécutées par sqlite3 : " + ", ".join(f"{type_requete} {nombre}" for type_requete, nombre in instantane["executions"].items()))
+            lignes.append("Instructions sqlite3 : " + ", ".join(f"{type_requete} {nombre}" for type_requete, nombre in instantane["instructions"].items()))
+            lignes.append("Compteurs : " + ", ".join(f"{nom} {nombre}" for nom, nombre in instantane["compteurs"].items()))
+            texte.delete("1.0", "end")
+            texte.insert("1.0", "\n".join(lignes))
+            self.principale.after(1000, actualiser)
+
+        actualiser()
+
+
+    @mesures.mesurer
+    def verifier_expirations(self) :
+        """Todolist -> None
+        Affiche les tâches expirées signalées par le planificateur
+        Les fenêtres Tk ne peuvent être ouvertes que depuis la boucle principale : le planificateur
+        dépose les tâches expirées dans une file, relue ici toutes les secondes grâce à after()"""
+        # La file est vidée en une fois : toutes les tâches expirées depuis le dernier passage
+        # sont signalées dans une seule fenêtre (une fenêtre par tâche bloquerait l'utilisateur)
+        expirees = []
+        try :
+            while True :
+                expirees.append(self.planificateur.evenements.get_nowait())
+        except queue.Empty :
+            pass
+        if expirees and self.utilisateur_actuel is not None :
+            self.afficher_tableau()
+            # L'échéance d'une occurrence de tâche répétée change la période des occurrences affichées
+            if any(isinstance(tache.tache_id, str) for tache in expirees) :
+                self.charger_occurrences()
+            noms = [f"- {tache.nom}" for tache in expirees[:EXPIREES_AFFICHEES]]
+            if len(expirees) > EXPIREES_AFFICHEES :
+                noms.append(f"... et {len(expirees) - EXPIREES_AFFICHEES} autre(s)")
+            # La fonction showwarning() permet d'afficher une fenêtre d'avertissement personnalisée
+            if len(expirees) == 1 :
+                messagebox.showwarning("Tâche expirée", f"La tâche \"{expirees[0].nom}\" a expiré")
+            else :
+                messagebox.showwarning("Tâches expirées", f"{len(expirees)} tâches ont expiré :\n" + "\n".join(noms))
+        # La fonction after() programme un appel de fonction dans la boucle principale de Tk
+        self.principale.after(1000, self.verifier_expirations)
+
+
+    def executer(self, fonction, *arguments, succes = None, echec = None) :
+        """Todolist, function, ... -> None
+        Confie une fonction au travailleur de la base de donnée
+        Quand elle est terminée, "succes" est appelée avec son résultat, ou "echec" avec l'erreur,
+        toujours depuis la boucle principale de Tk. Si l'utilisateur s'est déconnecté entre-temps,
+        le résultat est ignoré"""
+        self.en_attente.append((self.travailleur.soumettre(fonction, *arguments), self.utilisateur_actuel, succes, echec))
+        if not self.verification_programmee :
+            self.verification_programmee = True
+            self.principale.after(self.INTERVALLE_RESULTATS, self.verifier_resultats)
+
+
+    def verifier_resultats(self) :
+        """Todolist -> None
+        Transmet les résultats des requêtes terminées, et revérifie plus tard s'il en reste en cours"""
+        # Les fonctions appelées plus bas peuvent confier de nouvelles requêtes : on part d'une liste vide
+        en_attente, self.en_attente = self.en_attente, []
+        terminees = []
+        # On trie en une seule passe : une requête qui se termine pendant le tri attend la prochaine vérification
+        for attente in en_attente :
+            (terminees if attente[0].done() else self.en_attente).append(attente)
+        for futur, utilisateur, succes, echec in terminees :
+            if utilisateur != self.utilisateur_actuel :
+                continue
+            debut = time.perf_counter()
+            erreur = futur.exception()
+            if erreur is None :
+                if succes is not None :
+                    succes(futur.result())
+            elif echec is not None :
+                echec(erreur)
+            else :
+                self.afficher_erreur(erreur)
+            if mesures.actif :
+                # Le nom de la fonction de retour indique quelle action a mis à jour l'affichage
+                retour = succes if erreur is None else echec
+                mesures.observer(getattr(retour, "__qualname__", "Todolist.afficher_erreur"), time.perf_counter() - debut)
+        if self.en_attente :
+            self.principale.after(self.INTERVALLE_RESULTATS, self.verifier_resultats)
+        else :
+            self.verification_programmee = False
+
+
+    def afficher_erreur(self, erreur) :
+        """Todolist, Exception -> None
+        Prévient l'utilisateur qu'une opération sur la base de donnée a échoué"""
+        # La fonction showerror() permet d'afficher une fenêtre d'erreur personnalisée
+        messagebox.showerror("Erreur", f"L'opération n'a pas pu être enregistrée : {erreur}")
+
+
+    @mesures.mesurer
+    def connexion(self) :
+        """Todolist -> None
+        Vérifie les informations de connexion et affiche la fenêtre principale si les informations sont correctes"""
+        identifiant = self.identifiant_entree.get()
+        mdp = self.mdp_entree.get()
+
+        def verifier() :
+            """None -> int
+            Renvoie l'identifiant de l'utilisateur si les informations sont correctes, sinon None"""
+            return obtenir_id_utilisateur(identifiant) if se_connecter(identifiant, mdp) else None
+
+        def resultat(utilisateur) :
+            """int -> None
+            Affiche la fenêtre principale, ou une erreur si la connexion a échoué"""
+            if utilisateur is not None and self.utilisateur_actuel is None :
+                self.utilisateur_actuel = utilisateur
+                self.montrer_fenetre_principale()
+            elif utilisateur is None :
+                messagebox.showerror("Connection échouée", "L'identifiant ou le mot de passe est incorrect")
+
+        self.executer(verifier, succes = resultat)
+
+
+    @mesures.mesurer
+    def créer_compte(self) :
+        """Todolist -> None
+        Crée un compte utilisateur et affiche un message de confirmation"""
+        identifiant = self.identifiant_entree.get()
+        mdp = self.mdp_entree.get()
+
+        def resultat(cree) :
+            """bool -> None
+            Affiche le résultat de la création du compte"""
+            if cree :
+                # La fonction showinfo() permet d'afficher une fenêtre d'information personnalisée
+                messagebox.showinfo("Compte créé", "Votre compte a été créé avec succès")
+            else:
+                messagebox.showerror("Création échouée", "L'identifiant est déjà enregistré")
+
+        self.executer(nouveau_compte, identifiant, mdp, succes = resultat)
+
+
+    @mesures.mesurer
+    def montrer_fenetre_principale(self) :
+        """Todolist -> None
+        Affiche la fenêtre principale de l'application"""
+        # La fonction pack_forget() permet de supprimer une fenêtre affichée à l'écran
+        self.fenetre_connexion.pack_forget()
+        self.fenetre_principale = ttk.Frame(self.principale)
+        self.fenetre_principale.pack(padx = 10, pady = 10)
+
+        # Tableau de bord : les compteurs de tâches de l'utilisateur, tenus à jour par la base de donnée
+        self.compteurs = None
+        self.tableau_texte = ttk.Label(self.fenetre_principale, text = "")
+        self.tableau_texte.grid(row = 0, column = 0, columnspan = 3, padx = 5, pady = 5, sticky = "w")
+
+        self.cadre_recherche = ttk.Frame(self.fenetre_principale)
+        self.cadre_recherche.grid(row = 1, column = 0, columnspan = 3, padx = 5, pady = 5, sticky = "ew")
+        self.recherche_texte = ttk.Label(self.cadre_recherche, text = "Rechercher")
+        self.recherche_texte.pack(side = "left", padx = 5)
+        self.recherche_entree = ttk.Entry(self.cadre_recherche)
+        self.recherche_entree.pack(side = "left", fill = "x", expand = True)
+        # L'évènement <KeyRelease> est déclenché à chaque touche relâchée dans le champ de recherche
+        self.recherche_entree.bind("<KeyRelease>", self.programmer_recherche)
+        self.resultats_recherche = None
+
+        self.choix_filtre = tk.StringVar(value = "Toutes")
+        self.filtre_combobox = ttk.Combobox(self.cadre_recherche, textvariable = self.choix_filtre, values = list(FILTRES_AFFICHAGE), state = "readonly", width = 14)
+        self.filtre_combobox.pack(side = "left", padx = 5)
+        self.choix_tri = tk.StringVar(value = "Par défaut")
+        self.tri_combobox = ttk.Combobox(self.cadre_recherche, textvariable = self.choix_tri, values = list(TRIS_AFFICHAGE), state = "readonly", width = 12)
+        self.tri_combobox.pack(side = "left")
+        # L'évènement <<ComboboxSelected>> est déclenché quand l'utilisateur choisit une valeur
+        self.filtre_combobox.bind("<<ComboboxSelected>>", lambda evenement : self.rafraichir_taches())
+        self.tri_combobox.bind("<<ComboboxSelected>>", lambda evenement : self.rafraichir_taches())
+
+        self.vue_taches = VueTaches(self.fenetre_principale)
+        self.vue_taches.grid(row = 2, column = 0, columnspan = 3, padx = 5, pady = 5)
+        self.vue_taches.source_suite = self.charger_page_suivante
+        self.vue_taches.source_enfants = self.charger_enfants
+
+        self.rafraichir_taches()
+        # Le planificateur a besoin de toutes les tâches en cours, pas seulement de celles affichées
+        self.executer(obtenir_taches_ouvertes, self.utilisateur_actuel, succes = self.planificateur.charger)
+        self.actualiser_tableau()
+
+        self.ajouter_tache_bouton = ttk.Button(self.fenetre_principale, text = "Ajouter une tâche", command = self.ajouter_tache)
+        self.ajouter_tache_bouton.grid(row = 3, column = 0, pady = 5)
+
+        self.completer_bouton = ttk.Button(self.fenetre_principale, text = "Marquer comme complêtée", command = self.marquer_completee)
+        self.completer_bouton.grid(row = 3, column = 1, pady = 5)
+
+        self.sous_tache_bouton = ttk.Button(self.fenetre_principale, text = "Ajouter une sous-tâche", command = self.ajouter_sous_tache)
+        self.sous_tache_bouton.grid(row = 3, column = 2, padx = 5, pady = 5)
+
+        self.deco_bouton = ttk.Button(self.fenetre_principale, text = "Se déconnecter", command = self.deconnecter)
+        self.deco_bouton.grid(row = 5, column = 0, pady = 5)
+
+        self.archives_bouton = ttk.Button(self.fenetre_principale, text = "Tâches archivées", command = self.afficher_archives)
+        self.archives_bouton.grid(row = 5, column = 1, padx = 5, pady = 5)
+
+        self.supprimer_bouton = ttk.Button(self.fenetre_principale, text = "Supprimer la tâche", command = self.supprimer_tache)
+        self.supprimer_bouton.grid(row = 4, column = 0, pady = 5)
+
+        self.description_bouton = ttk.Button(self.fenetre_principale, text = "Description de la tâche", command = self.description_tache)
+        self.description_bouton.grid(row = 4, column = 1, padx = 5, pady = 5) 
+
+        self.modifier_tache_bouton = ttk.Button(self.fenetre_principale, text = "Modifier la tâche", command = self.modif_tache)
+        self.modifier_tache_bouton.grid(row = 4, column = 2, padx = 5, pady = 5)
+
+        # Occurrences des tâches répétées des prochains jours : elles ne sont pas dans la base de donnée
+        # tant qu'elles ne sont pas faites, elles ont donc leur propre liste
+        self.occurrences = {}
+        self.cadre_occurrences = ttk.Frame(self.fenetre_principale)
+        self.cadre_occurrences.grid(row = 6, column = 0, columnspan = 3, padx = 5, pady = 5, sticky = "ew")
+        ttk.Label(self.cadre_occurrences, text = f"Tâches répétées ({JOURS_OCCURRENCES} prochains jours)").pack(anchor = "w")
+        self.arbre_occurrences = ttk.Treeview(self.cadre_occurrences, columns = ("echeance", "priorite"), height = 5, selectmode = "browse")
+        self.arbre_occurrences.heading("#0", text = "Tâche")
+        self.arbre_occurrences.heading("echeance", text = "Échéance")
+        self.arbre_occurrences.heading("priorite", text = "Priorité")
+        self.arbre_occurrences.pack(fill = "x")
+        self.occurrence_bouton = ttk.Button(self.cadre_occurrences, text = "Marquer l'occurrence comme faite", command = self.marquer_occurrence)
+        self.occurrence_bouton.pack(side = "left", pady = 5)
+        self.modifier_occurrence_bouton = ttk.Button(self.cadre_occurrences, text = "Modifier l'occurrence", command = self.modifier_occurrence)
+        self.modifier_occurrence_bouton.pack(side = "left", padx = 5, pady = 5)
+        self.arreter_bouton = ttk.Button(self.cadre_occurrences, text = "Arrêter la répétition", command = self.arreter_repetition)
+        self.arreter_bouton.pack(side = "left", padx = 5, pady = 5)
+        self.recharger_recurrences()
+        # L'archivage passe après les premières lectures : la fenêtre s'affiche sans l'attendre
+        self.executer(archiver_taches, self.utilisateur_actuel, JOURS_ARCHIVAGE, succes = self.archivage_termine)
+
+
+    def archivage_termine(self, archivees) :
+        """Todolist, int -> None
+        Recharge la liste et le tableau de bord si des tâches ont été archivées"""
+        if archivees and self.utilisateur_actuel is not None :
+            self.rafraichir_taches()
+            self.actualiser_tableau()
+
+
+    def afficher_archives(self) :
+        """Todolist -> None
+        Affiche les tâches archivées dans une autre fenêtre, page par page : l'archive n'est lue qu'à la demande"""
+        fenetre_archives = tk.Toplevel(self.principale)
+        fenetre_archives.title("Tâches archivées")
+        arbre_archives = ttk.Treeview(fenetre_archives, columns = ("echeance", "priorite"), height = 15, selectmode = "browse")
+        arbre_archives.heading("#0", text = "Tâche")
+        arbre_archives.heading("echeance", text = "Échéance")
+        arbre_archives.heading("priorite", text = "Priorité")
+        arbre_archives.pack(fill = "both", expand = True, padx = 5, pady = 5)
+        # Curseur de la page suivante (None au début, puis False quand toutes les pages ont été lues)
+        suite = {"curseur" : None}
+
+        def resultat(page) :
+            """list, int -> None
+            Ajoute une page de tâches archivées à la fin de la liste"""
+            taches, curseur = page
+            if not fenetre_archives.winfo_exists() :
+                return
+            for tache in taches :
+                arbre_archives.insert("", "end", text = tache.nom, values = (tache.echeance_saisie, tache.priorite))
+            suite["curseur"] = curseur if curseur is not None else False
+            if curseur is None :
+                bouton_suite.config(state = "disabled")
+
+        def page_suivante() :
+            """None -> None
+            Demande la page suivante de tâches archivées"""
+            if suite["curseur"] is not False :
+                self.executer(obtenir_taches_archivees, self.utilisateur_actuel, suite["curseur"], VueTaches.TAILLE_PAGE, succes = resultat)
+
+        bouton_suite = ttk.Button(fenetre_archives, text = "Afficher plus", command = page_suivante)
+        bouton_suite.pack(side = "left", padx = 5, pady = 5)
+        ttk.Button(fenetre_archives, text = "Fermer", command = fenetre_archives.destroy).pack(side = "right", padx = 5, pady = 5)
+        page_suivante()
+
+
+    def actualiser_tableau(self) :
+        """Todolist -> None
+        Relit les compteurs de tâches de l'utilisateur (une seule ligne de la base de donnée) et les affiche"""
+        self.executer(obtenir_compteurs, self.utilisateur_actuel, succes = self.afficher_tableau)
+
+
+    def afficher_tableau(self, compteurs = None) :
+        """Todolist, dict -> None
+        Affiche le tableau de bord. Le nombre de tâches en retard vient du planificateur, qui
+        le tient à jour à chaque échéance passée : il n'est jamais recalculé depuis la base de donnée"""
+        if compteurs is not None :
+            self.compteurs = compteurs
+        if self.compteurs is None :
+            return
+        compteurs = self.compteurs
+        self.tableau_texte.config(text = f"{compteurs['total']} tâches  ·  {compteurs['ouvertes']} en cours  ·  "
+                                         f"{compteurs['completees']} complétées  ·  {self.planificateur.nb_expirees()} en retard  ·  "
+                                         + "  ·  ".join(f"{priorite} {compteurs[priorite]}" for priorite in reversed(PRIORITES)))
+
+
+    @mesures.mesurer
+    def rafraichir_taches(self) :
+        """Todolist -> None
+        Recharge la première page de tâches, avec le filtre et le tri choisis, et l'affiche dans la fenêtre principale"""
+        # Les sous-tâches ne sont pas dans la liste : elles s'affichent sous leur tâche parente
+        filtres = dict(FILTRES_AFFICHAGE[self.choix_filtre.get()], racines = True)
+        tri = TRIS_AFFICHAGE[self.choix_tri.get()]
+        self.numero_chargement += 1
+        numero = self.numero_chargement
+
+        def resultat(page) :
+            """list, tuple -> None
+            Remplace le contenu du cache par la première page"""
+            if numero != self.numero_chargement :
+                return
+            taches, self.curseur_page = page
+            self.page_en_cours = False
+            self.cache_taches.charger(taches, filtres, tri, complet = self.curseur_page is None)
+            self.actualiser_vue(depuis_le_debut = True)
+
+        self.executer(obtenir_page_taches, self.utilisateur_actuel, filtres, tri, None, VueTaches.TAILLE_PAGE, succes = resultat)
+
+
+    @mesures.mesurer
+    def charger_page_suivante(self) :
+        """Todolist -> None
+        Demande la page de tâches suivante quand l'utilisateur arrive en bas de la liste
+        La vue est complétée quand la page arrive"""
+        if self.cache_taches.complet or self.page_en_cours or self.resultats_recherche is not None :
+            return
+        self.page_en_cours = True
+        numero = self.numero_chargement
+
+        def resultat(page) :
+            """list, tuple -> None
+            Ajoute la page à la fin du cache et l'affiche"""
+            if numero != self.numero_chargement :
+                return
+            taches, self.curseur_page = page
+            self.page_en_cours = False
+            self.cache_taches.ajouter_page(taches, complet = self.curseur_page is None)
+            self.vue_taches.afficher_suite()
+            self.demander_progression([tache.tache_id for tache in taches])
+
+        self.executer(obtenir_page_taches, self.utilisateur_actuel, self.cache_taches.filtres, self.cache_taches.tri,
+                      self.curseur_page, VueTaches.TAILLE_PAGE, succes = resultat)
+
+
+    @mesures.mesurer
+    def actualiser_vue(self, progression = True, depuis_le_debut = False) :
+        """Todolist, bool, bool -> None
+        Affiche les tâches du cache, ou seulement celles trouvées si une recherche est en cours
+        (progression = False quand l'avancement des tâches affichées n'a pas pu changer,
+        depuis_le_debut = True quand la liste a changé entièrement : la vue revient en haut)"""
+        if self.resultats_recherche is None :
+            self.vue_taches.afficher(self.cache_taches.taches, depuis_le_debut)
+        else :
+            self.vue_taches.afficher(self.resultats_recherche, depuis_le_debut)
+        if progression :
+            self.demander_progression()
+
+
+    def demander_progression(self, ids_taches = None) :
+        """Todolist, list -> None
+        Relit l'avancement des sous-tâches des tâches données (par défaut toutes celles affichées)
+        La requête passe après les écritures déjà confiées au travailleur : elle voit leur résultat"""
+        ids_taches = [tache_id for tache_id in (ids_taches if ids_taches is not None else self.vue_taches.ids_affiches()) if tache_id > 0]
+        if ids_taches :
+            self.executer(progression_taches, ids_taches,
+                          succes = lambda progression : self.vue_taches.afficher_progression(ids_taches, progression))
+
+
+    def charger_enfants(self, parent_id) :
+        """Todolist, int -> None
+        Lit les sous-tâches directes d'une tâche que l'utilisateur vient de déplier"""
+        def resultat(enfants) :
+            """list -> None
+            Affiche les sous-tâches et demande l'avancement de leurs propres sous-tâches"""
+            self.vue_taches.afficher_enfants(parent_id, enfants)
+            self.demander_progression([enfant.tache_id for enfant in enfants])
+
+        self.executer(obtenir_sous_taches, parent_id, succes = resultat)
+
+
+    def modifier_recherche(self, tache_id, tache) :
+        """Todolist, int, tuple -> None
+        Répercute la modification d'une tâche sur les résultats de la recherche en cours (tache = None si elle est supprimée)"""
+        if self.resultats_recherche is not None :
+            self.resultats_recherche = [tache if resultat.tache_id == tache_id else resultat for resultat in self.resultats_recherche
+                                        if resultat.tache_id != tache_id or tache is not None]
+
+
+    def programmer_recherche(self, evenement = None) :
+        """Todolist -> None
+        Lance la recherche un court instant après la dernière touche tapée"""
+        # Chaque nouvelle touche annule la recherche prévue : on ne cherche pas à chaque lettre d'un mot tapé vite
+        if self.recherche_programmee is not None :
+            self.principale.after_cancel(self.recherche_programmee)
+        self.recherche_programmee = self.principale.after(200, self.lancer_recherche)
+
+
+    @mesures.mesurer
+    def lancer_recherche(self) :
+        """Todolist -> None
+        Lance la recherche dans le thread du travailleur pour ne pas bloquer la fenêtre"""
+        self.recherche_programmee = None
+        texte = self.recherche_entree.get()
+        self.numero_recherche += 1
+        if not texte.strip() :
+            self.resultats_recherche = None
+            self.actualiser_vue(depuis_le_debut = True)
+            return
+        numero = self.numero_recherche
+
+        def resultat(resultats) :
+            """list -> None
+            Affiche le résultat de la recherche"""
+            # Le résultat d'une recherche dépassée par une frappe plus récente est ignoré
+            if numero == self.numero_recherche and self.utilisateur_actuel is not None :
+                self.resultats_recherche = resultats
+                self.actualiser_vue(depuis_le_debut = True)
+
+        self.executer(rechercher_taches, self.utilisateur_actuel, texte, succes = resultat)
+
+
+    @mesures.mesurer
+    def ajouter_tache(self, parent_id = None) :
+        """Todolist, int -> None
+        Affiche une fenêtre pour ajouter une nouvelle tâche, ou une sous-tâche de la tâche parent_id"""
+        fenetre_tache = tk.Toplevel(self.principale)
+        fenetre_tache.title("Ajouter une tâche" if parent_id is None else "Ajouter une sous-tâche")
+
+        nom_tache_texte = ttk.Label(fenetre_tache, text = "Nom de la tâche")
+        nom_tache_texte.grid(row = 0, column = 0, padx = 5, pady = 5)
+        nom_tache_entree = ttk.Entry(fenetre_tache)
+        nom_tache_entree.grid(row = 0, column = 1, padx = 5, pady = 5)
+
+        description_tache_texte = ttk.Label(fenetre_tache, text = "Description de la tâche")
+        description_tache_texte.grid(row = 1, column = 0, padx = 5, pady = 5)
+        description_tache_entree = ttk.Entry(fenetre_tache)
+        description_tache_entree.grid(row = 1, column = 1, padx = 5, pady = 5)
+
+        echeance_texte = ttk.Label(fenetre_tache, text = "Date limite (JJ-MM-AAAA)")
+        echeance_texte.grid(row = 2, column = 0, padx = 5, pady = 5)
+        echeance_entree = ttk.Entry(fenetre_tache)
+        echeance_entree.grid(row = 2, column = 1, padx = 5, pady = 5)
+
+        prio_texte = ttk.Label(fenetre_tache, text = "Priorité")
+        prio_texte.grid(row = 3, column = 0, padx = 5, pady = 5)
+
+        # La class Stringvar permet de vérifier l'état d'un widget à une variable
+        choix_prio = tk.StringVar()
+        # La class Combobox permet de créer un widget de sélection
+        prio_combobox = ttk.Combobox(fenetre_tache, textvariable = choix_prio)
+        prio_combobox["values"] = PRIORITES
+        prio_combobox.bind("Séléction", choix_prio.get())
+        prio_combobox.grid(row = 3, column = 1, padx = 5, pady = 5)
+
+        # Une tâche principale peut être répétée : l'échéance est alors la date de la première occurrence
+        choix_repetition = tk.StringVar(value = "Aucune")
+        fin_repetition_entree = ttk.Entry(fenetre_tache)
+        if parent_id is None :
+            ttk.Label(fenetre_tache, text = "Répétition").grid(row = 4, column = 0, padx = 5, pady = 5)
+            ttk.Combobox(fenetre_tache, textvariable = choix_repetition, values = list(REPETITIONS_AFFICHAGE),
+                         state = "readonly").grid(row = 4, column = 1, padx = 5, pady = 5)
+            ttk.Label(fenetre_tache, text = "Fin de la répétition (facultative)").grid(row = 5, column = 0, padx = 5, pady = 5)
+            fin_repetition_entree.grid(row = 5, column = 1, padx = 5, pady = 5)
+
+        def enregistrer_tache() :
+            """Todolist -> None
+            Enregistre une nouvelle tâche dans la base de donnée"""
+            nom_tache = nom_tache_entree.get()
+            description = description_tache_entree.get()
+            echeance = echeance_entree.get()
+            priorite = choix_prio.get()
+            if not self.date_valide(echeance) :
+                return
+            if priorite not in PRIORITES :
+                messagebox.showwarning("Priorité invalide", "Choisissez une priorité dans la liste")
+                return
+            if parent_id is not None :
+                self.enregistrer_sous_tache(parent_id, nom_tache, description, echeance, priorite)
+                fenetre_tache.destroy()
+                return
+            frequence = REPETITIONS_AFFICHAGE[choix_repetition.get()]
+            if frequence is not None :
+                fin = fin_repetition_entree.get().strip() or None
+                if fin is not None and not self.date_valide(fin) :
+                    return
+                self.executer(ajouter_recurrence, self.utilisateur_actuel, nom_tache, description, echeance, priorite,
+                              frequence, 1, fin, succes = lambda recurrence_id : self.recharger_recurrences())
+                fenetre_tache.destroy()
+                return
+            # La tâche est affichée tout de suite avec un identifiant provisoire, sans attendre la base de donnée
+            self.identifiant_provisoire -= 1
+            provisoire = Tache(self.identifiant_provisoire, self.utilisateur_actuel, nom_tache, description, date_vers_iso(echeance), 0, priorite)
+            self.cache_taches.ajouter(provisoire)
+            self.actualiser_vue()
+
+            def enregistree(tache_id) :
+                """int -> None
+                Remplace la tâche provisoire par la tâche enregistrée"""
+                tache = provisoire.remplacer(tache_id = tache_id)
+                self.cache_taches.supprimer(provisoire.tache_id)
+                self.cache_taches.ajouter(tache)
+                self.actualiser_vue()
+                self.planificateur.ajouter_tache(tache)
+                self.actualiser_tableau()
+
+            def refusee(erreur) :
+                """Exception -> None
+                Retire la tâche provisoire si elle n'a pas pu être enregistrée"""
+                self.cache_taches.supprimer(provisoire.tache_id)
+                self.actualiser_vue()
+                self.afficher_erreur(erreur)
+
+            self.executer(ajouter_tache, self.utilisateur_actuel, nom_tache, description, echeance, priorite,
+                          succes = enregistree, echec = refusee)
+            # La fonction destroy() permet d'enlever une fenêtre affichée à l'écran
+            fenetre_tache.destroy()
+
+        def annuler() :
+            """Todolist -> None
+            Ferme la fenêtre d'ajout de tâche"""
+            fenetre_tache.destroy()
+
+        bouton_enregistrement = ttk.Button(fenetre_tache, text = "Enregistrer la tâche", command = enregistrer_tache)
+        bouton_enregistrement.grid(row = 6, column = 1, padx = 5, pady = 5)
+
+        bouton_annuler = ttk.Button(fenetre_tache, text = "Annuler", command = annuler)
+        bouton_annuler.grid(row = 6, column = 0, padx = 5, pady = 5)
+    
+    
+    def date_valide(self, date) :
+        """Todolist, str -> Bool
+        Vérifie si la date est valide (JJ-MM-AAAA), sinon prévient l'utilisateur"""
+        try :
+            datetime.strptime(date, "%d-%m-%Y")
+            return True
+        except ValueError :
+            messagebox.showwarning("Date invalide", "Veuillez rentrer une date valide")
+            return False
+
+
+    def ajouter_sous_tache(self) :
+        """Todolist -> None
+        Affiche une fenêtre pour ajouter une sous-tâche à la tâche sélectionnée"""
+        tache_selectionnee = self.vue_taches.selection()
+        if tache_selectionnee is None :
+            messagebox.showwarning("Aucune séléction", "Choisissez la tâche qui recevra la sous-tâche")
+            return
+        if tache_selectionnee < 0 :
+            messagebox.showwarning("Tâche en cours d'enregistrement", "Patientez un instant avant d'ajouter une sous-tâche")
+            return
+        self.ajouter_tache(parent_id = tache_selectionnee)
+
+
+    def enregistrer_sous_tache(self, parent_id, nom_tache, description, echeance, priorite) :
+        """Todolist, int, str, str, str, str -> None
+        Enregistre une sous-tâche puis l'affiche sous sa tâche parente, si celle-ci est dépliée"""
+        def enregistree(tache_id) :
+            """int -> None
+            Planifie la sous-tâche et met à jour l'affichage"""
+            self.planificateur.ajouter_tache(Tache(tache_id, self.utilisateur_actuel, nom_tache, description,
+                                                   date_vers_iso(echeance), 0, priorite, parent_id))
+            if parent_id in self.vue_taches.enfants :
+                self.charger_enfants(parent_id)
+            # L'avancement de toutes les tâches parentes affichées change
+            self.demander_progression()
+            self.actualiser_tableau()
+
+        self.executer(ajouter_sous_tache, parent_id, nom_tache, description, echeance, priorite, succes = enregistree)
+    
+    
+    def charger_occurrences(self) :
+        """Todolist -> None
+        Calcule les occurrences des tâches répétées des prochains jours et les affiche"""
+        self.executer(obtenir_occurrences, self.utilisateur_actuel, JOURS_OCCURRENCES, succes = self.afficher_occurrences)
+
+
+    def afficher_occurrences(self, occurrences) :
+        """Todolist, list -> None
+        Remplace les occurrences affichées (la liste est courte : elle est redessinée entièrement)"""
+        self.occurrences = {occurrence.tache_id : occurrence for occurrence in occurrences}
+        self.arbre_occurrences.delete(*self.arbre_occurrences.get_children())
+        for occurrence in occurrences :
+            self.arbre_occurrences.insert("", "end", iid = occurrence.tache_id, text = occurrence.nom,
+                                          values = (occurrence.echeance_saisie, occurrence.priorite))
+
+
+    def recharger_recurrences(self) :
+        """Todolist -> None
+        Relit les tâches répétées (à la connexion, après l'ajout ou l'arrêt d'une règle) : liste des occurrences et planificateur"""
+        self.charger_occurrences()
+        aujourdhui = date.today()
+
+        def planifier(recurrences) :
+            """list -> None
+            Planifie la prochaine occurrence de chaque règle, sans celles déjà complétées ou modifiées"""
+            self.executer(obtenir_occurrences_materialisees, self.utilisateur_actuel, aujourdhui,
+                          succes = lambda materialisees : self.planificateur.charger_recurrences(recurrences, aujourdhui, materialisees))
+
+        self.executer(obtenir_recurrences, self.utilisateur_actuel, succes = planifier)
+
+
+    @mesures.mesurer
+    def marquer_occurrence(self) :
+        """Todolist -> None
+        Marque l'occurrence sélectionnée comme faite : elle devient une tâche complétée"""
+        selection = self.arbre_occurrences.selection()
+        if not selection :
+            messagebox.showwarning("Aucune séléction", "Choisissez une occurrence à marquer comme faite")
+            return
+        occurrence = self.occurrences[selection[0]]
+        self.arbre_occurrences.delete(occurrence.tache_id)
+        self.planificateur.passer_occurrence(occurrence.tache_id)
+
+        def enregistree(tache_id) :
+            """int -> None
+            Ajoute la tâche complétée à la liste"""
+            self.cache_taches.ajouter(occurrence.remplacer(tache_id = tache_id, est_completee = 1))
+            self.actualiser_vue()
+            self.actualiser_tableau()
+
+        def refusee(erreur) :
+            """Exception -> None
+            Réaffiche les occurrences telles qu'elles sont dans la base de donnée"""
+            self.recharger_recurrences()
+            self.afficher_erreur(erreur)
+
+        self.executer(completer_occurrence, occurrence.tache_id, succes = enregistree, echec = refusee)
+
+
+    def modifier_occurrence(self) :
+        """Todolist -> None
+        Enregistre l'occurrence sélectionnée comme une vraie tâche, puis ouvre sa fenêtre de modification
+        Les autres occurrences de la règle ne changent pas"""
+        selection = self.arbre_occurrences.selection()
+        if not selection :
+            messagebox.showwarning("Aucune séléction", "Choisissez une occurrence à modifier")
+            return
+        occurrence = self.occurrences[selection[0]]
+
+        def enregistree(tache_id) :
+            """int -> None
+            Remplace l'occurrence par sa tâche dans les listes et le planificateur, et ouvre la modification"""
+            tache = occurrence.remplacer(tache_id = tache_id)
+            if self.arbre_occurrences.exists(occurrence.tache_id) :
+                self.arbre_occurrences.delete(occurrence.tache_id)
+            self.planificateur.passer_occurrence(occurrence.tache_id)
+            self.planificateur.ajouter_tache(tache)
+            self.cache_taches.ajouter(tache)
+            self.actualiser_vue()
+            self.actualiser_tableau()
+            self.fenetre_modification(tache)
+
+        self.executer(materialiser_occurrence, occurrence.tache_id, succes = enregistree)
+
+
+    def arreter_repetition(self) :
+        """Todolist -> None
+        Supprime la règle de l'occurrence sélectionnée : plus aucune occurrence n'est proposée"""
+        selection = self.arbre_occurrences.selection()
+        if not selection :
+            messagebox.showwarning("Aucune séléction", "Choisissez une occurrence de la tâche répétée à arrêter")
+            return
+        self.executer(supprimer_recurrence, int(selection[0].split(":")[0]), succes = lambda resultat : self.recharger_recurrences())
+    
+    
+    def modif_tache(self) :
+        """Todolist -> None
+        Affiche une fenêtre pour modifier le nom, la description, l'échéance et la priorité de la tâche sélectionnée"""
+        tache_selectionnee = self.vue_taches.selection()
+        if tache_selectionnee is None :
+            messagebox.showwarning("Aucune séléction", "Choisissez une tâche à modifier")
+            return
+        if tache_selectionnee < 0 :
+            messagebox.showwarning("Tâche en cours d'enregistrement", "Patientez un instant avant de modifier cette tâche")
+            return
+        self.fenetre_modification(self.vue_taches.tache(tache_selectionnee))
+
+
+    def fenetre_modification(self, tache) :
+        """Todolist, Tache -> None
+        Affiche la fenêtre de modification d'une tâche, pré-remplie avec la tâche donnée"""
+        fenetre_modif = tk.Toplevel(self.fenetre_principale)
+        fenetre_modif.title("Modifier une tâche")
+
+        # Les champs sont pré-remplis avec la tâche telle qu'elle est affichée
+        ttk.Label(fenetre_modif, text = "Nom de la tâche").grid(row = 0, column = 0, padx = 5, pady = 5)
+        modif_nom_entree = ttk.Entry(fenetre_modif)
+        modif_nom_entree.insert(0, tache.nom)
+        modif_nom_entree.grid(row = 0, column = 1, padx = 5, pady = 5)
+
+        ttk.Label(fenetre_modif, text = "Description de la tâche").grid(row = 1, column = 0, padx = 5, pady = 5)
+        modif_description_entree = ttk.Entry(fenetre_modif)
+        modif_description_entree.insert(0, tache.description)
+        modif_description_entree.grid(row = 1, column = 1, padx = 5, pady = 5)
+
+        ttk.Label(fenetre_modif, text = "Date limite (JJ-MM-AAAA)").grid(row = 2, column = 0, padx = 5, pady = 5)
+        modif_echeance_entree = ttk.Entry(fenetre_modif)
+        modif_echeance_entree.insert(0, tache.echeance_saisie)
+        modif_echeance_entree.grid(row = 2, column = 1, padx = 5, pady = 5)
+
+        ttk.Label(fenetre_modif, text = "Priorité").grid(row = 3, column = 0, padx = 5, pady = 5)
+        modif_prio = tk.StringVar(value = tache.priorite)
+        ttk.Combobox(fenetre_modif, textvariable = modif_prio, values = PRIORITES).grid(row = 3, column = 1, padx = 5, pady = 5)
+
+        def enregistrer_modif() :
+            """Todolist -> None
+            Enregistre les modifications de la tâche"""
+            echeance = modif_echeance_entree.get()
+            priorite = modif_prio.get()
+            if not self.date_valide(echeance) :
+                return
+            if priorite not in PRIORITES :
+                messagebox.showwarning("Priorité invalide", "Choisissez une priorité dans la liste")
+                return
+            self.enregistrer_modification(tache.tache_id, modif_nom_entree.get(), modif_description_entree.get(), echeance, priorite,
+                                          ancienne = tache)
+            fenetre_modif.destroy()
+
+        bouton_enregistrement = ttk.Button(fenetre_modif, text = "Enregistrer la tâche", command = enregistrer_modif)
+        bouton_enregistrement.grid(row = 4, column = 1, padx = 5, pady = 5)
+
+        bouton_annuler = ttk.Button(fenetre_modif, text = "Annuler", command = fenetre_modif.destroy)
+        bouton_annuler.grid(row = 4, column = 0, padx = 5, pady = 5)
+
+
+    @mesures.mesurer
+    def enregistrer_modification(self, tache_id, nom_tache, description, echeance, priorite, ancienne = None) :
+        """Todolist, int, str, str, str, str, Tache -> None
+        Enregistre la modification d'une tâche affichée (échéance au format JJ-MM-AAAA)
+        Une seule requête UPDATE est envoyée : la tâche n'est pas relue, seule sa ligne est
+        redessinée et seule son échéance est replanifiée. "ancienne" est la tâche avant modification,
+        à donner si elle n'est pas affichée (occurrence qui vient d'être enregistrée)"""
+        if ancienne is None :
+            ancienne = self.vue_taches.tache(tache_id)
+        tache = ancienne.remplacer(nom = nom_tache, description = description, echeance = date_vers_iso(echeance), priorite = priorite)
+        # Comme pour une tâche complétée, la fenêtre est mise à jour sans attendre la base de donnée
+        self.cache_taches.remplacer(tache)
+        self.modifier_recherche(tache_id, tache)
+        self.vue_taches.modifier(tache)
+        # L'avancement ne dépend pas des champs modifiés : il n'est pas redemandé
+        self.actualiser_vue(progression = False)
+        if not tache.est_completee :
+            self.planificateur.replanifier(tache)
+            # Le nombre de tâches en retard vient du planificateur : le tableau est redessiné sans requête
+            self.afficher_tableau()
+
+        def enregistree(resultat) :
+            """None -> None
+            Met à jour le tableau de bord si la tâche a changé de priorité"""
+            if tache.rang_priorite != ancienne.rang_priorite :
+                self.actualiser_tableau()
+
+        def refusee(erreur) :
+            """Exception -> None
+            Rétablit la tâche telle qu'elle était avant"""
+            self.cache_taches.remplacer(ancienne)
+            self.modifier_recherche(tache_id, ancienne)
+            self.vue_taches.modifier(ancienne)
+            self.actualiser_vue(progression = False)
+            if not ancienne.est_completee :
+                self.planificateur.replanifier(ancienne)
+                self.afficher_tableau()
+            self.afficher_erreur(erreur)
+
+        self.executer(maj_tache, tache_id, nom_tache, description, echeance, priorite, succes = enregistree, echec = refusee)
+
+
+    @mesures.mesurer
+    def description_tache(self) :
+        """Todolist -> None
+        Voir la description d'une tâche"""
+        tache_selectionnee = self.vue_taches.selection()
+        if tache_selectionnee is None :
+            messagebox.showwarning("Aucune séléction", "Choisissez une tâche pour voir sa déscription")
+            return
+        description = self.vue_taches.tache(tache_selectionnee).description
+
+        fenetre_description = tk.Toplevel(self.principale)
+        fenetre_description.geometry("300x250")
+        fenetre_description.title("Description de la tâche")
+
+        description_texte = ttk.Label(fenetre_description, text = description, wraplength = 250)
+        description_texte.grid(row = 0, column = 0,padx = 10, pady = 20)
+
+        def retour() :
+            """Todolist -> None
+            Ferme la fenêtre de description"""
+            fenetre_description.destroy()
+
+        bouton_retour = ttk.Button(fenetre_description, text = "Retour", command = retour)
+        bouton_retour.grid(row = 2, column = 0, padx = 5, pady = 5)
+
+
+    @mesures.mesurer
+    def marquer_completee(self) :
+        """Todolist -> None
+        Marque une tâche comme complétée dans la base de donnée"""
+        tache_selectionnee = self.vue_taches.selection()
+        if tache_selectionnee is None :
+            messagebox.showwarning("Aucune séléction", "Choisissez une tâche à marquer comme complétée")
+            return
+        if tache_selectionnee < 0 :
+            messagebox.showwarning("Tâche en cours d'enregistrement", "Patientez un instant avant de modifier cette tâche")
+            return
+        ancienne = self.vue_taches.tache(tache_selectionnee)
+        # La fenêtre est mise à jour sans attendre la base de donnée, et remise en état si l'écriture échoue
+        tache = ancienne.remplacer(est_completee = 1)
+        self.planificateur.annuler(tache.tache_id)
+        # La tâche complétée change de place dans l'ordre de tri, la vue la déplace sans tout redessiner
+        self.cache_taches.remplacer(tache)
+        self.modifier_recherche(tache.tache_id, tache)
+        self.vue_taches.modifier(tache)
+        self.actualiser_vue()
+
+        def refusee(erreur) :
+            """Exception -> None
+            Rétablit la tâche telle qu'elle était avant"""
+            self.cache_taches.remplacer(ancienne)
+            self.modifier_recherche(ancienne.tache_id, ancienne)
+            self.vue_taches.modifier(ancienne)
+            self.planificateur.ajouter_tache(ancienne)
+            self.actualiser_vue()
+            self.afficher_erreur(erreur)
+
+        self.executer(marquer_tache_complete, tache.tache_id, succes = lambda resultat : self.actualiser_tableau(), echec = refusee)
+
+
+    @mesures.mesurer
+    def supprimer_tache(self) :
+        """Todolist -> None
+        Supprime une tâche de la base de donnée"""
+        tache_selectionnee = self.vue_taches.selection()
+        if tache_selectionnee is None :
+            messagebox.showwarning("Aucune séléction", "Choisissez une tâche à supprimer")
+            return
+        if tache_selectionnee < 0 :
+            messagebox.showwarning("Tâche en cours d'enregistrement", "Patientez un instant avant de supprimer cette tâche")
+            return
+        ancienne = self.vue_taches.tache(tache_selectionnee)
+        recherche = self.resultats_recherche
+        self.planificateur.annuler(tache_selectionnee)
+        self.cache_taches.supprimer(tache_selectionnee)
+        self.modifier_recherche(tache_selectionnee, None)
+        self.vue_taches.retirer([tache_selectionnee])
+        self.actualiser_vue()
+
+        def supprimees(ids_taches) :
+            """list -> None
+            Retire aussi les sous-tâches supprimées avec la tâche, à toutes les profondeurs"""
+            for tache_id in ids_taches :
+                self.planificateur.annuler(tache_id)
+                self.modifier_recherche(tache_id, None)
+            self.vue_taches.retirer(ids_taches)
+            self.actualiser_vue()
+            self.actualiser_tableau()
+
+        def refusee(erreur) :
+            """Exception -> None
+            Réaffiche la tâche qui n'a pas pu être supprimée"""
+            self.cache_taches.ajouter(ancienne)
+            if recherche is not None and self.resultats_recherche is not None :
+                self.resultats_recherche = recherche
+            if not ancienne.est_completee :
+                self.planificateur.ajouter_tache(ancienne)
+            # Une sous-tâche est réaffichée en relisant les enfants de sa tâche parente
+            if ancienne.parent_id in self.vue_taches.enfants :
+                self.charger_enfants(ancienne.parent_id)
+            self.actualiser_vue()
+            self.afficher_erreur(erreur)
+
+        self.executer(supprimer_tache, tache_selectionnee, succes = supprimees, echec = refusee)
+
+
+    @mesures.mesurer
+    def deconnecter(self) :
+        """Todolist -> None
+        Déconnecte l'utilisateur et affiche la fenêtre de connexion"""
+        # Les opérations gardées en attente par une durabilité groupée sont enregistrées tout de suite
+        self.executer(base.vider_ecritures)
+        self.fenetre_principale.pack_forget()
+        self.fenetre_connexion.pack()
+        self.utilisateur_actuel = None
+        self.cache_taches.vider()
+        self.planificateur.vider()
+
+
+def lancer() :
+    """None -> None
+    Ouvre la fenêtre de l'application et démarre le planificateur"""
+    principale = ttk.Window(themename = "darkly")
+
+    # Démarrer le planificateur de tâches dans un thread séparé
+    planificateur = Planificateur()
+    planificateur_thread = threading.Thread(target = planificateur.run, daemon = True)
+    planificateur_thread.start()
+
+    # Démarrer le travailleur qui exécute les requêtes SQL en dehors de la boucle Tk
+    travailleur = TravailleurBase().demarrer()
+
+    # Sauvegardes automatiques, dans le dossier donné par la variable d'environnement MYTASKMATE_SAUVEGARDES
+    # (elles copient la base depuis leur propre thread, la fenêtre n'attend jamais la fin d'une copie)
+    sauvegardes = None
+    if os.environ.get("MYTASKMATE_SAUVEGARDES") :
+        sauvegardes = SauvegardesPlanifiees(os.environ["MYTASKMATE_SAUVEGARDES"]).demarrer()
+
+    todolist = Todolist(principale, planificateur, travailleur)
+
+    principale.mainloop()
+    # Le travailleur termine les requêtes reçues et enregistre les opérations en attente avant de s'arrêter
+    travailleur.arreter()
+    if sauvegardes is not None :
+        sauvegardes.arreter()
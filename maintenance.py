@@ -0,0 +1,21 @@
+import argparse
+import os
+from noyau import base, activer_vacuum_incremental
+
+# Maintenance de la base de donnée, faite seulement à la demande de l'utilisateur
+# Une base créée avant l'auto_vacuum INCREMENTAL ne rend pas au disque la place libérée par l'archivage :
+# elle doit être reconstruite une fois. La reconstruction (VACUUM) réécrit tout le fichier et bloque
+# toutes les écritures jusqu'à la fin, elle n'est donc jamais lancée par l'application elle-même
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Reconstruit la base de donnée pour qu'elle rende au disque la place libérée "
+                                                      "(à lancer quand l'application est fermée)")
+    analyseur.parse_args()
+
+    taille_avant = os.path.getsize(base.chemin) if os.path.exists(base.chemin) else 0
+    if activer_vacuum_incremental() :
+        base.fermer()
+        print(f"{base.chemin} reconstruite : {taille_avant / 1e6:.1f} Mo -> {os.path.getsize(base.chemin) / 1e6:.1f} Mo")
+    else :
+        print(f"{base.chemin} rend déjà au disque la place libérée : rien à faire")
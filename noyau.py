@@ -0,0 +1,1598 @@
+import sqlite3
+from datetime import datetime, date, timedelta
+import calendar
+import threading
+import bisect
+import heapq
+import queue
+import os
+import itertools
+import operator
+import re
+import json
+import time
+import atexit
+from concurrent.futures import Future
+from instrumentation import mesures, CurseurMesure
+
+# Cœur de MyTaskMate : base de donnée, gestion des tâches et planificateur
+# Ce module n'utilise pas tkinter et n'ouvre pas la base de donnée à l'import : il peut servir
+# aux scripts (import, export, tests) sans interface graphique
+
+# Gestion des dates d'échéance
+# Les dates sont saisies au format JJ-MM-AAAA mais stockées au format ISO (AAAA-MM-JJ) :
+# ce format se trie comme du texte, ce qui permet les comparaisons et les index en SQL
+FORMAT_SAISIE = "%d-%m-%Y"
+FORMAT_ISO = "%Y-%m-%d"
+
+# Valeurs acceptées par la contrainte CHECK de la colonne priorite
+PRIORITES = ("Faible", "Moyenne", "Haute")
+# Rang de chaque priorité pour le tri (0 = la plus urgente), identique à la colonne rang_priorite
+RANGS_PRIORITE = {"Haute" : 0, "Moyenne" : 1, "Faible" : 2}
+PRIORITES_PAR_RANG = ("Haute", "Moyenne", "Faible")
+# Valeurs acceptées par la contrainte CHECK de la colonne frequence des tâches répétées
+FREQUENCES = ("quotidienne", "hebdomadaire", "mensuelle")
+
+
+def date_vers_iso(date) :
+    """str -> str
+    Convertit une date saisie (JJ-MM-AAAA ou déjà AAAA-MM-JJ) au format ISO
+    Lève une ValueError si la date n'est pas valide"""
+    for format_date in (FORMAT_SAISIE, FORMAT_ISO) :
+        try :
+            return datetime.strptime(date, format_date).strftime(FORMAT_ISO)
+        except ValueError :
+            pass
+    raise ValueError(f"Date invalide : {date}")
+
+
+def date_depuis_iso(date) :
+    """str -> str
+    Convertit une date stockée au format ISO vers le format d'affichage JJ-MM-AAAA"""
+    try :
+        return datetime.strptime(date, FORMAT_ISO).strftime(FORMAT_SAISIE)
+    except ValueError :
+        # Une date qui n'a pas pu être migrée est affichée telle quelle
+        return date
+
+
+# Tâches lues dans la base de donnée
+class Tache :
+    """Une tâche (ou une occurrence de tâche répétée), avec ses colonnes en attributs nommés
+    Les attributs sont déclarés dans __slots__ : l'objet n'a pas de dictionnaire et prend moins de mémoire
+    que le tuple des mêmes colonnes. La priorité est convertie en rang (0 = la plus urgente) ; l'échéance
+    est gardée au format ISO (echeance_iso), qui suffit aux tris, et n'est convertie en date qu'au premier
+    usage de tache.echeance, puis gardée (une date illisible restée dans la base reste en texte).
+    Pour le code qui utilise encore les tuples de sqlite3, une tâche se lit aussi par position (tache[4] est
+    l'échéance au format ISO, tache[:5] un tuple) et se compare à un tuple"""
+    __slots__ = ("tache_id", "utilisateur_id", "nom", "description", "echeance_iso", "_echeance", "est_completee",
+                 "rang_priorite", "parent_id")
+    # Une tâche est modifiable et égale au tuple de ses colonnes : elle ne peut pas servir de clé
+    # de dictionnaire ni d'élément d'ensemble (utiliser tache.tache_id)
+    __hash__ = None
+
+    def __init__(self, tache_id, utilisateur_id, nom, description, echeance, est_completee, priorite, parent_id = None) :
+        self.tache_id = tache_id
+        self.utilisateur_id = utilisateur_id
+        self.nom = nom
+        self.description = description
+        if isinstance(echeance, date) :
+            self.echeance_iso = echeance.isoformat()
+            self._echeance = echeance
+        else :
+            self.echeance_iso = echeance
+            self._echeance = None
+        self.est_completee = est_completee
+        self.rang_priorite = RANGS_PRIORITE[priorite]
+        self.parent_id = parent_id
+
+
+    @staticmethod
+    def depuis_ligne(curseur, ligne) :
+        """sqlite3.Cursor, tuple -> Tache
+        Fabrique de lignes (row_factory) de sqlite3 pour les requêtes qui lisent COLONNES_TACHES"""
+        return Tache(*ligne)
+
+
+    @staticmethod
+    def convertir(tache) :
+        """Tache ou tuple -> Tache
+        Renvoie la tâche telle quelle, ou la construit à partir d'un tuple de ses colonnes"""
+        return tache if isinstance(tache, Tache) else Tache(*tache)
+
+
+    @property
+    def priorite(self) :
+        """Tache -> str
+        Nom de la priorité ("Faible", "Moyenne" ou "Haute")"""
+        return PRIORITES_PAR_RANG[self.rang_priorite]
+
+
+    @property
+    def echeance(self) :
+        """Tache -> date
+        Échéance en date, convertie au premier appel (ou en texte si elle est illisible)"""
+        if self._echeance is None :
+            try :
+                self._echeance = date.fromisoformat(self.echeance_iso)
+            except (TypeError, ValueError) :
+                return self.echeance_iso
+        return self._echeance
+
+
+    @property
+    def echeance_saisie(self) :
+        """Tache -> str
+        Échéance au format JJ-MM-AAAA, pour l'affichage et l'export"""
+        echeance = self.echeance
+        return echeance.strftime(FORMAT_SAISIE) if isinstance(echeance, date) else echeance
+
+
+    def remplacer(self, **champs) :
+        """Tache, ... -> Tache
+        Renvoie une copie de la tâche avec les champs donnés modifiés (mêmes noms que les arguments du constructeur)"""
+        valeurs = {"tache_id" : self.tache_id, "utilisateur_id" : self.utilisateur_id, "nom" : self.nom, "description" : self.description,
+                   "echeance" : self._echeance or self.echeance_iso, "est_completee" : self.est_completee, "priorite" : self.priorite,
+                   "parent_id" : self.parent_id}
+        valeurs.update(champs)
+        return Tache(**valeurs)
+
+
+    def en_tuple(self) :
+        """Tache -> tuple
+        Renvoie les colonnes de la tâche dans l'ordre de COLONNES_TACHES"""
+        return (self.tache_id, self.utilisateur_id, self.nom, self.description, self.echeance_iso, self.est_completee,
+                self.priorite, self.parent_id)
+
+
+    def __getitem__(self, position) :
+        if isinstance(position, slice) :
+            return self.en_tuple()[position]
+        return LECTEURS_TACHE[position](self)
+
+
+    def __len__(self) :
+        return len(LECTEURS_TACHE)
+
+
+    def __iter__(self) :
+        return iter(self.en_tuple())
+
+
+    def __eq__(self, autre) :
+        if isinstance(autre, (Tache, tuple)) :
+            return self.en_tuple() == tuple(autre)
+        return NotImplemented
+
+
+    def __repr__(self) :
+        return f"Tache{self.en_tuple()!r}"
+
+
+# Lecture par position d'une tâche, dans l'ordre de COLONNES_TACHES
+LECTEURS_TACHE = tuple(operator.attrgetter(nom) for nom in ("tache_id", "utilisateur_id", "nom", "description", "echeance_iso",
+                                                            "est_completee", "priorite", "parent_id"))
+
+
+# Migrations du schéma
+# Le numéro de version du schéma est conservé dans "PRAGMA user_version" :
+# chaque migration n'est appliquée qu'une seule fois, dans sa propre transaction
+def _migration_dates_iso(connexion) :
+    """sqlite3.Connection -> None
+    Réécrit les échéances JJ-MM-AAAA au format ISO et crée les index sur les tâches"""
+    lignes = connexion.execute("SELECT tache_id, echeance FROM taches WHERE echeance NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'").fetchall()
+    conversions = []
+    for tache_id, echeance in lignes :
+        try :
+            conversions.append((date_vers_iso(echeance), tache_id))
+        except ValueError :
+            # Les dates illisibles sont laissées telles quelles plutôt que perdues
+            pass
+    connexion.executemany("UPDATE taches SET echeance = ? WHERE tache_id = ?", conversions)
+    # Index principal : les tâches d'un utilisateur, triées par état puis par échéance
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_taches_utilisateur ON taches (utilisateur_id, est_completee, echeance)")
+    # Index partiel : uniquement les tâches en cours, pour les requêtes "en retard" ou "à venir"
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_taches_ouvertes ON taches (utilisateur_id, echeance) WHERE est_completee = 0")
+
+
+def _migration_recherche(connexion) :
+    """sqlite3.Connection -> None
+    Crée l'index de recherche plein texte sur le nom et la description des tâches"""
+    # Table FTS5 "à contenu externe" : le texte n'est pas copié, seul l'index de recherche est stocké.
+    # remove_diacritics permet de trouver "tâche" en tapant "tache"
+    connexion.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS taches_fts USING fts5(
+        tache, description,
+        content = 'taches', content_rowid = 'tache_id',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """)
+    # Indexe les tâches déjà présentes
+    connexion.execute("INSERT INTO taches_fts (taches_fts) VALUES ('rebuild')")
+    # Les déclencheurs (triggers) gardent l'index à jour à chaque modification de la table taches
+    connexion.execute("""
+    CREATE TRIGGER IF NOT EXISTS taches_fts_ajout AFTER INSERT ON taches BEGIN
+        INSERT INTO taches_fts (rowid, tache, description) VALUES (new.tache_id, new.tache, new.description);
+    END
+    """)
+    connexion.execute("""
+    CREATE TRIGGER IF NOT EXISTS taches_fts_suppression AFTER DELETE ON taches BEGIN
+        INSERT INTO taches_fts (taches_fts, rowid, tache, description) VALUES ('delete', old.tache_id, old.tache, old.description);
+    END
+    """)
+    connexion.execute("""
+    CREATE TRIGGER IF NOT EXISTS taches_fts_modification AFTER UPDATE OF tache, description ON taches BEGIN
+        INSERT INTO taches_fts (taches_fts, rowid, tache, description) VALUES ('delete', old.tache_id, old.tache, old.description);
+        INSERT INTO taches_fts (rowid, tache, description) VALUES (new.tache_id, new.tache, new.description);
+    END
+    """)
+
+
+def _migration_tris(connexion) :
+    """sqlite3.Connection -> None
+    Ajoute le rang de priorité et les index utilisés par les différents tris de obtenir_page_taches"""
+    # Une colonne générée (GENERATED ALWAYS) est calculée par SQLite, elle ne peut pas être modifiée
+    # VIRTUAL : elle n'occupe pas de place dans la table, seulement dans l'index qui l'utilise
+    connexion.execute("""
+    ALTER TABLE taches ADD COLUMN rang_priorite INTEGER
+    GENERATED ALWAYS AS (CASE priorite WHEN 'Haute' THEN 0 WHEN 'Moyenne' THEN 1 ELSE 2 END) VIRTUAL
+    """)
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_taches_priorite ON taches (utilisateur_id, rang_priorite, echeance)")
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_taches_echeance ON taches (utilisateur_id, echeance)")
+    # Chaque index contient aussi le tache_id : cet index donne les tâches dans l'ordre de création
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_taches_creation ON taches (utilisateur_id)")
+
+
+def _migration_compteurs(connexion) :
+    """sqlite3.Connection -> None
+    Crée la table des compteurs de tâches de chaque utilisateur, tenue à jour par des déclencheurs"""
+    # Les tâches en cours sont comptées par priorité : leur somme donne le nombre de tâches en cours
+    connexion.execute("""
+    CREATE TABLE IF NOT EXISTS compteurs_taches (
+        utilisateur_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        completees INTEGER NOT NULL DEFAULT 0,
+        ouvertes_faible INTEGER NOT NULL DEFAULT 0,
+        ouvertes_moyenne INTEGER NOT NULL DEFAULT 0,
+        ouvertes_haute INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    # Compte les tâches déjà présentes
+    connexion.execute("""
+    INSERT INTO compteurs_taches (utilisateur_id, total, completees, ouvertes_faible, ouvertes_moyenne, ouvertes_haute)
+    SELECT utilisateur_id, COUNT(*), SUM(est_completee != 0), SUM(est_completee = 0 AND priorite = 'Faible'),
+           SUM(est_completee = 0 AND priorite = 'Moyenne'), SUM(est_completee = 0 AND priorite = 'Haute')
+    FROM taches GROUP BY utilisateur_id
+    """)
+    # Chaque déclencheur ajoute (+1) ou retire (-1) la tâche des compteurs de son utilisateur.
+    # "ON CONFLICT DO UPDATE" crée la ligne de l'utilisateur à sa première tâche
+    for nom, evenement, lignes in (("compteurs_ajout", "INSERT", (("new", 1),)),
+                                   ("compteurs_suppression", "DELETE", (("old", -1),)),
+                                   ("compteurs_modification", "UPDATE OF utilisateur_id, est_completee, priorite", (("old", -1), ("new", 1)))) :
+        instructions = "".join(f"""
+        INSERT INTO compteurs_taches (utilisateur_id, total, completees, ouvertes_faible, ouvertes_moyenne, ouvertes_haute)
+        VALUES ({ligne}.utilisateur_id, {signe}, {signe} * ({ligne}.est_completee != 0),
+                {signe} * ({ligne}.est_completee = 0 AND {ligne}.priorite = 'Faible'),
+                {signe} * ({ligne}.est_completee = 0 AND {ligne}.priorite = 'Moyenne'),
+                {signe} * ({ligne}.est_completee = 0 AND {ligne}.priorite = 'Haute'))
+        ON CONFLICT (utilisateur_id) DO UPDATE SET
+            total = total + excluded.total, completees = completees + excluded.completees,
+            ouvertes_faible = ouvertes_faible + excluded.ouvertes_faible,
+            ouvertes_moyenne = ouvertes_moyenne + excluded.ouvertes_moyenne,
+            ouvertes_haute = ouvertes_haute + excluded.ouvertes_haute;""" for ligne, signe in lignes)
+        connexion.execute(f"CREATE TRIGGER IF NOT EXISTS {nom} AFTER {evenement} ON taches BEGIN {instructions}\n    END")
+
+
+def _migration_sous_taches(connexion) :
+    """sqlite3.Connection -> None
+    Ajoute la tâche parente de chaque tâche (NULL pour une tâche principale)"""
+    connexion.execute("ALTER TABLE taches ADD COLUMN parent_id INTEGER REFERENCES taches (tache_id)")
+    # Index partiel : seules les sous-tâches y figurent, les requêtes récursives y trouvent les enfants d'une tâche
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_taches_parent ON taches (parent_id) WHERE parent_id IS NOT NULL")
+
+
+def _migration_synchronisation(connexion) :
+    """sqlite3.Connection -> None
+    Ajoute l'identifiant global et la version de chaque tâche, et le journal des modifications à synchroniser"""
+    # uid : identifiant de la tâche commun à tous les appareils (tache_id ne l'est pas)
+    # version, modifie_le, appareil : tampon de la dernière modification, comparé en cas de conflit
+    for colonne in ("uid TEXT", "version INTEGER NOT NULL DEFAULT 0", "modifie_le TEXT", "appareil TEXT") :
+        connexion.execute(f"ALTER TABLE taches ADD COLUMN {colonne}")
+    connexion.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_taches_uid ON taches (uid)")
+    # Identifiant de cet appareil, et indicateur levé pendant l'application des modifications reçues
+    # (elles ne doivent pas être journalisées comme des modifications locales)
+    connexion.execute("CREATE TABLE IF NOT EXISTS synchronisation (appareil TEXT NOT NULL, application INTEGER NOT NULL DEFAULT 0)")
+    connexion.execute("INSERT INTO synchronisation (appareil) VALUES (lower(hex(randomblob(8))))")
+    # Dernière modification du serveur déjà reçue, pour chaque utilisateur
+    connexion.execute("CREATE TABLE IF NOT EXISTS curseurs_synchronisation (utilisateur_id INTEGER PRIMARY KEY, curseur INTEGER NOT NULL)")
+    # Journal des modifications locales pas encore envoyées : une ligne par modification, vidée après l'envoi.
+    # Une suppression garde la version et le tampon de la tâche, qui n'existe plus
+    connexion.execute("""
+    CREATE TABLE IF NOT EXISTS journal_modifications (
+        numero INTEGER PRIMARY KEY AUTOINCREMENT,
+        uid TEXT NOT NULL,
+        utilisateur_id INTEGER NOT NULL,
+        supprimee INTEGER NOT NULL DEFAULT 0,
+        version INTEGER,
+        modifie_le TEXT,
+        appareil TEXT
+    )
+    """)
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_journal_utilisateur ON journal_modifications (utilisateur_id, numero)")
+    # Les tâches déjà présentes reçoivent leur tampon et seront envoyées à la première synchronisation
+    connexion.execute("""
+    UPDATE taches SET uid = lower(hex(randomblob(16))), version = 1, modifie_le = strftime('%Y-%m-%dT%H:%M:%fZ', 'now'),
+                      appareil = (SELECT appareil FROM synchronisation)
+    """)
+    connexion.execute("INSERT INTO journal_modifications (uid, utilisateur_id) SELECT uid, utilisateur_id FROM taches ORDER BY tache_id")
+    # Chaque modification locale augmente la version de la tâche, la date et l'appareil, et s'inscrit au journal
+    tampon = """version = {ancienne}.version + 1, modifie_le = strftime('%Y-%m-%dT%H:%M:%fZ', 'now'),
+                appareil = (SELECT appareil FROM synchronisation)"""
+    locale = "WHEN (SELECT application FROM synchronisation) = 0"
+    connexion.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS journal_ajout AFTER INSERT ON taches {locale} BEGIN
+        UPDATE taches SET uid = coalesce(new.uid, lower(hex(randomblob(16)))), {tampon.format(ancienne = "new")}
+        WHERE tache_id = new.tache_id;
+        INSERT INTO journal_modifications (uid, utilisateur_id) SELECT uid, utilisateur_id FROM taches WHERE tache_id = new.tache_id;
+    END
+    """)
+    connexion.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS journal_modification AFTER UPDATE OF tache, description, echeance, est_completee, priorite, parent_id
+    ON taches {locale} BEGIN
+        UPDATE taches SET {tampon.format(ancienne = "old")} WHERE tache_id = new.tache_id;
+        INSERT INTO journal_modifications (uid, utilisateur_id) VALUES (new.uid, new.utilisateur_id);
+    END
+    """)
+    connexion.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS journal_suppression AFTER DELETE ON taches {locale} BEGIN
+        INSERT INTO journal_modifications (uid, utilisateur_id, supprimee, version, modifie_le, appareil)
+        VALUES (old.uid, old.utilisateur_id, 1, old.version + 1, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'), (SELECT appareil FROM synchronisation));
+    END
+    """)
+
+
+def _migration_recurrences(connexion) :
+    """sqlite3.Connection -> None
+    Ajoute les tâches répétées : une règle par tâche, et le lien entre une tâche et l'occurrence qu'elle matérialise"""
+    # Une règle décrit toutes ses occurrences (à partir de "debut", tous les "intervalle" jours, semaines ou mois,
+    # jusqu'à "fin" ou pendant "nombre" occurrences) : aucune ligne de taches n'est créée à l'avance
+    connexion.execute("""
+    CREATE TABLE IF NOT EXISTS recurrences (
+        recurrence_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        utilisateur_id INTEGER NOT NULL,
+        tache TEXT NOT NULL,
+        description TEXT NOT NULL,
+        debut TEXT NOT NULL,
+        priorite TEXT CHECK( priorite IN ('Faible', 'Moyenne', 'Haute') ) NOT NULL,
+        frequence TEXT CHECK( frequence IN ('quotidienne', 'hebdomadaire', 'mensuelle') ) NOT NULL,
+        intervalle INTEGER NOT NULL DEFAULT 1 CHECK( intervalle >= 1 ),
+        fin TEXT,
+        nombre INTEGER CHECK( nombre IS NULL OR nombre >= 1 ),
+        FOREIGN KEY (utilisateur_id) REFERENCES utilisateur (utilisateur_id)
+    )
+    """)
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_recurrences_utilisateur ON recurrences (utilisateur_id)")
+    # Une occurrence complétée devient une vraie tâche, qui garde sa règle et la date de l'occurrence
+    connexion.execute("ALTER TABLE taches ADD COLUMN recurrence_id INTEGER REFERENCES recurrences (recurrence_id)")
+    connexion.execute("ALTER TABLE taches ADD COLUMN occurrence TEXT")
+    # L'index unique empêche de matérialiser deux fois la même occurrence
+    connexion.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_taches_occurrence ON taches (recurrence_id, occurrence)
+                         WHERE recurrence_id IS NOT NULL""")
+
+
+def _migration_parents_attendus(connexion) :
+    """sqlite3.Connection -> None
+    Ajoute les sous-tâches reçues avant leur tâche parente, à rattacher quand la parente arrivera"""
+    # Une modification reçue ne connaît sa parente que par son uid : tant que la parente n'est pas arrivée,
+    # la sous-tâche garde parent_id à NULL et son lien attend ici
+    connexion.execute("""
+    CREATE TABLE IF NOT EXISTS parents_attendus (
+        uid TEXT PRIMARY KEY,
+        parent_uid TEXT NOT NULL
+    )
+    """)
+    connexion.execute("CREATE INDEX IF NOT EXISTS idx_parents_attendus_parent ON parents_attendus (parent_uid)")
+
+
+MIGRATIONS = [
+    _migration_dates_iso,
+    _migration_recherche,
+    _migration_tris,
+    _migration_compteurs,
+    _migration_sous_taches,
+    _migration_synchronisation,
+    _migration_recurrences,
+    _migration_parents_attendus,
+]
+
+
+def migrer_base(connexion) :
+    """sqlite3.Connection -> None
+    Applique les migrations du schéma qui n'ont pas encore été appliquées"""
+    version = connexion.execute("PRAGMA user_version").fetchone()[0]
+    for numero in range(version, len(MIGRATIONS)) :
+        # "with connexion" valide la transaction à la fin du bloc, ou l'annule en cas d'erreur
+        with connexion :
+            connexion.execute("BEGIN")
+            MIGRATIONS[numero](connexion)
+            connexion.execute(f"PRAGMA user_version = {numero + 1}")
+
+
+# Création des tables
+def creer_tables(connexion) :
+    """sqlite3.Connection -> None
+    Crée les tables de la base de donnée si elles n'existent pas encore"""
+    connexion.execute("""
+    CREATE TABLE IF NOT EXISTS utilisateur (
+        utilisateur_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        identifiant TEXT UNIQUE NOT NULL,       
+        mdp TEXT NOT NULL
+    )
+    """)
+
+    # "NOT NULL" indique que la valeur ne peut pas être nulle
+    # "AUTOINCREMENT" génère automatiquement une valeur unique pour chaque enregistrement
+    connexion.execute("""
+    CREATE TABLE IF NOT EXISTS taches (
+        tache_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        utilisateur_id INTEGER NOT NULL,
+        tache TEXT NOT NULL,
+        description TEXTE NOT NULL,
+        echeance DATE NOT NULL,
+        est_completee BOOLEAN NOT NULL,
+        priorite TEXT CHECK( priorite IN ("Faible", "Moyenne", "Haute") ) NOT NULL,
+        FOREIGN KEY (utilisateur_id) REFERENCES utilisateur (utilisateur_id)
+    )
+    """)
+
+    # La fonction "commit()" permet d'enregistrer les modifications faites sur la base de donnée
+    connexion.commit()
+
+
+# Accès à la base de donnée
+class BaseDonnees :
+    """Donne à chaque thread sa propre connexion à la base de donnée
+    sqlite3 interdit de partager une connexion entre threads : l'interface, le planificateur et
+    les autres threads ont donc chacun la leur, ouverte au premier usage.
+    Le journal WAL permet de lire pendant qu'un autre thread écrit"""
+    # Profils de performance, appliqués par des PRAGMA à l'ouverture de chaque connexion
+    # synchronous : fréquence des écritures forcées sur le disque (FULL = la plus sûre)
+    # cache_size : taille du cache de pages (négatif = en Kio)
+    # mmap_size : taille du fichier lue directement en mémoire
+    # temp_store : emplacement des tables temporaires (tris, index temporaires)
+    PROFILS = {
+        "securite" : {"synchronous" : "FULL", "cache_size" : -2000, "mmap_size" : 0, "temp_store" : "DEFAULT"},
+        "equilibre" : {"synchronous" : "NORMAL", "cache_size" : -16000, "mmap_size" : 64 * 1024 * 1024, "temp_store" : "MEMORY"},
+        "performance" : {"synchronous" : "OFF", "cache_size" : -64000, "mmap_size" : 256 * 1024 * 1024, "temp_store" : "MEMORY"},
+    }
+    # Nombre de requêtes préparées gardées par connexion : une requête dont le texte est identique
+    # à une requête déjà exécutée n'est pas recompilée
+    REQUETES_EN_CACHE = 256
+    # Modes de durabilité : nombre d'opérations et délai (en s) maximum avant d'enregistrer sur le disque
+    # strict : chaque opération est enregistrée tout de suite (une écriture disque par clic)
+    # groupe : les opérations rapprochées sont enregistrées ensemble, au plus 50 ms plus tard
+    # relache : jusqu'à une seconde d'opérations peut être perdue en cas de coupure de courant
+    DURABILITES = {
+        "strict" : (1, 0),
+        "groupe" : (100, 0.05),
+        "relache" : (1000, 1.0),
+    }
+
+    def __init__(self, chemin, profil = "equilibre", durabilite = "strict") :
+        # Les attributs d'un objet threading.local() sont propres à chaque thread
+        self.local = threading.local()
+        self.verrou = threading.Lock()
+        # Numéro de configuration : une connexion ouverte avec une ancienne configuration est rouverte
+        self.generation = 0
+        self.configurer(chemin, profil, durabilite)
+
+
+    def configurer(self, chemin, profil = "equilibre", durabilite = "strict") :
+        """BaseDonnees, str, str, str -> None
+        Choisit le fichier, le profil et la durabilité de la base de donnée (rien n'est ouvert tout de suite)"""
+        if profil not in self.PROFILS :
+            raise ValueError(f"Profil inconnu : {profil}")
+        if durabilite not in self.DURABILITES :
+            raise ValueError(f"Durabilité inconnue : {durabilite}")
+        with self.verrou :
+            self.chemin = chemin
+            self.profil = profil
+            self.durabilite = durabilite
+            self.schema_pret = False
+            self.generation += 1
+
+
+    def connexion(self) :
+        """BaseDonnees -> sqlite3.Connection
+        Renvoie la connexion du thread courant, en l'ouvrant si besoin"""
+        connexion = getattr(self.local, "connexion", None)
+        if connexion is not None and self.local.generation != self.generation :
+            self.fermer()
+            connexion = None
+        if connexion is None :
+            # La fonction "connect()" permet de se connecter à la base de donnée
+            connexion = sqlite3.connect(self.chemin, timeout = 10, cached_statements = self.REQUETES_EN_CACHE)
+            # Une nouvelle base est créée en mode auto_vacuum INCREMENTAL (ce PRAGMA doit précéder le journal WAL et
+            # la première table) : les pages libérées par l'archivage peuvent ensuite être rendues au disque petit à petit
+            connexion.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            connexion.execute("PRAGMA journal_mode = WAL")
+            for pragma, valeur in self.PROFILS[self.profil].items() :
+                connexion.execute(f"PRAGMA {pragma} = {valeur}")
+            # Le schéma n'est créé et migré qu'une fois, par le premier thread qui se connecte
+            with self.verrou :
+                if not self.schema_pret :
+                    creer_tables(connexion)
+                    migrer_base(connexion)
+                    self.schema_pret = True
+            self.local.connexion = connexion
+            self.local.generation = self.generation
+            # Nombre d'opérations validées mais pas encore enregistrées, et date de la première
+            self.local.ecritures = 0
+            self.local.debut = 0
+            self.local.instrumentee = None
+        # Les fonctions de suivi de sqlite3 ne sont branchées que si les mesures sont activées
+        if self.local.instrumentee is not mesures.actif :
+            mesures.installer(connexion)
+            self.local.instrumentee = mesures.actif
+        return connexion
+
+
+    def executer(self, requete, parametres = ()) :
+        """BaseDonnees, str, tuple -> sqlite3.Cursor
+        Exécute une requête sur la connexion du thread courant"""
+        return self.curseur().execute(requete, parametres)
+
+
+    def curseur(self) :
+        """BaseDonnees -> sqlite3.Cursor
+        Renvoie un nouveau curseur sur la connexion du thread courant (qui mesure ses requêtes si les mesures sont activées)"""
+        if mesures.actif :
+            return self.connexion().cursor(CurseurMesure)
+        return self.connexion().cursor()
+
+
+    def valider(self) :
+        """BaseDonnees -> None
+        Valide l'opération faite par le thread courant
+        En mode strict, elle est enregistrée tout de suite. Sinon elle attend les opérations suivantes,
+        pour toutes les enregistrer en une seule transaction (une seule écriture sur le disque),
+        quand il y en a assez ou que le délai de la durabilité choisie est dépassé"""
+        connexion = self.connexion()
+        lot_max, delai = self.DURABILITES[self.durabilite]
+        local = self.local
+        if local.ecritures == 0 :
+            local.debut = time.monotonic()
+        local.ecritures += 1
+        if local.ecritures >= lot_max or time.monotonic() - local.debut >= delai :
+            self.vider_ecritures()
+        else :
+            # Le point de sauvegarde marque le début de l'opération suivante : si elle échoue,
+            # annuler() ne défait qu'elle, et pas les opérations déjà validées du même lot
+            if local.ecritures > 1 :
+                # Le point précédent est fusionné dans la transaction : un seul point reste ouvert
+                connexion.execute("RELEASE operation")
+            connexion.execute("SAVEPOINT operation")
+
+
+    def vider_ecritures(self) :
+        """BaseDonnees -> None
+        Enregistre sur le disque les opérations validées par le thread courant qui sont encore en attente"""
+        connexion = getattr(self.local, "connexion", None)
+        if connexion is not None :
+            connexion.commit()
+            self.local.ecritures = 0
+
+
+    def delai_restant(self) :
+        """BaseDonnees -> float
+        Renvoie le temps (en s) avant que les opérations en attente du thread courant doivent être
+        enregistrées, ou None s'il n'y en a aucune"""
+        if getattr(self.local, "connexion", None) is None or self.local.ecritures == 0 :
+            return None
+        return max(0, self.local.debut + self.DURABILITES[self.durabilite][1] - time.monotonic())
+
+
+    def annuler(self) :
+        """BaseDonnees -> None
+        Annule l'opération en cours du thread courant"""
+        connexion = self.connexion()
+        if self.local.ecritures :
+            # Les opérations déjà validées du lot sont gardées
+            connexion.execute("ROLLBACK TO operation")
+        else :
+            # Sans rollback(), la transaction resterait ouverte et bloquerait les écritures des autres threads
+            connexion.rollback()
+
+
+    def fermer(self) :
+        """BaseDonnees -> None
+        Ferme la connexion du thread courant"""
+        connexion = getattr(self.local, "connexion", None)
+        if connexion is not None :
+            # Les opérations validées mais pas encore enregistrées ne doivent pas être perdues
+            self.vider_ecritures()
+            connexion.close()
+            self.local.connexion = None
+
+
+# La base de donnée n'est ouverte qu'à la première requête, à l'emplacement choisi
+# par la variable d'environnement MYTASKMATE_DB (todolist.db dans le dossier courant par défaut)
+# Le mode de durabilité se choisit avec MYTASKMATE_DURABILITE (strict par défaut)
+base = BaseDonnees(os.environ.get("MYTASKMATE_DB", "todolist.db"), os.environ.get("MYTASKMATE_PROFIL", "equilibre"),
+                   os.environ.get("MYTASKMATE_DURABILITE", "strict"))
+# Les opérations en attente du thread principal sont enregistrées à la fin du programme
+atexit.register(base.fermer)
+
+
+def configurer_base(chemin = None, profil = None, durabilite = None) :
+    """str, str, str -> None
+    Change l'emplacement, le profil ou la durabilité de la base de donnée utilisée par les fonctions de ce module"""
+    base.configurer(chemin if chemin is not None else base.chemin, profil if profil is not None else base.profil,
+                    durabilite if durabilite is not None else base.durabilite)
+
+
+# Requêtes SQL
+# Elles sont définies une seule fois pour que chaque fonction envoie toujours exactement le même texte,
+# et profite ainsi des requêtes préparées gardées en cache par la connexion
+COLONNES_TACHES = "tache_id, utilisateur_id, tache, description, echeance, est_completee, priorite, parent_id"
+SQL_NOUVEAU_COMPTE = "INSERT INTO utilisateur (identifiant, mdp) VALUES (?, ?)"
+SQL_SE_CONNECTER = "SELECT utilisateur_id FROM utilisateur WHERE identifiant = ? AND mdp = ?"
+SQL_ID_UTILISATEUR = "SELECT utilisateur_id FROM utilisateur WHERE identifiant = ?"
+SQL_AJOUTER_TACHE = "INSERT INTO taches (utilisateur_id, tache, description, echeance, est_completee, priorite) VALUES (?, ?, ?, ?, ?, ?)"
+# Les requêtes récursives (WITH RECURSIVE) parcourent les sous-tâches à toutes les profondeurs :
+# chaque étape ajoute les enfants des tâches trouvées à l'étape précédente
+SQL_BRANCHE = """WITH RECURSIVE branche (id) AS (
+    SELECT ? UNION ALL SELECT t.tache_id FROM taches t JOIN branche b ON t.parent_id = b.id
+)"""
+# RETURNING renvoie l'identifiant de chaque tâche supprimée
+SQL_SUPPRIMER_TACHE = f"{SQL_BRANCHE} DELETE FROM taches WHERE tache_id IN (SELECT id FROM branche) RETURNING tache_id"
+SQL_MARQUER_TACHE_COMPLETE = "UPDATE taches SET est_completee = TRUE WHERE tache_id = ?"
+SQL_MODIFIER_TACHE = "UPDATE taches SET tache = ?, description = ?, echeance = ?, priorite = ? WHERE tache_id = ?"
+SQL_PROPRIETAIRE_TACHE = "SELECT utilisateur_id FROM taches WHERE tache_id = ?"
+SQL_OBTENIR_TACHES = f"SELECT {COLONNES_TACHES} FROM taches WHERE utilisateur_id = ? ORDER BY est_completee, echeance, tache_id"
+SQL_TACHES_EN_RETARD = f"SELECT {COLONNES_TACHES} FROM taches WHERE utilisateur_id = ? AND est_completee = 0 AND echeance < date('now', 'localtime') ORDER BY echeance"
+# Le nom de la tâche compte 10 fois plus que sa description dans le classement bm25()
+SQL_RECHERCHER_TACHES = f"""SELECT {", ".join("t." + colonne for colonne in COLONNES_TACHES.split(", "))}
+FROM taches_fts JOIN taches t ON t.tache_id = taches_fts.rowid
+WHERE taches_fts MATCH ? AND t.utilisateur_id = ?
+ORDER BY bm25(taches_fts, 10.0, 1.0) LIMIT ?"""
+SQL_TACHES_OUVERTES = f"SELECT {COLONNES_TACHES} FROM taches WHERE utilisateur_id = ? AND est_completee = 0"
+SQL_TACHES_A_VENIR = f"SELECT {COLONNES_TACHES} FROM taches WHERE utilisateur_id = ? AND est_completee = 0 AND echeance BETWEEN date('now', 'localtime') AND date('now', 'localtime', ?) ORDER BY echeance"
+SQL_COMPTEURS = "SELECT total, completees, ouvertes_faible, ouvertes_moyenne, ouvertes_haute FROM compteurs_taches WHERE utilisateur_id = ?"
+# La sous-tâche appartient au même utilisateur que sa tâche parente
+SQL_AJOUTER_SOUS_TACHE = """INSERT INTO taches (utilisateur_id, tache, description, echeance, est_completee, priorite, parent_id)
+SELECT utilisateur_id, ?, ?, ?, FALSE, ?, tache_id FROM taches WHERE tache_id = ?"""
+SQL_SOUS_TACHES = f"SELECT {COLONNES_TACHES} FROM taches WHERE parent_id = ? ORDER BY est_completee, echeance, tache_id"
+SQL_SOUS_ARBRE = f"""WITH RECURSIVE arbre (id, profondeur) AS (
+    SELECT ?, 0 UNION ALL SELECT t.tache_id, a.profondeur + 1 FROM taches t JOIN arbre a ON t.parent_id = a.id
+)
+SELECT {", ".join("t." + colonne for colonne in COLONNES_TACHES.split(", "))}, a.profondeur
+FROM arbre a JOIN taches t ON t.tache_id = a.id WHERE a.profondeur > 0 ORDER BY a.profondeur, t.echeance, t.tache_id"""
+# json_each() transforme la liste d'identifiants (en JSON) en table : le texte de la requête ne dépend pas
+# du nombre de tâches, elle reste dans le cache des requêtes préparées
+SQL_PROGRESSION = """WITH RECURSIVE arbre (racine, id, est_completee) AS (
+    SELECT tache_id, tache_id, est_completee FROM taches WHERE tache_id IN (SELECT value FROM json_each(?))
+    UNION ALL SELECT a.racine, t.tache_id, t.est_completee FROM taches t JOIN arbre a ON t.parent_id = a.id
+)
+SELECT racine, COUNT(*), SUM(est_completee != 0) FROM arbre WHERE id != racine GROUP BY racine"""
+COLONNES_RECURRENCES = "recurrence_id, utilisateur_id, tache, description, debut, priorite, frequence, intervalle, fin, nombre"
+SQL_AJOUTER_RECURRENCE = """INSERT INTO recurrences (utilisateur_id, tache, description, debut, priorite, frequence, intervalle, fin, nombre)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+SQL_SUPPRIMER_RECURRENCE = "DELETE FROM recurrences WHERE recurrence_id = ?"
+SQL_RECURRENCES = f"SELECT {COLONNES_RECURRENCES} FROM recurrences WHERE utilisateur_id = ? ORDER BY recurrence_id"
+SQL_OCCURRENCES_MATERIALISEES = """SELECT recurrence_id, occurrence FROM taches
+WHERE recurrence_id IN (SELECT recurrence_id FROM recurrences WHERE utilisateur_id = ?) AND occurrence BETWEEN ? AND ?"""
+SQL_MATERIALISER_OCCURRENCE = """INSERT OR IGNORE INTO taches (utilisateur_id, tache, description, echeance, est_completee, priorite, recurrence_id, occurrence)
+SELECT utilisateur_id, tache, description, ?, FALSE, priorite, recurrence_id, ? FROM recurrences WHERE recurrence_id = ?"""
+SQL_TACHE_OCCURRENCE = "SELECT tache_id FROM taches WHERE recurrence_id = ? AND occurrence = ?"
+# Colonnes recopiées dans la base d'archive (toutes les colonnes de taches, sauf rang_priorite qui est calculée)
+COLONNES_ARCHIVE = COLONNES_TACHES + ", uid, version, modifie_le, appareil, recurrence_id, occurrence"
+SQL_CREER_ARCHIVE = """CREATE TABLE IF NOT EXISTS archive.taches_archivees (
+    tache_id INTEGER PRIMARY KEY,
+    utilisateur_id INTEGER NOT NULL,
+    tache TEXT NOT NULL,
+    description TEXT NOT NULL,
+    echeance TEXT NOT NULL,
+    est_completee INTEGER NOT NULL,
+    priorite TEXT NOT NULL,
+    parent_id INTEGER,
+    uid TEXT,
+    version INTEGER,
+    modifie_le TEXT,
+    appareil TEXT,
+    recurrence_id INTEGER,
+    occurrence TEXT,
+    archivee_le TEXT NOT NULL
+)"""
+SQL_INDEX_ARCHIVE = "CREATE INDEX IF NOT EXISTS archive.idx_archive_utilisateur ON taches_archivees (utilisateur_id, tache_id)"
+SQL_INDEX_ARCHIVE_UID = "CREATE INDEX IF NOT EXISTS archive.idx_archive_uid ON taches_archivees (uid)"
+# Tâches principales complétées qui n'ont pas été modifiées depuis "jours" jours. Une occurrence de tâche répétée
+# dont la date n'est pas encore passée reste : sinon elle réapparaîtrait comme une occurrence à faire
+SQL_RACINES_A_ARCHIVER = """SELECT tache_id FROM taches
+WHERE utilisateur_id = ? AND parent_id IS NULL AND est_completee != 0 AND modifie_le < strftime('%Y-%m-%dT%H:%M:%fZ', 'now', ?)
+      AND (occurrence IS NULL OR occurrence < date('now', 'localtime')) AND tache_id > ?
+ORDER BY tache_id LIMIT ?"""
+# Une tâche est archivée avec toutes ses sous-tâches, et seulement si elles sont toutes complétées
+SQL_ARBRES_A_ARCHIVER = """WITH RECURSIVE arbre (racine, id) AS (
+    SELECT value, value FROM json_each(?)
+    UNION ALL SELECT a.racine, t.tache_id FROM taches t JOIN arbre a ON t.parent_id = a.id
+)
+SELECT id FROM arbre WHERE racine NOT IN (SELECT a.racine FROM arbre a JOIN taches t ON t.tache_id = a.id WHERE t.est_completee = 0)"""
+SQL_COPIER_ARCHIVE = f"""INSERT OR REPLACE INTO archive.taches_archivees ({COLONNES_ARCHIVE}, archivee_le)
+SELECT {COLONNES_ARCHIVE}, strftime('%Y-%m-%dT%H:%M:%fZ', 'now') FROM taches WHERE tache_id IN (SELECT value FROM json_each(?))"""
+SQL_RETIRER_ARCHIVEES = "DELETE FROM taches WHERE tache_id IN (SELECT value FROM json_each(?))"
+SQL_TACHES_ARCHIVEES = f"""SELECT {COLONNES_TACHES} FROM archive.taches_archivees
+WHERE utilisateur_id = ? AND tache_id < ? ORDER BY tache_id DESC LIMIT ?"""
+
+
+# Fonctions pour la gestion des utilisateurs
+def nouveau_compte(nom_identifiant, mot_de_passe) :
+    """str, str -> bool
+    Crée un compte utilisateur dans la base de donnée"""
+    try:
+        base.executer(SQL_NOUVEAU_COMPTE, (nom_identifiant, mot_de_passe))
+        base.valider()
+        return True
+    # Permet de vérifier que les veleur de nom_identifiant et mot_de_passe ne sont pas vides
+    except sqlite3.IntegrityError :
+        base.annuler()
+        return False
+
+
+# La fonction "fetchone()" prend le 1er enregistrement, ici elle vérifie si il y a bien un enregistrement
+def se_connecter(nom_identifiant, mot_de_passe) :
+    """str, str -> bool
+    Vérifie si l'utilisateur est enregistré dans la base de donnée"""
+    return base.executer(SQL_SE_CONNECTER, (nom_identifiant, mot_de_passe)).fetchone() is not None
+
+
+def obtenir_id_utilisateur(nom_identifiant) :
+    """str -> int
+    Renvoie l'identifiant numérique d'un utilisateur, ou None s'il n'existe pas"""
+    ligne = base.executer(SQL_ID_UTILISATEUR, (nom_identifiant,)).fetchone()
+    return ligne[0] if ligne is not None else None
+
+
+# Fonctions pour la gestion des tâches
+def ajouter_tache(id_utilisateur, nom_tache,description_tache, date_echeance, prio) :
+    """int, str, str, str -> int
+    Ajoute une tâche à la base de donnée (échéance au format JJ-MM-AAAA) et renvoie son identifiant"""
+    curseur = base.executer(SQL_AJOUTER_TACHE, (id_utilisateur, nom_tache, description_tache, date_vers_iso(date_echeance), False, prio))
+    base.valider()
+    # L'attribut lastrowid contient l'identifiant généré par AUTOINCREMENT
+    return curseur.lastrowid
+
+
+def ajouter_taches(id_utilisateur, taches, taille_lot = 1000) :
+    """int, iterable, int -> int
+    Ajoute un grand nombre de tâches (nom, description, échéance, priorité et, si elle est donnée,
+    l'indication qu'elle est complétée) et renvoie le nombre ajouté
+    Les tâches sont insérées par lots, chaque lot dans une seule transaction : un seul
+    enregistrement sur le disque par lot au lieu d'un par tâche. Les tâches peuvent venir
+    d'un générateur, elles ne sont jamais toutes chargées en mémoire"""
+    connexion = base.connexion()
+    # Les opérations en attente d'une durabilité groupée sont enregistrées avant les lots
+    base.vider_ecritures()
+    taches = iter(taches)
+    nombre = 0
+    while True :
+        # La fonction islice() prend les "taille_lot" éléments suivants de l'itérateur
+        lot = [(id_utilisateur, nom_tache, description_tache, date_vers_iso(date_echeance), bool(completee and completee[0]), prio)
+               for nom_tache, description_tache, date_echeance, prio, *completee in itertools.islice(taches, taille_lot)]
+        if not lot :
+            return nombre
+        # "with connexion" valide le lot entier, ou l'annule en cas d'erreur
+        with connexion :
+            # La fonction executemany() exécute la même requête préparée pour chaque ligne du lot
+            connexion.executemany(SQL_AJOUTER_TACHE, lot)
+        nombre += len(lot)
+
+
+def maj_tache(id_tache, nom_tache, description_tache, date_echeance, prio) :
+    """int, str, str, str, str -> None
+    Modifie le nom, la description, l'échéance (au format JJ-MM-AAAA) et la priorité d'une tâche, en une seule requête"""
+    # Les déclencheurs mettent à jour la recherche, les compteurs et le journal de synchronisation
+    curseur = base.executer(SQL_MODIFIER_TACHE, (nom_tache, description_tache, date_vers_iso(date_echeance), prio, id_tache))
+    if curseur.rowcount == 0 :
+        base.annuler()
+        raise ValueError(f"La tâche {id_tache} n'existe pas")
+    base.valider()
+
+
+def ajouter_sous_tache(id_parent, nom_tache, description_tache, date_echeance, prio) :
+    """int, str, str, str, str -> int
+    Ajoute une sous-tâche à une tâche (échéance au format JJ-MM-AAAA) et renvoie son identifiant"""
+    curseur = base.executer(SQL_AJOUTER_SOUS_TACHE, (nom_tache, description_tache, date_vers_iso(date_echeance), prio, id_parent))
+    if curseur.rowcount == 0 :
+        base.annuler()
+        raise ValueError(f"La tâche {id_parent} n'existe pas")
+    base.valider()
+    return curseur.lastrowid
+
+
+def supprimer_tache(id_tache) :
+    """int -> list
+    Supprime une tâche et toutes ses sous-tâches, en une seule requête, et renvoie leurs identifiants"""
+    # Toutes les lignes de RETURNING doivent être lues avant de valider la transaction
+    supprimees = [ligne[0] for ligne in base.executer(SQL_SUPPRIMER_TACHE, (id_tache,)).fetchall()]
+    base.valider()
+    return supprimees
+
+
+def marquer_tache_complete(id_tache) :
+    """int -> None
+    Marque une tâche comme complétée dans la base de donnée"""
+    base.executer(SQL_MARQUER_TACHE_COMPLETE, (id_tache,))
+    base.valider()
+
+
+def proprietaire_tache(id_tache) :
+    """int -> int
+    Renvoie l'identifiant de l'utilisateur à qui appartient une tâche, ou None si elle n'existe pas"""
+    ligne = base.executer(SQL_PROPRIETAIRE_TACHE, (id_tache,)).fetchone()
+    return ligne[0] if ligne is not None else None
+
+
+def executer_taches(requete, parametres = ()) :
+    """str, tuple -> sqlite3.Cursor
+    Exécute une requête qui lit COLONNES_TACHES : chaque ligne lue est renvoyée sous la forme d'une Tache"""
+    curseur = base.curseur()
+    # L'attribut row_factory transforme chaque ligne au moment où sqlite3 la lit, sans liste de tuples intermédiaire
+    curseur.row_factory = Tache.depuis_ligne
+    return curseur.execute(requete, parametres)
+
+
+def obtenir_taches(id_utilisateur) :
+    """int -> list
+    Récupère toutes les tâches d'un utilisateur, les tâches en cours d'abord, triées par échéance"""
+    # Le tri suit l'index idx_taches_utilisateur : SQLite n'a donc pas besoin de trier les lignes
+    # La fonction fetchall() retourne tous les enregistrements de la requête
+    return executer_taches(SQL_OBTENIR_TACHES, (id_utilisateur,)).fetchall()
+
+
+def iterer_taches(id_utilisateur, taille_lot = 500) :
+    """int, int -> generator
+    Renvoie les tâches d'un utilisateur une par une, dans le même ordre que obtenir_taches
+    Les lignes sont lues par lots de "taille_lot" : la mémoire utilisée ne dépend pas du nombre de tâches"""
+    curseur = base.curseur()
+    curseur.row_factory = Tache.depuis_ligne
+    # L'attribut arraysize fixe le nombre de lignes renvoyées par fetchmany()
+    curseur.arraysize = taille_lot
+    try :
+        curseur.execute(SQL_OBTENIR_TACHES, (id_utilisateur,))
+        while True :
+            lignes = curseur.fetchmany()
+            if not lignes :
+                return
+            yield from lignes
+    finally :
+        # Si le générateur est abandonné avant la fin, la lecture est terminée proprement
+        curseur.close()
+
+
+def rechercher_taches(id_utilisateur, texte, limite = 50) :
+    """int, str, int -> list
+    Recherche les tâches d'un utilisateur dont le nom ou la description contiennent les mots tapés
+    Chaque mot est cherché comme début de mot ("cour" trouve "courses"), les meilleurs résultats en premier"""
+    # Les mots sont mis entre guillemets pour que les caractères spéciaux de FTS5 ne soient pas interprétés
+    mots = re.findall(r"\w+", texte)
+    if not mots :
+        return []
+    requete = " ".join(f'"{mot}"*' for mot in mots)
+    return executer_taches(SQL_RECHERCHER_TACHES, (requete, id_utilisateur, limite)).fetchall()
+
+
+# Tris possibles pour obtenir_page_taches : colonnes du ORDER BY (la dernière est toujours tache_id,
+# pour que deux tâches ne soient jamais à égalité) et clé de tri équivalente en Python
+# L'échéance est comparée au format ISO, comme dans la base : une date illisible restée en texte se trie comme en SQL
+TRIS = {
+    "defaut" : (("est_completee", "echeance", "tache_id"), lambda tache : (tache.est_completee, tache.echeance_iso, tache.tache_id)),
+    "echeance" : (("echeance", "tache_id"), lambda tache : (tache.echeance_iso, tache.tache_id)),
+    "priorite" : (("rang_priorite", "echeance", "tache_id"), lambda tache : (tache.rang_priorite, tache.echeance_iso, tache.tache_id)),
+    "creation" : (("tache_id",), lambda tache : (tache.tache_id,)),
+}
+
+
+def obtenir_sous_taches(id_parent) :
+    """int -> list
+    Renvoie les sous-tâches directes d'une tâche (sans leurs propres sous-tâches)"""
+    return executer_taches(SQL_SOUS_TACHES, (id_parent,)).fetchall()
+
+
+def obtenir_sous_arbre(id_tache) :
+    """int -> list
+    Renvoie toutes les sous-tâches d'une tâche, à toutes les profondeurs, en une seule requête
+    Chaque tâche est renvoyée avec sa profondeur (1 pour une sous-tâche directe), en paire (Tache, profondeur)"""
+    return [(Tache(*ligne[:-1]), ligne[-1]) for ligne in base.executer(SQL_SOUS_ARBRE, (id_tache,))]
+
+
+def progression_taches(ids_taches) :
+    """list -> dict
+    Renvoie, pour chaque tâche qui a des sous-tâches, le nombre de sous-tâches (à toutes les profondeurs)
+    et le nombre de sous-tâches complétées, calculés en une seule requête"""
+    lignes = base.executer(SQL_PROGRESSION, (json.dumps(list(ids_taches)),)).fetchall()
+    return {racine : (nombre, completees) for racine, nombre, completees in lignes}
+
+
+def conditions_filtres(filtres) :
+    """dict -> str, list
+    Traduit les filtres en conditions SQL et en paramètres
+    Filtres possibles : "completee" (bool), "priorites" (liste), "debut" et "fin" (dates), "en_retard" (bool),
+    "racines" (bool, seulement les tâches qui ne sont pas des sous-tâches)"""
+    conditions, parametres = [], []
+    if filtres.get("racines") :
+        conditions.append("parent_id IS NULL")
+    if filtres.get("completee") is not None :
+        conditions.append("est_completee = ?")
+        parametres.append(1 if filtres["completee"] else 0)
+    if filtres.get("priorites") :
+        conditions.append(f"priorite IN ({', '.join('?' for _ in filtres['priorites'])})")
+        parametres.extend(filtres["priorites"])
+    if filtres.get("debut") :
+        conditions.append("echeance >= ?")
+        parametres.append(date_vers_iso(filtres["debut"]))
+    if filtres.get("fin") :
+        conditions.append("echeance <= ?")
+        parametres.append(date_vers_iso(filtres["fin"]))
+    if filtres.get("en_retard") :
+        conditions.append("est_completee = 0 AND echeance < date('now', 'localtime')")
+    return "".join(" AND " + condition for condition in conditions), parametres
+
+
+def tache_correspond(tache, filtres) :
+    """Tache, dict -> bool
+    Vérifie en Python qu'une tâche respecte les filtres, comme le ferait conditions_filtres en SQL"""
+    if filtres.get("completee") is not None and bool(tache.est_completee) != bool(filtres["completee"]) :
+        return False
+    if filtres.get("priorites") and tache.priorite not in filtres["priorites"] :
+        return False
+    if filtres.get("debut") and tache.echeance_iso < date_vers_iso(filtres["debut"]) :
+        return False
+    if filtres.get("fin") and tache.echeance_iso > date_vers_iso(filtres["fin"]) :
+        return False
+    if filtres.get("en_retard") and (tache.est_completee or tache.echeance_iso >= date.today().isoformat()) :
+        return False
+    if filtres.get("racines") and tache.parent_id is not None :
+        return False
+    return True
+
+
+def obtenir_page_taches(id_utilisateur, filtres = None, tri = "defaut", apres = None, taille_page = 100) :
+    """int, dict, str, tuple, int -> list, tuple
+    Renvoie une page de tâches filtrées et triées, et le curseur à donner pour obtenir la page suivante
+    (None s'il n'y a plus de tâches). La page suivante commence juste après la dernière tâche
+    de la page précédente (pagination par clé) : la page 1000 coûte autant que la première,
+    contrairement à OFFSET qui relirait toutes les tâches précédentes"""
+    colonnes, cle_tri = TRIS[tri]
+    conditions, parametres = conditions_filtres(filtres or {})
+    debut_requete = f"SELECT {COLONNES_TACHES} FROM taches WHERE utilisateur_id = ?{conditions}"
+    fin_requete = f" ORDER BY {', '.join(colonnes)} LIMIT ?"
+    # Une ligne de plus est lue pour savoir s'il reste une page après celle-ci
+    limite = taille_page + 1
+    if apres is None :
+        taches = executer_taches(debut_requete + fin_requete, [id_utilisateur] + parametres + [limite]).fetchall()
+    else :
+        # "Après (a, b, c)" se découpe en : (a = a0, b = b0, c > c0), puis (a = a0, b > b0), puis (a > a0).
+        # SQLite ne sait pas parcourir un index à partir d'un n-uplet (a, b, c) > (a0, b0, c0),
+        # mais chacune de ces requêtes commence directement au bon endroit de l'index
+        taches = []
+        for nombre_egalites in reversed(range(len(colonnes))) :
+            comparaisons = "".join(f" AND {colonne} = ?" for colonne in colonnes[:nombre_egalites])
+            comparaisons += f" AND {colonnes[nombre_egalites]} > ?"
+            valeurs = list(apres[:nombre_egalites + 1])
+            taches += executer_taches(debut_requete + comparaisons + fin_requete,
+                                    [id_utilisateur] + parametres + valeurs + [limite - len(taches)]).fetchall()
+            if len(taches) == limite :
+                break
+    if len(taches) < limite :
+        return taches, None
+    taches = taches[:taille_page]
+    return taches, cle_tri(taches[-1])
+
+
+def obtenir_taches_ouvertes(id_utilisateur) :
+    """int -> list
+    Récupère les tâches en cours d'un utilisateur (pour le planificateur)"""
+    return executer_taches(SQL_TACHES_OUVERTES, (id_utilisateur,)).fetchall()
+
+
+def obtenir_taches_en_retard(id_utilisateur) :
+    """int -> list
+    Récupère les tâches en cours dont l'échéance est dépassée"""
+    # La fonction date('now', 'localtime') de SQLite renvoie la date du jour au format ISO
+    return executer_taches(SQL_TACHES_EN_RETARD, (id_utilisateur,)).fetchall()
+
+
+def obtenir_taches_a_venir(id_utilisateur, jours = 7) :
+    """int, int -> list
+    Récupère les tâches en cours dont l'échéance tombe dans les prochains jours"""
+    return executer_taches(SQL_TACHES_A_VENIR, (id_utilisateur, f"+{jours} days")).fetchall()
+
+
+def obtenir_compteurs(id_utilisateur) :
+    """int -> dict
+    Renvoie le nombre de tâches d'un utilisateur : au total, complétées, en cours, et en cours par priorité
+    Les compteurs sont tenus à jour par des déclencheurs : leur lecture ne parcourt pas les tâches"""
+    ligne = base.executer(SQL_COMPTEURS, (id_utilisateur,)).fetchone() or (0, 0, 0, 0, 0)
+    total, completees, faible, moyenne, haute = ligne
+    return {"total" : total, "completees" : completees, "ouvertes" : faible + moyenne + haute,
+            "Faible" : faible, "Moyenne" : moyenne, "Haute" : haute}
+
+
+# Fonctions pour les tâches répétées
+# Une tâche répétée est une règle (table recurrences). Ses occurrences sont calculées à la demande,
+# seulement pour la période affichée ou planifiée : elles ont un identifiant texte "règle:AAAA-MM-JJ"
+# au lieu d'un tache_id. Une occurrence ne devient une ligne de taches que quand l'utilisateur la complète
+def ajouter_recurrence(id_utilisateur, nom_tache, description_tache, date_debut, prio, frequence, intervalle = 1, date_fin = None, nombre = None) :
+    """int, str, str, str, str, str, int, str, int -> int
+    Ajoute une tâche répétée (dates au format JJ-MM-AAAA) et renvoie l'identifiant de sa règle
+    frequence : "quotidienne", "hebdomadaire" ou "mensuelle" ; la répétition s'arrête à date_fin ou après "nombre" occurrences"""
+    curseur = base.executer(SQL_AJOUTER_RECURRENCE, (id_utilisateur, nom_tache, description_tache, date_vers_iso(date_debut), prio,
+                                                     frequence, intervalle, date_vers_iso(date_fin) if date_fin else None, nombre))
+    base.valider()
+    return curseur.lastrowid
+
+
+def supprimer_recurrence(id_recurrence) :
+    """int -> None
+    Arrête une tâche répétée (les occurrences déjà complétées restent des tâches)"""
+    base.executer(SQL_SUPPRIMER_RECURRENCE, (id_recurrence,))
+    base.valider()
+
+
+def obtenir_recurrences(id_utilisateur) :
+    """int -> list
+    Renvoie les règles des tâches répétées d'un utilisateur"""
+    return base.executer(SQL_RECURRENCES, (id_utilisateur,)).fetchall()
+
+
+def dates_recurrence(recurrence, debut, fin = None) :
+    """tuple, date, date -> generator
+    Génère, dans l'ordre, les dates des occurrences d'une règle comprises entre debut et fin (sans fin : jusqu'à
+    la fin de la règle, ou sans limite). Le calcul commence directement à la première occurrence de la période :
+    son coût ne dépend que du nombre d'occurrences générées, pas de l'ancienneté de la règle"""
+    premiere = date.fromisoformat(recurrence[4])
+    frequence, intervalle, date_fin, nombre = recurrence[6:10]
+    if date_fin is not None :
+        fin = min(fin, date.fromisoformat(date_fin)) if fin is not None else date.fromisoformat(date_fin)
+    if frequence == "mensuelle" :
+        # Numéro de la première occurrence qui peut tomber dans la période (la précédente peut aussi y être comptée)
+        numero = max(0, ((debut.year - premiere.year) * 12 + debut.month - premiere.month) // intervalle)
+    else :
+        pas = intervalle * (7 if frequence == "hebdomadaire" else 1)
+        # -(-a // b) arrondit la division au nombre supérieur
+        numero = max(0, -(-(debut - premiere).days // pas))
+    while nombre is None or numero < nombre :
+        if frequence == "mensuelle" :
+            mois = premiere.month - 1 + numero * intervalle
+            annee = premiere.year + mois // 12
+            # Une règle du 31 tombe le dernier jour des mois plus courts
+            jour = date(annee, mois % 12 + 1, min(premiere.day, calendar.monthrange(annee, mois % 12 + 1)[1]))
+        else :
+            jour = premiere + timedelta(days = numero * pas)
+        if fin is not None and jour > fin :
+            return
+        if jour >= debut :
+            yield jour
+        numero += 1
+
+
+def occurrence_en_tache(recurrence, jour) :
+    """tuple, date -> Tache
+    Renvoie une occurrence sous la forme d'une tâche en cours, avec l'identifiant texte "règle:AAAA-MM-JJ" """
+    return Tache(f"{recurrence[0]}:{jour.isoformat()}", recurrence[1], recurrence[2], recurrence[3], jour, 0, recurrence[5])
+
+
+def occurrences(id_utilisateur, debut, fin) :
+    """int, date, date -> iterator
+    Renvoie les occurrences pas encore complétées des tâches répétées entre debut et fin, triées par échéance
+    Les règles et les occurrences déjà matérialisées sont lues tout de suite ; les occurrences ne sont
+    calculées qu'au fur et à mesure de la lecture de l'itérateur"""
+    materialisees = set(base.executer(SQL_OCCURRENCES_MATERIALISEES, (id_utilisateur, debut.isoformat(), fin.isoformat())).fetchall())
+
+    def a_faire(recurrence) :
+        """tuple -> generator
+        Génère les occurrences d'une règle qui n'ont pas encore été matérialisées"""
+        for jour in dates_recurrence(recurrence, debut, fin) :
+            if (recurrence[0], jour.isoformat()) not in materialisees :
+                yield occurrence_en_tache(recurrence, jour)
+
+    # La fonction merge() fusionne des suites déjà triées sans les charger entièrement
+    return heapq.merge(*[a_faire(recurrence) for recurrence in obtenir_recurrences(id_utilisateur)], key = lambda tache : tache.echeance)
+
+
+def obtenir_occurrences_materialisees(id_utilisateur, debut) :
+    """int, date -> set
+    Renvoie les occurrences déjà matérialisées (complétées ou modifiées) à partir de debut, en paires (recurrence_id, "AAAA-MM-JJ")
+    Ce sont des tâches : le planificateur ne doit plus les planifier comme des occurrences"""
+    return set(base.executer(SQL_OCCURRENCES_MATERIALISEES, (id_utilisateur, debut.isoformat(), date.max.isoformat())).fetchall())
+
+
+def obtenir_occurrences(id_utilisateur, jours = 14, limite = 200) :
+    """int, int, int -> list
+    Renvoie au plus "limite" occurrences à faire d'aujourd'hui aux "jours" prochains jours"""
+    aujourdhui = date.today()
+    return list(itertools.islice(occurrences(id_utilisateur, aujourdhui, aujourdhui + timedelta(days = jours)), limite))
+
+
+def _materialiser(id_occurrence) :
+    """str -> int
+    Insère la tâche d'une occurrence si elle n'existe pas encore et renvoie son tache_id, sans valider
+    Lève une ValueError (après avoir annulé) si la règle n'existe pas"""
+    id_recurrence, jour = id_occurrence.split(":")
+    base.executer(SQL_MATERIALISER_OCCURRENCE, (jour, jour, int(id_recurrence)))
+    ligne = base.executer(SQL_TACHE_OCCURRENCE, (int(id_recurrence), jour)).fetchone()
+    if ligne is None :
+        base.annuler()
+        raise ValueError(f"La tâche répétée {id_recurrence} n'existe pas")
+    return ligne[0]
+
+
+def materialiser_occurrence(id_occurrence) :
+    """str -> int
+    Enregistre une occurrence comme une tâche (si ce n'est pas déjà fait) et renvoie son tache_id"""
+    tache_id = _materialiser(id_occurrence)
+    base.valider()
+    return tache_id
+
+
+def completer_occurrence(id_occurrence) :
+    """str -> int
+    Marque une occurrence comme complétée : elle devient une tâche complétée, dont le tache_id est renvoyé"""
+    tache_id = _materialiser(id_occurrence)
+    base.executer(SQL_MARQUER_TACHE_COMPLETE, (tache_id,))
+    base.valider()
+    return tache_id
+
+
+
+# Archivage des tâches complétées
+# Les tâches complétées depuis longtemps sont déplacées dans une seconde base de donnée (todolist-archive.db
+# à côté de todolist.db), attachée à la connexion avec ATTACH : les requêtes de tous les jours ne parcourent
+# plus que les tâches utiles, et les tâches archivées ne sont lues que si l'utilisateur les demande.
+# Les tâches archivées ne comptent plus dans les compteurs du tableau de bord ni dans la recherche
+def chemin_archive() :
+    """None -> str
+    Renvoie le chemin de la base d'archive, à côté de la base de donnée utilisée"""
+    if base.chemin == ":memory:" :
+        return base.chemin
+    return os.path.splitext(base.chemin)[0] + "-archive.db"
+
+
+def attacher_archive() :
+    """None -> sqlite3.Connection
+    Attache la base d'archive à la connexion du thread courant (si ce n'est pas déjà fait) et renvoie cette connexion"""
+    connexion = base.connexion()
+    # PRAGMA database_list donne les bases attachées : une connexion rouverte doit attacher l'archive à nouveau
+    if all(ligne[1] != "archive" for ligne in connexion.execute("PRAGMA database_list")) :
+        # ATTACH est impossible pendant une transaction : les opérations en attente sont enregistrées avant
+        base.vider_ecritures()
+        connexion.execute("ATTACH DATABASE ? AS archive", (chemin_archive(),))
+        connexion.execute("PRAGMA archive.journal_mode = WAL")
+        with connexion :
+            connexion.execute(SQL_CREER_ARCHIVE)
+            connexion.execute(SQL_INDEX_ARCHIVE)
+            connexion.execute(SQL_INDEX_ARCHIVE_UID)
+    return connexion
+
+
+def archiver_taches(id_utilisateur, jours = 30, taille_lot = 500) :
+    """int, int, int -> int
+    Déplace dans la base d'archive les tâches complétées d'un utilisateur qui n'ont pas été modifiées depuis
+    "jours" jours, avec leurs sous-tâches, puis rend au disque la place libérée. Renvoie le nombre de tâches archivées
+    Chaque lot de "taille_lot" tâches principales est déplacé dans sa propre transaction : les autres threads
+    ne sont jamais bloqués longtemps"""
+    connexion = attacher_archive()
+    base.vider_ecritures()
+    archivees = 0
+    derniere = 0
+    while True :
+        racines = [ligne[0] for ligne in connexion.execute(SQL_RACINES_A_ARCHIVER, (id_utilisateur, f"-{jours} days", derniere, taille_lot))]
+        if not racines :
+            break
+        derniere = racines[-1]
+        ids = json.dumps([ligne[0] for ligne in connexion.execute(SQL_ARBRES_A_ARCHIVER, (json.dumps(racines),))])
+        # En mode WAL, une transaction sur deux bases n'est pas atomique entre elles : la copie est faite
+        # avec INSERT OR REPLACE, pour qu'un lot interrompu puisse être archivé à nouveau sans erreur
+        with connexion :
+            connexion.execute("BEGIN")
+            # Un archivage n'est pas une suppression : il ne doit pas être envoyé aux autres appareils
+            connexion.execute("UPDATE synchronisation SET application = 1")
+            connexion.execute(SQL_COPIER_ARCHIVE, (ids,))
+            archivees += connexion.execute(SQL_RETIRER_ARCHIVEES, (ids,)).rowcount
+            connexion.execute("UPDATE synchronisation SET application = 0")
+    if archivees :
+        liberer_pages(connexion)
+    return archivees
+
+
+def liberer_pages(connexion, pages_par_etape = 1000) :
+    """sqlite3.Connection, int -> None
+    Rend au disque les pages libres de la base de donnée, "pages_par_etape" pages par transaction"""
+    # Une base créée avant l'auto_vacuum INCREMENTAL garde ses pages libres, réutilisées par les écritures suivantes :
+    # elle ne peut être convertie que par activer_vacuum_incremental(), jamais automatiquement
+    if connexion.execute("PRAGMA main.auto_vacuum").fetchone()[0] != 2 :
+        return
+    libres = connexion.execute("PRAGMA main.freelist_count").fetchone()[0]
+    while libres :
+        # fetchall() exécute le PRAGMA jusqu'au bout : chaque ligne renvoyée correspond à une page libérée
+        connexion.execute(f"PRAGMA main.incremental_vacuum({pages_par_etape})").fetchall()
+        restantes = connexion.execute("PRAGMA main.freelist_count").fetchone()[0]
+        if restantes >= libres :
+            return
+        libres = restantes
+
+
+def activer_vacuum_incremental() :
+    """None -> bool
+    Reconstruit une base créée avant l'auto_vacuum INCREMENTAL pour l'activer, et renvoie False si c'était déjà fait
+    VACUUM réécrit tout le fichier et bloque toutes les écritures jusqu'à la fin : cette maintenance n'est
+    faite que sur demande (python3 maintenance.py), de préférence quand l'application est fermée"""
+    connexion = base.connexion()
+    if connexion.execute("PRAGMA main.auto_vacuum").fetchone()[0] == 2 :
+        return False
+    # VACUUM est impossible pendant une transaction : les opérations en attente sont enregistrées avant
+    base.vider_ecritures()
+    connexion.execute("PRAGMA main.auto_vacuum = INCREMENTAL")
+    connexion.execute("VACUUM main")
+    return True
+
+
+def obtenir_taches_archivees(id_utilisateur, apres = None, taille_page = 100) :
+    """int, int, int -> list, int
+    Renvoie une page de tâches archivées, les dernières archivées en premier, et le curseur de la page suivante
+    (None s'il n'y en a plus). La base d'archive n'est ouverte qu'au premier appel"""
+    attacher_archive()
+    taches = executer_taches(SQL_TACHES_ARCHIVEES, (id_utilisateur, apres if apres is not None else 2 ** 63 - 1, taille_page + 1)).fetchall()
+    if len(taches) <= taille_page :
+        return taches, None
+    taches = taches[:taille_page]
+    return taches, taches[-1].tache_id
+
+
+
+# Cache des tâches de l'utilisateur connecté
+class CacheTaches :
+    """Garde en mémoire les pages de tâches déjà lues, triées et filtrées comme dans obtenir_page_taches
+    Les tâches sont aussi indexées par tache_id, ce qui évite de relire toutes les tâches
+    pour retrouver celle qui est sélectionnée. Tant que toutes les pages n'ont pas été lues
+    ("complet" est faux), une tâche qui se trie après la dernière tâche lue n'est pas gardée :
+    elle arrivera avec la page suivante"""
+    def __init__(self) :
+        self.vider()
+
+
+    def charger(self, taches, filtres = None, tri = "defaut", complet = True) :
+        """list, dict, str, bool -> None
+        Remplace le contenu du cache par la première page de tâches lue dans la base de donnée"""
+        self.filtres = filtres or {}
+        self.tri = tri
+        self.cle_tri = TRIS[tri][1]
+        self.taches = list(taches)
+        self.par_id = {tache.tache_id : tache for tache in self.taches}
+        self.complet = complet
+
+
+    def ajouter_page(self, taches, complet) :
+        """list, bool -> None
+        Ajoute la page suivante à la fin du cache"""
+        self.taches.extend(taches)
+        self.par_id.update((tache.tache_id, tache) for tache in taches)
+        self.complet = complet
+
+
+    def vider(self) :
+        """CacheTaches -> None
+        Oublie toutes les tâches (à la déconnexion)"""
+        self.charger([])
+
+
+    def tache(self, tache_id) :
+        """int -> Tache
+        Renvoie la tâche qui a cet identifiant"""
+        return self.par_id[tache_id]
+
+
+    def ajouter(self, tache) :
+        """Tache -> None
+        Insère une tâche à sa place dans l'ordre de tri, si elle fait partie des tâches affichées"""
+        if not tache_correspond(tache, self.filtres) :
+            return
+        if not self.complet and (not self.taches or self.cle_tri(tache) > self.cle_tri(self.taches[-1])) :
+            return
+        # La fonction bisect() trouve la position d'insertion dans une liste triée sans la parcourir entièrement
+        position = bisect.bisect(self.taches, self.cle_tri(tache), key = self.cle_tri)
+        self.taches.insert(position, tache)
+        self.par_id[tache.tache_id] = tache
+
+
+    def supprimer(self, tache_id) :
+        """int -> Tache
+        Retire la tâche qui a cet identifiant et la renvoie (None si elle n'était pas dans le cache)"""
+        tache = self.par_id.pop(tache_id, None)
+        if tache is not None :
+            position = bisect.bisect_left(self.taches, self.cle_tri(tache), key = self.cle_tri)
+            del self.taches[position]
+        return tache
+
+
+    def remplacer(self, tache) :
+        """Tache -> None
+        Remplace une tâche modifiée, en la déplaçant si sa place dans le tri a changé"""
+        self.supprimer(tache.tache_id)
+        self.ajouter(tache)
+
+
+
+# Classe d'ordonnancement pour gérer les états des tâches
+class Planificateur :
+    """Surveille les échéances des tâches en cours
+    Les échéances sont rangées dans un tas (module heapq) : la prochaine tâche à expirer est
+    toujours en tête, le thread dort exactement jusqu'à elle au lieu de tout revérifier chaque minute.
+    Les tâches expirées sont déposées dans la file "evenements", lue par la boucle Tk.
+    Pour une tâche répétée, seule la prochaine occurrence est planifiée : la suivante ne l'est
+    qu'une fois celle-ci expirée ou complétée"""
+    # Durée maximale d'attente, pour se recaler si l'horloge change (mise en veille, changement d'heure)
+    ATTENTE_MAX = 3600
+
+    def __init__(self) :
+        # tache_id -> entrée du tas [échéance, numéro d'ajout, tâche]
+        # Le numéro départage deux échéances égales : les identifiants des tâches (int) et des occurrences (str)
+        # ne peuvent pas être comparés entre eux
+        self.taches = {}
+        self.tas = []
+        self.numeros = itertools.count()
+        # recurrence_id -> règle des tâches répétées dont une occurrence est planifiée, et occurrences
+        # déjà matérialisées (recurrence_id, "AAAA-MM-JJ") : elles sont devenues des tâches et sont sautées
+        self.recurrences = {}
+        self.materialisees = set()
+        # La classe Condition permet de réveiller le thread quand une échéance est ajoutée ou annulée
+        self.condition = threading.Condition()
+        # La classe Queue permet d'échanger des données entre threads sans risque
+        self.evenements = queue.Queue()
+        # Identifiants des tâches en cours déjà expirées : leur nombre est celui des tâches en retard
+        self.expirees = set()
+        self.actif = True
+
+
+    def _entree(self, tache) :
+        """Tache -> list
+        Renvoie l'entrée du tas d'une tâche : le moment où elle expire, son numéro d'ajout et la tâche"""
+        # La fonction combine() construit la date et l'heure à partir de l'échéance déjà lue par Tache
+        expiration = datetime.combine(tache.echeance, datetime.min.time())
+        # Une tâche n'est en retard qu'une fois son jour d'échéance passé, comme pour le filtre "En retard"
+        # (echeance < date du jour) : elle expire à la fin de ce jour. Une occurrence de tâche répétée est
+        # un rappel, signalé dès le début de son jour
+        if not isinstance(tache.tache_id, str) :
+            expiration += timedelta(days = 1)
+        return [expiration, next(self.numeros), tache]
+
+
+    def ajouter_tache(self, tache) :
+        """Tache -> None
+        Planifie l'échéance d'une tâche (remplace l'échéance déjà planifiée pour cette tâche)"""
+        tache = Tache.convertir(tache)
+        # Une échéance illisible (restée en texte dans la base) ne peut pas être planifiée :
+        # l'ancienne échéance de la tâche, qui n'est plus la bonne, est seulement retirée
+        if not isinstance(tache.echeance, date) :
+            self.annuler(tache.tache_id)
+            return
+        entree = self._entree(tache)
+        with self.condition :
+            self._retirer(tache.tache_id)
+            self.taches[tache.tache_id] = entree
+            # La fonction heappush() ajoute un élément au tas en O(log n)
+            heapq.heappush(self.tas, entree)
+            self.condition.notify()
+
+
+    def replanifier(self, tache) :
+        """Tache -> None
+        Met à jour l'échéance d'une tâche déjà planifiée"""
+        self.ajouter_tache(tache)
+
+
+    def annuler(self, tache_id) :
+        """int -> None
+        Retire une tâche du planificateur (tâche complétée ou supprimée)"""
+        with self.condition :
+            self._retirer(tache_id)
+            self.condition.notify()
+
+
+    def passer_occurrence(self, id_occurrence) :
+        """str -> None
+        Retire une occurrence complétée et, si c'était l'occurrence planifiée de sa règle, planifie la suivante
+        (une occurrence déjà expirée a déjà laissé la place à la suivante)"""
+        id_recurrence, jour = id_occurrence.split(":")
+        with self.condition :
+            self.materialisees.add((int(id_recurrence), jour))
+            planifiee = id_occurrence in self.taches
+            self._retirer(id_occurrence)
+            if planifiee :
+                self._planifier_suivante(id_occurrence)
+            self.condition.notify()
+
+
+    def _planifier_suivante(self, id_occurrence) :
+        """str -> None
+        Planifie l'occurrence qui suit celle donnée, si sa règle en a encore une (à appeler avec la condition acquise)"""
+        id_recurrence, jour = id_occurrence.split(":")
+        recurrence = self.recurrences.get(int(id_recurrence))
+        if recurrence is None :
+            return
+        suivante = self._prochaine(recurrence, date.fromisoformat(jour) + timedelta(days = 1))
+        if suivante is not None :
+            entree = self._entree(occurrence_en_tache(recurrence, suivante))
+            self.taches[entree[2].tache_id] = entree
+            heapq.heappush(self.tas, entree)
+
+
+    def _prochaine(self, recurrence, debut) :
+        """tuple, date -> date
+        Renvoie la première occurrence d'une règle à partir de debut qui n'est pas encore matérialisée (None s'il n'y en a plus)"""
+        for jour in dates_recurrence(recurrence, debut) :
+            if (recurrence[0], jour.isoformat()) not in self.materialisees :
+                return jour
+        return None
+
+
+    def _retirer(self, tache_id) :
+        """int -> None
+        Marque l'entrée d'une tâche comme annulée, elle sera ignorée en sortant du tas"""
+        entree = self.taches.pop(tache_id, None)
+        if entree is not None :
+            entree[2] = None
+        self.expirees.discard(tache_id)
+
+
+    def charger(self, taches) :
+        """list -> None
+        Remplace les échéances planifiées par celles des tâches en cours données (à la connexion)
+        Les occurrences des tâches répétées déjà planifiées sont gardées"""
+        # Une échéance illisible (restée en texte dans la base) ne peut pas être planifiée
+        entrees = [self._entree(tache) for tache in map(Tache.convertir, taches)
+                   if not tache.est_completee and isinstance(tache.echeance, date)]
+        with self.condition :
+            self._remplacer(entrees, lambda tache_id : isinstance(tache_id, str))
+
+
+    def charger_recurrences(self, recurrences, aujourdhui = None, materialisees = ()) :
+        """list, date, set -> None
+        Remplace les tâches répétées planifiées : seule la prochaine occurrence de chaque règle est planifiée
+        Les occurrences matérialisées données (voir obtenir_occurrences_materialisees) sont sautées"""
+        aujourdhui = aujourdhui if aujourdhui is not None else date.today()
+        with self.condition :
+            self.materialisees = set(materialisees)
+            entrees = []
+            for recurrence in recurrences :
+                prochaine = self._prochaine(recurrence, aujourdhui)
+                if prochaine is not None :
+                    entrees.append(self._entree(occurrence_en_tache(recurrence, prochaine)))
+            self.recurrences = {recurrence[0] : recurrence for recurrence in recurrences}
+            self._remplacer(entrees, lambda tache_id : not isinstance(tache_id, str))
+
+
+    def _remplacer(self, entrees, garder) :
+        """list, function -> None
+        Remplace les entrées planifiées, sauf celles dont garder(tache_id) est vrai (à appeler avec la condition acquise)"""
+        entrees += [entree for tache_id, entree in self.taches.items() if garder(tache_id)]
+        self.taches = {entree[2].tache_id : entree for entree in entrees}
+        self.expirees = {tache_id for tache_id in self.expirees if garder(tache_id)}
+        # La fonction heapify() construit le tas en une seule passe, en O(n)
+        heapq.heapify(entrees)
+        self.tas = entrees
+        self.condition.notify()
+
+
+    def nb_expirees(self) :
+        """Planificateur -> int
+        Renvoie le nombre de tâches en cours dont l'échéance est passée, sans relire la base de donnée"""
+        with self.condition :
+            return len(self.expirees)
+
+
+    def vider(self) :
+        """Planificateur -> None
+        Oublie toutes les échéances (à la déconnexion)"""
+        self.charger_recurrences([])
+        self.charger([])
+
+
+    def arreter(self) :
+        """Planificateur -> None
+        Demande au thread du planificateur de s'arrêter"""
+        with self.condition :
+            self.actif = False
+            self.condition.notify()
+
+
+    def run(self) :
+        """Planificateur -> None
+        Attend la prochaine échéance et signale chaque tâche expirée une seule fois"""
+        with self.condition :
+            while self.actif :
+                # Les entrées annulées sont retirées lorsqu'elles arrivent en tête du tas
+                mesures.compter("planificateur.reveils")
+                while self.tas and self.tas[0][2] is None :
+                    heapq.heappop(self.tas)
+                if not self.tas :
+                    self.condition.wait()
+                    continue
+                attente = (self.tas[0][0] - datetime.now()).total_seconds()
+                if attente > 0 :
+                    # wait() rend la main dès qu'une échéance est ajoutée ou annulée
+                    self.condition.wait(min(attente, self.ATTENTE_MAX))
+                    continue
+                echeance, numero, tache = heapq.heappop(self.tas)
+                del self.taches[tache.tache_id]
+                self.evenements.put(tache)
+                # Une occurrence expirée est un rappel, pas une tâche en retard : elle laisse la place à la suivante de sa règle
+                if isinstance(tache.tache_id, str) :
+                    self._planifier_suivante(tache.tache_id)
+                else :
+                    self.expirees.add(tache.tache_id)
+                mesures.compter("planificateur.expirations")
+
+
+
+# Thread dédié aux accès à la base de donnée
+class TravailleurBase :
+    """Exécute les fonctions de ce module, une par une, dans un thread dédié
+    L'interface lui confie ses requêtes au lieu de les exécuter elle-même : une écriture lente
+    sur le disque ne bloque plus l'affichage. Chaque demande renvoie un Future, qui contiendra
+    le résultat (ou l'erreur) une fois la fonction exécutée"""
+    def __init__(self) :
+        self.demandes = queue.Queue()
+        self.thread = threading.Thread(target = self.run, daemon = True)
+
+
+    def demarrer(self) :
+        """TravailleurBase -> TravailleurBase
+        Démarre le thread du travailleur"""
+        self.thread.start()
+        return self
+
+
+    def soumettre(self, fonction, *arguments) :
+        """TravailleurBase, function, ... -> Future
+        Demande l'exécution d'une fonction dans le thread du travailleur"""
+        futur = Future()
+        self.demandes.put((futur, fonction, arguments))
+        return futur
+
+
+    def arreter(self) :
+        """TravailleurBase -> None
+        Arrête le thread une fois les demandes déjà reçues exécutées"""
+        self.demandes.put(None)
+        self.thread.join()
+
+
+    def run(self) :
+        """TravailleurBase -> None
+        Exécute les demandes dans l'ordre où elles arrivent"""
+        while True :
+            try :
+                # Avec une durabilité groupée, le travailleur n'attend pas plus longtemps que le délai
+                # des opérations en attente : elles sont enregistrées dès qu'il n'a plus rien à faire
+                demande = self.demandes.get(timeout = base.delai_restant())
+            except queue.Empty :
+                base.vider_ecritures()
+                continue
+            if demande is None :
+                base.fermer()
+                return
+            futur, fonction, arguments = demande
+            # set_running_or_notify_cancel() renvoie False si la demande a été annulée entre-temps
+            if not futur.set_running_or_notify_cancel() :
+                continue
+            debut = time.perf_counter()
+            try :
+                futur.set_result(fonction(*arguments))
+            except Exception as erreur :
+                # Une requête qui échoue ne doit pas laisser de transaction ouverte
+                base.annuler()
+                futur.set_exception(erreur)
+            if mesures.actif :
+                mesures.observer(f"TravailleurBase.{getattr(fonction, '__qualname__', 'fonction')}", time.perf_counter() - debut)
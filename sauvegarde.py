@@ -0,0 +1,299 @@
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from noyau import base, chemin_archive, MIGRATIONS
+from instrumentation import mesures
+
+# Sauvegarde en ligne de la base de donnée, pendant que l'application s'en sert
+# Copier le fichier todolist.db pendant une écriture peut donner une copie déchirée (moitié avant, moitié
+# après l'écriture), et le copier en une seule fois bloquerait les autres threads. L'API de sauvegarde de
+# sqlite3 (Connection.backup) copie la base page par page : quelques pages par étape, depuis un thread
+# à part, avec une courte pause entre deux étapes pour laisser passer les requêtes de l'interface.
+# Chaque sauvegarde est un instantané daté à la microseconde (todolist-AAAAMMJJ-HHMMSS-UUUUUU.db, compressé
+# en .db.gz si demandé) ; seuls les plus récents sont gardés
+
+# Nombre de pages copiées par étape (4 Kio par page) et pause entre deux étapes (en s)
+PAGES_PAR_ETAPE = 256
+PAUSE_ETAPE = 0.005
+# Niveau de compression de gzip : le plus rapide, les pages de sqlite3 se compressent déjà bien
+NIVEAU_COMPRESSION = 1
+# Taille des morceaux lus et écrits pendant la compression (un fichier de plusieurs Go n'est jamais chargé en mémoire)
+TAILLE_MORCEAU = 1024 * 1024
+# Sauvegardes planifiées : intervalle par défaut (en s) et nombre d'instantanés gardés
+INTERVALLE = 3600
+INSTANTANES_GARDES = 24
+# Les microsecondes distinguent deux sauvegardes lancées dans la même seconde (sauvegarde planifiée et manuelle)
+FORMAT_HORODATAGE = "%Y%m%d-%H%M%S-%f"
+
+
+class RapportSauvegarde :
+    """Résultat d'une sauvegarde : fichiers écrits, pages copiées, étapes, taille et durée"""
+    def __init__(self) :
+        self.fichiers = []
+        self.pages = 0
+        self.etapes = 0
+        self.octets = 0
+        self.duree = 0.0
+        self.verifiee = False
+
+
+def copier_base(source, destination, pages_par_etape = PAGES_PAR_ETAPE, pause = PAUSE_ETAPE, progression = None) :
+    """str, str, int, float, function -> tuple
+    Copie la base "source" dans le fichier "destination" pendant que d'autres connexions s'en servent,
+    et renvoie le nombre de pages copiées et le nombre d'étapes
+    progression(copiees, total) est appelée après chaque étape, depuis le thread qui copie"""
+    connexion_source = sqlite3.connect(source, timeout = 10, isolation_level = None)
+    connexion_cible = sqlite3.connect(destination)
+    etapes = 0
+    pages = 0
+
+    def suivre(statut, restantes, total) :
+        """int, int, int -> None
+        Compte les étapes et transmet l'avancement"""
+        nonlocal etapes, pages
+        etapes += 1
+        pages = total
+        if progression is not None :
+            progression(total - restantes, total)
+
+    try :
+        # Une écriture faite par une autre connexion entre deux étapes ferait recommencer la copie depuis
+        # le début (et, si l'application écrit souvent, elle ne finirait jamais). Avec le journal WAL, une
+        # transaction de lecture ouverte pendant toute la copie fige la base telle qu'elle était au début :
+        # les autres connexions continuent d'écrire dans le journal, la copie reste cohérente
+        # (sans WAL, cette transaction empêcherait au contraire toute écriture jusqu'à la fin de la copie)
+        figee = connexion_source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if figee :
+            connexion_source.execute("BEGIN")
+            connexion_source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        # backup() relâche le GIL pendant chaque étape et pendant la pause : les autres threads avancent
+        connexion_source.backup(connexion_cible, pages = pages_par_etape, progress = suivre, sleep = pause)
+        if figee :
+            connexion_source.execute("COMMIT")
+        # La copie garde le journal WAL de la base : elle repasse en journal normal pour tenir dans un seul fichier
+        connexion_cible.execute("PRAGMA journal_mode = DELETE")
+    finally :
+        connexion_cible.close()
+        connexion_source.close()
+    return pages, etapes
+
+
+def compresser(chemin) :
+    """str -> str
+    Compresse un fichier avec gzip, morceau par morceau, supprime l'original et renvoie le chemin du fichier compressé"""
+    chemin_gz = chemin + ".gz"
+    with open(chemin, "rb") as entree, gzip.open(chemin_gz, "wb", compresslevel = NIVEAU_COMPRESSION) as sortie :
+        # La fonction copyfileobj() copie un fichier dans un autre par morceaux de taille fixe
+        shutil.copyfileobj(entree, sortie, TAILLE_MORCEAU)
+    os.remove(chemin)
+    return chemin_gz
+
+
+def decompresser(chemin_gz, destination) :
+    """str, str -> str
+    Décompresse un instantané .gz dans le fichier "destination" et renvoie ce chemin"""
+    with gzip.open(chemin_gz, "rb") as entree, open(destination, "wb") as sortie :
+        shutil.copyfileobj(entree, sortie, TAILLE_MORCEAU)
+    return destination
+
+
+def verifier_sauvegarde(chemin, complete = False) :
+    """str, bool -> bool
+    Vérifie qu'un instantané (compressé ou non) est une base sqlite3 intacte et à jour
+    quick_check vérifie la structure de chaque page ; integrity_check (complete = True) vérifie
+    aussi les index, mais peut prendre plusieurs minutes sur une grande base"""
+    if chemin.endswith(".gz") :
+        copie = decompresser(chemin, chemin[:-len(".gz")] + ".verification")
+        try :
+            return verifier_sauvegarde(copie, complete)
+        finally :
+            os.remove(copie)
+    # mode=ro : la vérification ne peut pas modifier l'instantané
+    connexion = sqlite3.connect(f"file:{chemin}?mode=ro", uri = True)
+    try :
+        verification = "integrity_check" if complete else "quick_check"
+        if connexion.execute(f"PRAGMA {verification}").fetchall() != [("ok",)] :
+            return False
+        # Une base d'archive n'a pas de version : seules les bases principales sont comparées aux migrations
+        if connexion.execute("SELECT 1 FROM sqlite_master WHERE name = 'taches'").fetchone() is not None :
+            return connexion.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+        return True
+    except sqlite3.DatabaseError :
+        return False
+    finally :
+        connexion.close()
+
+
+def racine_instantanes() :
+    """None -> str
+    Renvoie le début du nom des instantanés de la base de donnée utilisée (todolist pour todolist.db)"""
+    return os.path.splitext(os.path.basename(base.chemin))[0]
+
+
+def instantanes(dossier) :
+    """str -> list
+    Renvoie les chemins des instantanés de la base de donnée utilisée, du plus ancien au plus récent"""
+    if not os.path.isdir(dossier) :
+        return []
+    # Les instantanés écrits avant les microsecondes (AAAAMMJJ-HHMMSS) sont aussi reconnus
+    motif = re.compile(re.escape(racine_instantanes()) + r"-(\d{8}-\d{6})(-\d{6})?\.db(\.gz)?$")
+    horodatages = {}
+    for nom in os.listdir(dossier) :
+        correspondance = motif.match(nom)
+        if correspondance :
+            # L'horodatage AAAAMMJJ-HHMMSS-UUUUUU se trie comme du texte (un ancien nom compte pour 0 microseconde)
+            horodatages[nom] = correspondance.group(1) + (correspondance.group(2) or "-000000")
+    return [os.path.join(dossier, nom) for nom in sorted(horodatages, key = lambda nom : (horodatages[nom], nom))]
+
+
+def faire_tourner(dossier, garder = INSTANTANES_GARDES) :
+    """str, int -> list
+    Supprime les instantanés les plus anciens pour n'en garder que "garder", et renvoie les chemins supprimés"""
+    supprimes = []
+    for chemin in instantanes(dossier)[:-garder] if garder > 0 else instantanes(dossier) :
+        # L'archive d'un instantané porte le même nom suivi de -archive
+        dossier_instantane, nom = os.path.split(chemin)
+        # (le dernier ".db" du nom est celui de l'extension, ".db" ou ".db.gz")
+        fin_nom = nom.rindex(".db")
+        for fichier in (chemin, os.path.join(dossier_instantane, nom[:fin_nom] + "-archive" + nom[fin_nom:])) :
+            if os.path.exists(fichier) :
+                os.remove(fichier)
+                supprimes.append(fichier)
+    return supprimes
+
+
+def sauvegarder(dossier, compression = False, verification = True, pages_par_etape = PAGES_PAR_ETAPE, pause = PAUSE_ETAPE,
+                progression = None) :
+    """str, bool, bool, int, float, function -> RapportSauvegarde
+    Écrit un instantané de la base de donnée utilisée (et de sa base d'archive, si elle existe) dans "dossier"
+    Chaque fichier est d'abord écrit sous un nom provisoire (.partiel) puis renommé : un instantané présent
+    dans le dossier est toujours complet. Une vérification qui échoue lève une exception"""
+    if base.chemin == ":memory:" :
+        raise ValueError("Une base en mémoire ne peut pas être sauvegardée")
+    if not os.path.exists(base.chemin) :
+        raise FileNotFoundError(f"La base de donnée {base.chemin} n'existe pas")
+    os.makedirs(dossier, exist_ok = True)
+    rapport = RapportSauvegarde()
+    debut = time.perf_counter()
+    nom = f"{racine_instantanes()}-{datetime.now().strftime(FORMAT_HORODATAGE)}"
+    sources = [(base.chemin, nom + ".db")]
+    if os.path.exists(chemin_archive()) :
+        sources.append((chemin_archive(), nom + "-archive.db"))
+    # Un instantané existant n'est jamais remplacé
+    for source, nom_fichier in sources :
+        for fichier in (nom_fichier, nom_fichier + ".gz") :
+            if os.path.exists(os.path.join(dossier, fichier)) :
+                raise FileExistsError(f"L'instantané {os.path.join(dossier, fichier)} existe déjà")
+    for source, nom_fichier in sources :
+        provisoire = os.path.join(dossier, nom_fichier + ".partiel")
+        try :
+            pages, etapes = copier_base(source, provisoire, pages_par_etape, pause, progression)
+            # La copie est vérifiée avant d'être compressée : gzip garde ensuite un CRC du contenu,
+            # contrôlé à chaque décompression
+            if verification and not verifier_sauvegarde(provisoire) :
+                raise sqlite3.DatabaseError(f"L'instantané de {source} est endommagé")
+            if compression :
+                provisoire = compresser(provisoire)
+            chemin = os.path.join(dossier, nom_fichier + (".gz" if compression else ""))
+            # La fonction replace() renomme le fichier en une seule opération
+            os.replace(provisoire, chemin)
+        except BaseException :
+            for fichier in (provisoire, provisoire + ".gz") :
+                if os.path.exists(fichier) :
+                    os.remove(fichier)
+            raise
+        rapport.fichiers.append(chemin)
+        rapport.pages += pages
+        rapport.etapes += etapes
+        rapport.octets += os.path.getsize(chemin)
+    rapport.verifiee = verification
+    rapport.duree = time.perf_counter() - debut
+    if mesures.actif :
+        mesures.observer("sauvegarde.sauvegarder", rapport.duree)
+    return rapport
+
+
+class SauvegardesPlanifiees :
+    """Écrit un instantané de la base de donnée à intervalle régulier, depuis un thread dédié,
+    et ne garde que les plus récents
+    Le résultat de la dernière sauvegarde (rapport ou erreur) reste lisible dans "dernier_rapport"
+    et "derniere_erreur" : une sauvegarde qui échoue n'arrête pas les suivantes"""
+    def __init__(self, dossier, intervalle = INTERVALLE, garder = INSTANTANES_GARDES, compression = True, verification = True,
+                 progression = None) :
+        self.dossier = dossier
+        self.intervalle = intervalle
+        self.garder = garder
+        self.compression = compression
+        self.verification = verification
+        self.progression = progression
+        self.dernier_rapport = None
+        self.derniere_erreur = None
+        # set() réveille le thread : pour s'arrêter, ou pour sauvegarder tout de suite
+        self.reveil = threading.Event()
+        self.actif = True
+        self.thread = threading.Thread(target = self.run, daemon = True)
+
+
+    def demarrer(self) :
+        """SauvegardesPlanifiees -> SauvegardesPlanifiees
+        Démarre le thread des sauvegardes (la première est faite tout de suite)"""
+        self.thread.start()
+        return self
+
+
+    def sauvegarder_maintenant(self) :
+        """SauvegardesPlanifiees -> None
+        Demande une sauvegarde sans attendre la fin de l'intervalle"""
+        self.reveil.set()
+
+
+    def arreter(self) :
+        """SauvegardesPlanifiees -> None
+        Arrête le thread, après la fin de la sauvegarde en cours"""
+        self.actif = False
+        self.reveil.set()
+        self.thread.join()
+
+
+    def run(self) :
+        """SauvegardesPlanifiees -> None
+        Sauvegarde, fait tourner les instantanés, puis attend l'intervalle suivant"""
+        while self.actif :
+            try :
+                self.dernier_rapport = sauvegarder(self.dossier, self.compression, self.verification, progression = self.progression)
+                faire_tourner(self.dossier, self.garder)
+                self.derniere_erreur = None
+            except Exception as erreur :
+                self.derniere_erreur = erreur
+            self.reveil.wait(self.intervalle)
+            self.reveil.clear()
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Écrit un instantané de la base de donnée pendant qu'elle est utilisée")
+    analyseur.add_argument("dossier", help = "dossier des instantanés")
+    analyseur.add_argument("--compression", action = "store_true", help = "compresse les instantanés avec gzip")
+    analyseur.add_argument("--garder", type = int, default = INSTANTANES_GARDES, help = "nombre d'instantanés gardés")
+    analyseur.add_argument("--sans-verification", action = "store_true", help = "ne vérifie pas l'instantané écrit")
+    analyseur.add_argument("--pages", type = int, default = PAGES_PAR_ETAPE, help = "nombre de pages copiées par étape")
+    arguments = analyseur.parse_args()
+
+    def afficher(copiees, total) :
+        """int, int -> None
+        Affiche l'avancement de la copie sur une seule ligne"""
+        print(f"\r{copiees}/{total} pages ({100 * copiees // max(total, 1)} %)", end = "", flush = True)
+
+    rapport = sauvegarder(arguments.dossier, arguments.compression, not arguments.sans_verification, arguments.pages,
+                          progression = afficher)
+    supprimes = faire_tourner(arguments.dossier, arguments.garder)
+    print()
+    for chemin in rapport.fichiers :
+        print(f"{chemin} ({os.path.getsize(chemin) / 1e6:.1f} Mo)")
+    print(f"{rapport.pages} pages en {rapport.etapes} étapes, {rapport.duree:.2f} s"
+          f"{', vérifié' if rapport.verifiee else ''} ; {len(supprimes)} anciens fichiers supprimés")
@@ -0,0 +1,390 @@
+import argparse
+import asyncio
+import json
+import queue
+import re
+import secrets
+import sqlite3
+import time
+import urllib.parse
+from noyau import (
+    nouveau_compte, se_connecter, obtenir_id_utilisateur, ajouter_tache, obtenir_taches,
+    marquer_tache_complete, supprimer_tache, proprietaire_tache, COLONNES_TACHES, TravailleurBase, base
+)
+from instrumentation import mesures
+
+# Serveur HTTP/JSON qui donne accès aux tâches à plusieurs clients en même temps (sans interface graphique)
+# La boucle asyncio gère les connexions ; les requêtes SQLite, bloquantes, sont confiées à des
+# travailleurs (voir TravailleurBase) : un seul pour les écritures, pour que SQLite n'ait jamais
+# deux écrivains en concurrence, et quelques-uns pour les lectures, qui profitent du journal WAL pour lire en parallèle.
+# Avec une durabilité groupée (MYTASKMATE_DURABILITE=groupe), les écritures arrivées pendant qu'une autre
+# s'exécutait sont enregistrées ensemble, et leurs clients ne reçoivent leur réponse qu'une fois le lot enregistré.
+# Au-delà d'un nombre de requêtes en cours, le serveur répond 503 tout de suite au lieu d'allonger la file d'attente
+#
+# POST   /comptes               {"identifiant", "mot_de_passe"}                  crée un compte
+# POST   /sessions              {"identifiant", "mot_de_passe"}  -> {"jeton"}    ouvre une session
+# DELETE /sessions                                                               ferme la session
+# GET    /taches                                               -> [tâche, ...]
+# POST   /taches                {"tache", "description", "echeance", "priorite"} -> {"tache_id"}
+# POST   /taches/<id>/completee                                                  marque une tâche complétée
+# DELETE /taches/<id>                                          -> {"supprimees"}
+# Sauf pour /comptes et POST /sessions, le jeton est envoyé dans l'en-tête "Authorization: Bearer <jeton>"
+
+# Durée (en s) d'une session sans requête avant qu'elle expire
+DUREE_SESSION = 3600
+# Taille maximum du corps d'une requête (en octets)
+TAILLE_MAX_CORPS = 64 * 1024
+RAISONS = {200 : "OK", 201 : "Created", 204 : "No Content", 400 : "Bad Request", 401 : "Unauthorized", 404 : "Not Found",
+           405 : "Method Not Allowed", 409 : "Conflict", 413 : "Payload Too Large", 500 : "Internal Server Error", 503 : "Service Unavailable"}
+CHAMPS_TACHE = COLONNES_TACHES.split(", ")
+
+
+class ErreurHttp(Exception) :
+    """Erreur renvoyée au client avec un code HTTP"""
+    def __init__(self, statut, message, entetes = None) :
+        super().__init__(message)
+        self.statut = statut
+        self.entetes = entetes or {}
+
+
+class Session :
+    """Utilisateur connecté, retrouvé grâce à son jeton sans revérifier son mot de passe"""
+    def __init__(self, id_utilisateur, identifiant) :
+        self.id_utilisateur = id_utilisateur
+        self.identifiant = identifiant
+        self.expiration = time.monotonic() + DUREE_SESSION
+
+
+def identifier(identifiant, mot_de_passe) :
+    """str, str -> int
+    Renvoie l'identifiant numérique de l'utilisateur si le mot de passe est correct, sinon None"""
+    if not se_connecter(identifiant, mot_de_passe) :
+        return None
+    return obtenir_id_utilisateur(identifiant)
+
+
+def tache_en_dict(tache) :
+    """Tache -> dict
+    Convertit une tâche de la base de donnée en objet JSON"""
+    donnees = dict(zip(CHAMPS_TACHE, tache))
+    donnees["est_completee"] = bool(donnees["est_completee"])
+    return donnees
+
+
+def pour_proprietaire(id_utilisateur, id_tache, fonction) :
+    """int, int, function -> object
+    Exécute fonction(id_tache) si la tâche appartient à l'utilisateur, sinon lève une ErreurHttp 404
+    La vérification et l'opération se font dans le même thread, l'une juste après l'autre"""
+    if proprietaire_tache(id_tache) != id_utilisateur :
+        raise ErreurHttp(404, f"La tâche {id_tache} n'existe pas")
+    return fonction(id_tache)
+
+
+def champs(donnees, *noms) :
+    """dict, str... -> list
+    Renvoie les valeurs des champs demandés, et lève une ErreurHttp 400 s'il en manque un"""
+    if not isinstance(donnees, dict) :
+        raise ErreurHttp(400, "Un objet JSON est attendu")
+    manquants = [nom for nom in noms if not isinstance(donnees.get(nom), str)]
+    if manquants :
+        raise ErreurHttp(400, f"Champs manquants : {', '.join(manquants)}")
+    return [donnees[nom] for nom in noms]
+
+
+class EcrivainGroupe(TravailleurBase) :
+    """Travailleur qui exécute les écritures par lots : toutes les demandes en attente sont exécutées,
+    puis enregistrées en une seule fois, et seulement ensuite leurs résultats sont rendus.
+    Un client qui a reçu sa réponse retrouve donc toujours son écriture en lisant dans un autre thread"""
+    # Nombre maximum de demandes par lot
+    TAILLE_LOT = 100
+
+    def run(self) :
+        """EcrivainGroupe -> None
+        Exécute les demandes par lots, dans l'ordre où elles arrivent"""
+        while True :
+            lot = [self.demandes.get()]
+            # Les demandes arrivées pendant le lot précédent forment le lot suivant
+            while len(lot) < self.TAILLE_LOT and lot[-1] is not None :
+                try :
+                    lot.append(self.demandes.get_nowait())
+                except queue.Empty :
+                    break
+            resultats = []
+            for demande in lot :
+                if demande is None :
+                    continue
+                futur, fonction, arguments = demande
+                if not futur.set_running_or_notify_cancel() :
+                    continue
+                try :
+                    resultats.append((futur, fonction(*arguments)))
+                except Exception as erreur :
+                    # Seule l'opération qui a échoué est annulée, les autres opérations du lot sont gardées
+                    base.annuler()
+                    futur.set_exception(erreur)
+            base.vider_ecritures()
+            mesures.compter("api.lots_ecritures")
+            for futur, resultat in resultats :
+                futur.set_result(resultat)
+            if lot[-1] is None :
+                base.fermer()
+                return
+
+
+class ServeurApi :
+    """Répond aux requêtes HTTP des clients en confiant le travail sur la base aux travailleurs"""
+    def __init__(self, lecteurs = 4, limite = 64) :
+        self.ecrivain = EcrivainGroupe()
+        self.lecteurs = [TravailleurBase() for _ in range(lecteurs)]
+        # Nombre maximum de requêtes confiées aux travailleurs en même temps
+        self.limite = limite
+        self.en_cours = 0
+        self.sessions = {}
+        # Méthode, expression de l'adresse et fonction qui répond
+        self.routes = [
+            ("POST", re.compile(r"^/comptes$"), self.creer_compte),
+            ("POST", re.compile(r"^/sessions$"), self.ouvrir_session),
+            ("DELETE", re.compile(r"^/sessions$"), self.fermer_session),
+            ("GET", re.compile(r"^/taches$"), self.lister_taches),
+            ("POST", re.compile(r"^/taches$"), self.creer_tache),
+            ("POST", re.compile(r"^/taches/(\d+)/completee$"), self.completer_tache),
+            ("DELETE", re.compile(r"^/taches/(\d+)$"), self.effacer_tache),
+        ]
+
+
+    def demarrer(self) :
+        """ServeurApi -> ServeurApi
+        Démarre les travailleurs"""
+        self.ecrivain.demarrer()
+        for lecteur in self.lecteurs :
+            lecteur.demarrer()
+        return self
+
+
+    def arreter(self) :
+        """ServeurApi -> None
+        Arrête les travailleurs une fois leurs demandes exécutées (les écritures en attente sont enregistrées)"""
+        for travailleur in [self.ecrivain] + self.lecteurs :
+            travailleur.arreter()
+
+
+    async def executer(self, ecriture, fonction, *arguments) :
+        """ServeurApi, bool, function, ... -> object
+        Exécute une fonction dans un travailleur et attend son résultat sans bloquer la boucle"""
+        if self.en_cours >= self.limite :
+            # Le client est prié de réessayer plus tard plutôt que d'attendre derrière une file qui grandit
+            mesures.compter("api.refusees")
+            raise ErreurHttp(503, "Serveur surchargé", {"Retry-After" : "1"})
+        if ecriture :
+            travailleur = self.ecrivain
+        else :
+            # Le lecteur qui a le moins de demandes en attente
+            travailleur = min(self.lecteurs, key = lambda lecteur : lecteur.demandes.qsize())
+        self.en_cours += 1
+        try :
+            # La fonction wrap_future() permet d'attendre avec "await" le Future renvoyé par le travailleur
+            return await asyncio.wrap_future(travailleur.soumettre(fonction, *arguments))
+        finally :
+            self.en_cours -= 1
+
+
+    def session(self, entetes) :
+        """ServeurApi, dict -> Session
+        Renvoie la session désignée par le jeton de la requête, et prolonge sa durée"""
+        autorisation = entetes.get("authorization", "")
+        session = self.sessions.get(autorisation[len("Bearer "):]) if autorisation.startswith("Bearer ") else None
+        maintenant = time.monotonic()
+        if session is None or session.expiration < maintenant :
+            raise ErreurHttp(401, "Session absente ou expirée")
+        session.expiration = maintenant + DUREE_SESSION
+        return session
+
+
+    def purger_sessions(self) :
+        """ServeurApi -> None
+        Oublie les sessions expirées"""
+        maintenant = time.monotonic()
+        for jeton in [jeton for jeton, session in self.sessions.items() if session.expiration < maintenant] :
+            del self.sessions[jeton]
+
+
+    async def creer_compte(self, entetes, donnees) :
+        """ServeurApi, dict, dict -> int, object
+        Crée un compte (409 si l'identifiant est déjà utilisé)"""
+        identifiant, mot_de_passe = champs(donnees, "identifiant", "mot_de_passe")
+        if not await self.executer(True, nouveau_compte, identifiant, mot_de_passe) :
+            raise ErreurHttp(409, f"L'identifiant {identifiant} est déjà utilisé")
+        return 201, None
+
+
+    async def ouvrir_session(self, entetes, donnees) :
+        """ServeurApi, dict, dict -> int, object
+        Vérifie le mot de passe une seule fois et renvoie le jeton de la nouvelle session"""
+        identifiant, mot_de_passe = champs(donnees, "identifiant", "mot_de_passe")
+        id_utilisateur = await self.executer(False, identifier, identifiant, mot_de_passe)
+        if id_utilisateur is None :
+            raise ErreurHttp(401, "Identifiant ou mot de passe incorrect")
+        # La fonction token_urlsafe() génère un jeton aléatoire impossible à deviner
+        jeton = secrets.token_urlsafe(24)
+        self.sessions[jeton] = Session(id_utilisateur, identifiant)
+        return 201, {"jeton" : jeton}
+
+
+    async def fermer_session(self, entetes, donnees) :
+        """ServeurApi, dict, dict -> int, object
+        Ferme la session de la requête"""
+        self.session(entetes)
+        del self.sessions[entetes["authorization"][len("Bearer "):]]
+        return 204, None
+
+
+    async def lister_taches(self, entetes, donnees) :
+        """ServeurApi, dict, dict -> int, object
+        Renvoie les tâches de l'utilisateur connecté"""
+        session = self.session(entetes)
+        taches = await self.executer(False, obtenir_taches, session.id_utilisateur)
+        return 200, [tache_en_dict(tache) for tache in taches]
+
+
+    async def creer_tache(self, entetes, donnees) :
+        """ServeurApi, dict, dict -> int, object
+        Ajoute une tâche à l'utilisateur connecté (échéance au format JJ-MM-AAAA)"""
+        session = self.session(entetes)
+        nom, description, echeance, priorite = champs(donnees, "tache", "description", "echeance", "priorite")
+        try :
+            tache_id = await self.executer(True, ajouter_tache, session.id_utilisateur, nom, description, echeance, priorite)
+        # Date invalide (ValueError) ou priorité inconnue (refusée par la contrainte CHECK)
+        except (ValueError, sqlite3.IntegrityError) as erreur :
+            raise ErreurHttp(400, str(erreur))
+        return 201, {"tache_id" : tache_id}
+
+
+    async def completer_tache(self, entetes, donnees, id_tache) :
+        """ServeurApi, dict, dict, str -> int, object
+        Marque une tâche de l'utilisateur connecté comme complétée"""
+        session = self.session(entetes)
+        await self.executer(True, pour_proprietaire, session.id_utilisateur, int(id_tache), marquer_tache_complete)
+        return 204, None
+
+
+    async def effacer_tache(self, entetes, donnees, id_tache) :
+        """ServeurApi, dict, dict, str -> int, object
+        Supprime une tâche de l'utilisateur connecté et ses sous-tâches"""
+        session = self.session(entetes)
+        supprimees = await self.executer(True, pour_proprietaire, session.id_utilisateur, int(id_tache), supprimer_tache)
+        return 200, {"supprimees" : supprimees}
+
+
+    async def traiter(self, methode, chemin, entetes, corps) :
+        """ServeurApi, str, str, dict, bytes -> int, object, dict
+        Appelle la fonction qui correspond à la requête et renvoie le code, les données et les en-têtes de la réponse"""
+        debut = time.perf_counter()
+        adresse = urllib.parse.urlsplit(chemin).path
+        nom = "inconnue"
+        try :
+            methodes = []
+            for methode_route, expression, fonction in self.routes :
+                correspondance = expression.match(adresse)
+                if correspondance is None :
+                    continue
+                methodes.append(methode_route)
+                if methode_route == methode :
+                    nom = fonction.__name__
+                    try :
+                        donnees = json.loads(corps) if corps else None
+                    except ValueError :
+                        raise ErreurHttp(400, "Corps JSON invalide")
+                    statut, reponse = await fonction(entetes, donnees, *correspondance.groups())
+                    return statut, reponse, {}
+            if methodes :
+                raise ErreurHttp(405, f"Méthode {methode} non permise", {"Allow" : ", ".join(methodes)})
+            raise ErreurHttp(404, f"Adresse inconnue : {adresse}")
+        except ErreurHttp as erreur :
+            return erreur.statut, {"erreur" : str(erreur)}, erreur.entetes
+        except Exception as erreur :
+            # Une erreur inattendue ne doit pas couper la connexion sans réponse
+            return 500, {"erreur" : str(erreur)}, {}
+        finally :
+            if mesures.actif :
+                mesures.observer(f"api.{nom}", time.perf_counter() - debut)
+
+
+    def repondre(self, flux, statut, donnees, entetes, garder) :
+        """ServeurApi, asyncio.StreamWriter, int, object, dict, bool -> None
+        Écrit une réponse HTTP/1.1 sur la connexion"""
+        corps = b"" if donnees is None else json.dumps(donnees, separators = (",", ":")).encode("utf-8")
+        lignes = [f"HTTP/1.1 {statut} {RAISONS[statut]}", f"Content-Length: {len(corps)}",
+                  f"Connection: {'keep-alive' if garder else 'close'}"]
+        if corps :
+            lignes.append("Content-Type: application/json")
+        lignes += [f"{nom}: {valeur}" for nom, valeur in entetes.items()]
+        flux.write(("\r\n".join(lignes) + "\r\n\r\n").encode("latin-1") + corps)
+
+
+    async def connexion_client(self, lecteur, flux) :
+        """ServeurApi, asyncio.StreamReader, asyncio.StreamWriter -> None
+        Lit les requêtes d'une connexion, une par une, tant que le client la garde ouverte"""
+        try :
+            while True :
+                ligne = await lecteur.readline()
+                if not ligne :
+                    return
+                entetes = {}
+                while True :
+                    entete = await lecteur.readline()
+                    if entete in (b"\r\n", b"\n", b"") :
+                        break
+                    nom, _, valeur = entete.decode("latin-1").partition(":")
+                    entetes[nom.strip().lower()] = valeur.strip()
+                try :
+                    methode, chemin, version = ligne.decode("latin-1").split()
+                    longueur = int(entetes.get("content-length", 0))
+                except ValueError :
+                    self.repondre(flux, 400, {"erreur" : "Requête invalide"}, {}, False)
+                    return
+                if longueur > TAILLE_MAX_CORPS :
+                    self.repondre(flux, 413, {"erreur" : "Corps trop grand"}, {}, False)
+                    return
+                corps = await lecteur.readexactly(longueur) if longueur else b""
+                statut, donnees, supplementaires = await self.traiter(methode, chemin, entetes, corps)
+                garder = version == "HTTP/1.1" and entetes.get("connection", "").lower() != "close"
+                self.repondre(flux, statut, donnees, supplementaires, garder)
+                # La fonction drain() attend que le client ait lu la réponse si le tampon d'envoi est plein
+                await flux.drain()
+                if not garder :
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError) :
+            pass
+        finally :
+            flux.close()
+
+
+    async def servir(self, hote = "127.0.0.1", port = 8080, pret = None) :
+        """ServeurApi, str, int, function -> None
+        Écoute les connexions jusqu'à l'annulation de la tâche asyncio
+        pret(port) est appelée une fois le serveur à l'écoute (port 0 : un port libre est choisi)"""
+        serveur = await asyncio.start_server(self.connexion_client, hote, port)
+        if pret is not None :
+            pret(serveur.sockets[0].getsockname()[1])
+        async with serveur :
+            while True :
+                await asyncio.sleep(60)
+                self.purger_sessions()
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Serveur HTTP/JSON de MyTaskMate")
+    analyseur.add_argument("--hote", default = "127.0.0.1", help = "adresse d'écoute")
+    analyseur.add_argument("--port", type = int, default = 8080, help = "port d'écoute (0 : un port libre)")
+    analyseur.add_argument("--lecteurs", type = int, default = 4, help = "nombre de threads de lecture")
+    analyseur.add_argument("--limite", type = int, default = 64, help = "nombre maximum de requêtes en cours avant de répondre 503")
+    arguments = analyseur.parse_args()
+
+    api = ServeurApi(arguments.lecteurs, arguments.limite).demarrer()
+    try :
+        asyncio.run(api.servir(arguments.hote, arguments.port,
+                               lambda port : print(f"Serveur MyTaskMate sur http://{arguments.hote}:{port}", flush = True)))
+    except KeyboardInterrupt :
+        pass
+    finally :
+        api.arreter()
@@ -0,0 +1,138 @@
+import argparse
+import bisect
+import gzip
+import json
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from synchronisation import cle_enregistrement
+
+# Serveur de synchronisation local, qui remplace le service en ligne pendant le développement et les tests
+# Les tâches de chaque compte sont gardées en mémoire. Chaque modification acceptée reçoit un numéro
+# de séquence croissant : un client qui donne le dernier numéro reçu n'obtient que les modifications suivantes
+
+ADRESSE_MODIFICATIONS = re.compile(r"^/comptes/([^/]+)/modifications$")
+
+
+class Compte :
+    """Tâches d'un compte sur le serveur, avec l'historique des modifications dans l'ordre de leur arrivée"""
+    def __init__(self) :
+        # uid -> dernière version acceptée de la tâche (ou de sa suppression)
+        self.enregistrements = {}
+        # (séquence, uid) dans l'ordre croissant des séquences
+        self.historique = []
+        self.sequence = 0
+
+
+    def recevoir(self, modifications) :
+        """Compte, list -> list
+        Accepte les modifications qui l'emportent sur la version du serveur, et renvoie la version
+        du serveur pour chaque modification refusée (le client doit l'appliquer)"""
+        conflits = []
+        for modification in modifications :
+            actuel = self.enregistrements.get(modification["uid"])
+            if actuel is not None and cle_enregistrement(modification) <= cle_enregistrement(actuel) :
+                conflits.append({cle : valeur for cle, valeur in actuel.items() if cle != "sequence"})
+                continue
+            self.sequence += 1
+            self.enregistrements[modification["uid"]] = dict(modification, sequence = self.sequence)
+            self.historique.append((self.sequence, modification["uid"]))
+        return conflits
+
+
+    def modifications_depuis(self, depuis, appareil, limite) :
+        """Compte, int, str, int -> list, int, bool
+        Renvoie les modifications acceptées après la séquence "depuis" (sauf celles de l'appareil qui les
+        demande, qui les a déjà), la séquence à redonner la prochaine fois, et s'il en reste d'autres"""
+        # La fonction bisect() trouve le début des nouvelles modifications sans parcourir tout l'historique
+        position = bisect.bisect_left(self.historique, (depuis + 1,))
+        modifications = []
+        curseur = depuis
+        for sequence, uid in self.historique[position:] :
+            if len(modifications) >= limite :
+                return modifications, curseur, True
+            curseur = sequence
+            enregistrement = self.enregistrements[uid]
+            # Une entrée dépassée par une modification plus récente de la même tâche est ignorée
+            if enregistrement["sequence"] != sequence or enregistrement["appareil"] == appareil :
+                continue
+            modifications.append({cle : valeur for cle, valeur in enregistrement.items() if cle != "sequence"})
+        return modifications, curseur, False
+
+
+class GestionnaireSynchronisation(BaseHTTPRequestHandler) :
+    """Répond aux requêtes des clients de synchronisation"""
+    def compte(self) :
+        """GestionnaireSynchronisation -> Compte
+        Renvoie le compte désigné par l'adresse de la requête (None si l'adresse est inconnue)"""
+        correspondance = ADRESSE_MODIFICATIONS.match(urllib.parse.urlsplit(self.path).path)
+        if correspondance is None :
+            self.send_error(404)
+            return None
+        identifiant = urllib.parse.unquote(correspondance.group(1))
+        return self.server.comptes.setdefault(identifiant, Compte())
+
+
+    def repondre(self, donnees) :
+        """GestionnaireSynchronisation, dict -> None
+        Envoie une réponse JSON, compressée si le client l'accepte"""
+        corps = json.dumps(donnees, separators = (",", ":")).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in self.headers.get("Accept-Encoding", "") :
+            corps = gzip.compress(corps)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+
+    def do_GET(self) :
+        with self.server.verrou :
+            compte = self.compte()
+            if compte is None :
+                return
+            parametres = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            modifications, curseur, suite = compte.modifications_depuis(int(parametres.get("depuis", ["0"])[0]),
+                                                                       parametres.get("appareil", [""])[0],
+                                                                       int(parametres.get("limite", ["500"])[0]))
+        self.repondre({"modifications" : modifications, "curseur" : curseur, "suite" : suite})
+
+
+    def do_POST(self) :
+        corps = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.headers.get("Content-Encoding") == "gzip" :
+            corps = gzip.decompress(corps)
+        donnees = json.loads(corps)
+        with self.server.verrou :
+            compte = self.compte()
+            if compte is None :
+                return
+            conflits = compte.recevoir(donnees["modifications"])
+        self.repondre({"conflits" : conflits})
+
+
+    def log_message(self, format, *arguments) :
+        # Le serveur ne note pas chaque requête dans la console
+        pass
+
+
+def creer_serveur(hote = "127.0.0.1", port = 8765) :
+    """str, int -> ThreadingHTTPServer
+    Crée le serveur de synchronisation (port 0 : un port libre est choisi), sans le démarrer"""
+    serveur = ThreadingHTTPServer((hote, port), GestionnaireSynchronisation)
+    serveur.comptes = {}
+    serveur.verrou = threading.Lock()
+    return serveur
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Serveur de synchronisation local (les tâches sont gardées en mémoire)")
+    analyseur.add_argument("--hote", default = "127.0.0.1", help = "adresse d'écoute")
+    analyseur.add_argument("--port", type = int, default = 8765, help = "port d'écoute")
+    arguments = analyseur.parse_args()
+
+    serveur = creer_serveur(arguments.hote, arguments.port)
+    print(f"Serveur de synchronisation sur http://{arguments.hote}:{serveur.server_address[1]}")
+    serveur.serve_forever()
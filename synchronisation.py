@@ -0,0 +1,240 @@
+import argparse
+import gzip
+import json
+import time
+import urllib.parse
+import urllib.request
+from noyau import base, obtenir_id_utilisateur, attacher_archive, SQL_SUPPRIMER_TACHE
+
+# Synchronisation des tâches avec un serveur (voir serveur_synchronisation.py)
+# Seules les modifications faites depuis la dernière synchronisation sont échangées :
+# les modifications locales sont lues dans le journal rempli par les déclencheurs de la table taches,
+# celles du serveur sont demandées à partir du dernier curseur reçu.
+# Un conflit (la même tâche modifiée des deux côtés) est toujours tranché de la même façon :
+# la version la plus haute l'emporte, puis la date de modification, puis l'identifiant de l'appareil
+
+# Nombre de modifications par requête (chaque requête est compressée avec gzip)
+TAILLE_LOT = 500
+
+SQL_JOURNAL = """SELECT numero, uid, supprimee, version, modifie_le, appareil FROM journal_modifications
+WHERE utilisateur_id = ? ORDER BY numero LIMIT ?"""
+SQL_VIDER_JOURNAL = "DELETE FROM journal_modifications WHERE utilisateur_id = ? AND numero <= ?"
+SQL_ETAT_TACHE = """SELECT t.tache_id, t.version, t.modifie_le, t.appareil, t.tache, t.description, t.echeance,
+       t.est_completee, t.priorite, p.uid
+FROM taches t LEFT JOIN taches p ON p.tache_id = t.parent_id WHERE t.uid = ?"""
+# Une tâche archivée (voir archiver_taches dans noyau.py) existe toujours pour les autres appareils
+SQL_ETAT_ARCHIVEE = """SELECT t.tache_id, t.version, t.modifie_le, t.appareil, t.tache, t.description, t.echeance,
+       t.est_completee, t.priorite, p.uid
+FROM archive.taches_archivees t LEFT JOIN archive.taches_archivees p ON p.tache_id = t.parent_id WHERE t.uid = ?"""
+SQL_RETIRER_ARCHIVEE = "DELETE FROM archive.taches_archivees WHERE tache_id = ?"
+SQL_SUPPRESSION_EN_ATTENTE = """SELECT version, modifie_le, appareil FROM journal_modifications
+WHERE uid = ? AND supprimee = 1 ORDER BY numero DESC LIMIT 1"""
+SQL_ID_PAR_UID = "SELECT tache_id FROM taches WHERE uid = ?"
+SQL_INSERER_DISTANTE = """INSERT INTO taches (utilisateur_id, tache, description, echeance, est_completee, priorite, parent_id,
+                    uid, version, modifie_le, appareil) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+SQL_MODIFIER_DISTANTE = """UPDATE taches SET tache = ?, description = ?, echeance = ?, est_completee = ?, priorite = ?, parent_id = ?,
+                    version = ?, modifie_le = ?, appareil = ? WHERE tache_id = ?"""
+# Comme supprimer_tache : la suppression d'une tâche emporte toute sa branche de sous-tâches
+SQL_SUPPRIMER_DISTANTE = SQL_SUPPRIMER_TACHE
+# Sous-tâches reçues avant leur parente (voir _migration_parents_attendus dans noyau.py)
+SQL_ATTENDRE_PARENT = """INSERT INTO parents_attendus (uid, parent_uid) VALUES (?, ?)
+ON CONFLICT (uid) DO UPDATE SET parent_uid = excluded.parent_uid"""
+SQL_OUBLIER_PARENT = "DELETE FROM parents_attendus WHERE uid = ?"
+SQL_RATTACHER_ENFANTS = """UPDATE taches SET parent_id = ?
+WHERE uid IN (SELECT uid FROM parents_attendus WHERE parent_uid = ?)"""
+SQL_OUBLIER_ENFANTS = "DELETE FROM parents_attendus WHERE parent_uid = ?"
+SQL_CURSEUR = "SELECT curseur FROM curseurs_synchronisation WHERE utilisateur_id = ?"
+SQL_ENREGISTRER_CURSEUR = """INSERT INTO curseurs_synchronisation (utilisateur_id, curseur) VALUES (?, ?)
+ON CONFLICT (utilisateur_id) DO UPDATE SET curseur = excluded.curseur"""
+
+
+class RapportSynchronisation :
+    """Résultat d'une synchronisation : modifications envoyées, reçues et appliquées, conflits et volume échangé"""
+    def __init__(self) :
+        self.envoyees = 0
+        self.recues = 0
+        self.appliquees = 0
+        self.conflits = 0
+        self.requetes = 0
+        self.octets_envoyes = 0
+        self.octets_recus = 0
+        self.duree = 0.0
+
+
+def cle_conflit(version, modifie_le, appareil) :
+    """int, str, str -> tuple
+    Renvoie la clé qui ordonne deux versions d'une même tâche : la plus grande l'emporte"""
+    return (version or 0, modifie_le or "", appareil or "")
+
+
+def cle_enregistrement(enregistrement) :
+    """dict -> tuple
+    Renvoie la clé de conflit d'une modification échangée avec le serveur"""
+    return cle_conflit(enregistrement["version"], enregistrement["modifie_le"], enregistrement["appareil"])
+
+
+def requete(adresse, rapport, donnees = None) :
+    """str, RapportSynchronisation, dict -> dict
+    Envoie une requête JSON compressée au serveur (POST si des données sont envoyées, sinon GET) et renvoie sa réponse"""
+    entetes = {"Accept-Encoding" : "gzip"}
+    corps = None
+    if donnees is not None :
+        corps = gzip.compress(json.dumps(donnees, separators = (",", ":")).encode("utf-8"))
+        entetes.update({"Content-Type" : "application/json", "Content-Encoding" : "gzip"})
+        rapport.octets_envoyes += len(corps)
+    with urllib.request.urlopen(urllib.request.Request(adresse, data = corps, headers = entetes), timeout = 30) as reponse :
+        contenu = reponse.read()
+        rapport.requetes += 1
+        rapport.octets_recus += len(contenu)
+        if reponse.headers.get("Content-Encoding") == "gzip" :
+            contenu = gzip.decompress(contenu)
+    return json.loads(contenu)
+
+
+def lire_modification(connexion, uid, entree) :
+    """sqlite3.Connection, str, tuple -> dict
+    Renvoie l'état actuel d'une tâche modifiée localement, ou sa suppression, à envoyer au serveur"""
+    # Une tâche archivée avant d'avoir été envoyée est lue dans la base d'archive
+    ligne = connexion.execute(SQL_ETAT_TACHE, (uid,)).fetchone() or connexion.execute(SQL_ETAT_ARCHIVEE, (uid,)).fetchone()
+    if ligne is not None :
+        tache_id, version, modifie_le, appareil, tache, description, echeance, est_completee, priorite, parent_uid = ligne
+        return {"uid" : uid, "version" : version, "modifie_le" : modifie_le, "appareil" : appareil,
+                "donnees" : {"tache" : tache, "description" : description, "echeance" : echeance,
+                             "est_completee" : bool(est_completee), "priorite" : priorite, "parent_uid" : parent_uid}}
+    numero, uid, supprimee, version, modifie_le, appareil = entree
+    if supprimee :
+        return {"uid" : uid, "version" : version, "modifie_le" : modifie_le, "appareil" : appareil, "donnees" : None}
+    # La tâche a été supprimée après cette entrée : c'est une entrée suivante du journal qui l'enverra
+    return None
+
+
+def appliquer(connexion, id_utilisateur, enregistrement) :
+    """sqlite3.Connection, int, dict -> bool
+    Applique une modification reçue du serveur si elle l'emporte sur l'état local, et renvoie True si elle a été appliquée
+    Une tâche archivée modifiée sur un autre appareil revient parmi les tâches (avec un nouveau tache_id)
+    Doit être appelée pendant que l'indicateur "application" de la table synchronisation est levé"""
+    ligne = connexion.execute(SQL_ETAT_TACHE, (enregistrement["uid"],)).fetchone()
+    archivee = connexion.execute(SQL_ETAT_ARCHIVEE, (enregistrement["uid"],)).fetchone() if ligne is None else None
+    if archivee is not None :
+        if cle_enregistrement(enregistrement) <= cle_conflit(*archivee[1:4]) :
+            return False
+        connexion.execute(SQL_RETIRER_ARCHIVEE, (archivee[0],))
+        if enregistrement["donnees"] is None :
+            return True
+    elif ligne is None :
+        # Une suppression locale pas encore envoyée compte comme une version locale
+        suppression = connexion.execute(SQL_SUPPRESSION_EN_ATTENTE, (enregistrement["uid"],)).fetchone()
+        if enregistrement["donnees"] is None or (suppression is not None and cle_enregistrement(enregistrement) <= cle_conflit(*suppression)) :
+            return False
+    elif cle_enregistrement(enregistrement) <= cle_conflit(*ligne[1:4]) :
+        return False
+    if enregistrement["donnees"] is None :
+        connexion.execute(SQL_SUPPRIMER_DISTANTE, (ligne[0],)).fetchall()
+        connexion.execute(SQL_OUBLIER_PARENT, (enregistrement["uid"],))
+        return True
+    donnees = enregistrement["donnees"]
+    parent = connexion.execute(SQL_ID_PAR_UID, (donnees["parent_uid"],)).fetchone() if donnees["parent_uid"] else None
+    # Une sous-tâche peut arriver avant sa parente (autre lot, ou parente reçue plus tard) : son lien est gardé
+    # dans parents_attendus jusqu'à l'arrivée de la parente
+    if donnees["parent_uid"] and parent is None :
+        connexion.execute(SQL_ATTENDRE_PARENT, (enregistrement["uid"], donnees["parent_uid"]))
+    else :
+        connexion.execute(SQL_OUBLIER_PARENT, (enregistrement["uid"],))
+    valeurs = (donnees["tache"], donnees["description"], donnees["echeance"], donnees["est_completee"], donnees["priorite"],
+               parent[0] if parent else None)
+    tampon = (enregistrement["version"], enregistrement["modifie_le"], enregistrement["appareil"])
+    if ligne is None :
+        tache_id = connexion.execute(SQL_INSERER_DISTANTE, (id_utilisateur,) + valeurs + (enregistrement["uid"],) + tampon).lastrowid
+    else :
+        tache_id = ligne[0]
+        connexion.execute(SQL_MODIFIER_DISTANTE, valeurs + tampon + (tache_id,))
+    # Les sous-tâches arrivées avant cette tâche lui sont rattachées
+    if connexion.execute(SQL_RATTACHER_ENFANTS, (tache_id, enregistrement["uid"])).rowcount :
+        connexion.execute(SQL_OUBLIER_ENFANTS, (enregistrement["uid"],))
+    return True
+
+
+def appliquer_lot(connexion, id_utilisateur, enregistrements, curseur = None) :
+    """sqlite3.Connection, int, list, int -> int
+    Applique des modifications reçues dans une seule transaction, sans les inscrire au journal, et renvoie le nombre appliqué"""
+    with connexion :
+        connexion.execute("BEGIN")
+        connexion.execute("UPDATE synchronisation SET application = 1")
+        appliquees = sum(appliquer(connexion, id_utilisateur, enregistrement) for enregistrement in enregistrements)
+        connexion.execute("UPDATE synchronisation SET application = 0")
+        if curseur is not None :
+            connexion.execute(SQL_ENREGISTRER_CURSEUR, (id_utilisateur, curseur))
+    return appliquees
+
+
+def envoyer(adresse, id_utilisateur, appareil, rapport) :
+    """str, int, str, RapportSynchronisation -> None
+    Envoie au serveur les modifications locales du journal, par lots, et applique les conflits perdus"""
+    connexion = base.connexion()
+    while True :
+        entrees = connexion.execute(SQL_JOURNAL, (id_utilisateur, TAILLE_LOT)).fetchall()
+        if not entrees :
+            return
+        # Seule la dernière entrée de chaque tâche compte : plusieurs modifications n'en envoient qu'une
+        dernieres = {entree[1] : entree for entree in entrees}
+        modifications = []
+        for uid, entree in dernieres.items() :
+            modification = lire_modification(connexion, uid, entree)
+            if modification is not None :
+                modifications.append(modification)
+        reponse = requete(adresse, rapport, {"appareil" : appareil, "modifications" : modifications})
+        rapport.envoyees += len(modifications)
+        rapport.conflits += len(reponse["conflits"])
+        if reponse["conflits"] :
+            rapport.appliquees += appliquer_lot(connexion, id_utilisateur, reponse["conflits"])
+        # Le journal n'est vidé qu'une fois le lot accepté par le serveur
+        with connexion :
+            connexion.execute(SQL_VIDER_JOURNAL, (id_utilisateur, entrees[-1][0]))
+
+
+def recevoir(adresse, id_utilisateur, appareil, rapport) :
+    """str, int, str, RapportSynchronisation -> None
+    Demande au serveur les modifications faites depuis le dernier curseur et les applique, par lots"""
+    connexion = base.connexion()
+    ligne = connexion.execute(SQL_CURSEUR, (id_utilisateur,)).fetchone()
+    curseur = ligne[0] if ligne else 0
+    while True :
+        parametres = urllib.parse.urlencode({"depuis" : curseur, "appareil" : appareil, "limite" : TAILLE_LOT})
+        reponse = requete(f"{adresse}?{parametres}", rapport)
+        rapport.recues += len(reponse["modifications"])
+        curseur = reponse["curseur"]
+        rapport.appliquees += appliquer_lot(connexion, id_utilisateur, reponse["modifications"], curseur)
+        if not reponse["suite"] :
+            return
+
+
+def synchroniser(serveur, identifiant, id_utilisateur = None) :
+    """str, str, int -> RapportSynchronisation
+    Synchronise les tâches d'un utilisateur avec le serveur : envoie les modifications locales, puis reçoit les autres"""
+    debut = time.perf_counter()
+    if id_utilisateur is None :
+        id_utilisateur = obtenir_id_utilisateur(identifiant)
+    # Les opérations gardées en attente par une durabilité groupée doivent être dans le journal
+    base.vider_ecritures()
+    attacher_archive()
+    appareil = base.executer("SELECT appareil FROM synchronisation").fetchone()[0]
+    adresse = f"{serveur.rstrip('/')}/comptes/{urllib.parse.quote(identifiant, safe = '')}/modifications"
+    rapport = RapportSynchronisation()
+    envoyer(adresse, id_utilisateur, appareil, rapport)
+    recevoir(adresse, id_utilisateur, appareil, rapport)
+    rapport.duree = time.perf_counter() - debut
+    return rapport
+
+
+if __name__ == "__main__" :
+    analyseur = argparse.ArgumentParser(description = "Synchronise les tâches d'un utilisateur avec un serveur")
+    analyseur.add_argument("identifiant", help = "identifiant de l'utilisateur à synchroniser")
+    analyseur.add_argument("serveur", help = "adresse du serveur, par exemple http://127.0.0.1:8765")
+    arguments = analyseur.parse_args()
+
+    if obtenir_id_utilisateur(arguments.identifiant) is None :
+        analyseur.error(f"L'utilisateur {arguments.identifiant} n'existe pas")
+    rapport = synchroniser(arguments.serveur, arguments.identifiant)
+    print(f"{rapport.envoyees} modifications envoyées, {rapport.recues} reçues ({rapport.appliquees} appliquées, "
+          f"{rapport.conflits} conflits) en {rapport.requetes} requêtes, {rapport.octets_envoyes + rapport.octets_recus} octets, "
+          f"{rapport.duree:.2f} s")